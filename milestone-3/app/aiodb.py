@@ -0,0 +1,51 @@
+"""Async database access for asgi.py: one aiomysql pool per worker.
+
+Connection settings are the same DB_* variables db.py reads; the pool keeps
+DB_POOL_SIZE connections open and grows to DB_POOL_SIZE +
+DB_POOL_MAX_OVERFLOW under load. Statements come from queries.py, so the
+async pages run exactly the SQL the sync ones do.
+"""
+import os
+
+import aiomysql
+
+_pool = None
+
+
+async def open_pool():
+  global _pool
+  size = int(os.getenv("DB_POOL_SIZE", "5"))
+  _pool = await aiomysql.create_pool(
+    host=os.getenv("DB_HOST", "127.0.0.1"),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASS", ""),
+    db=os.getenv("DB_NAME", "coop_salaries"),
+    minsize=size,
+    maxsize=size + int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),
+    pool_recycle=int(float(os.getenv("DB_POOL_RECYCLE", "3600"))),
+    # Every read sees the latest commit, as with db.py's rollback on release
+    autocommit=True,
+  )
+  return _pool
+
+
+async def close_pool():
+  global _pool
+  if _pool is not None:
+    _pool.close()
+    await _pool.wait_closed()
+    _pool = None
+
+
+async def fetchall(sql, params=()):
+  async with _pool.acquire() as conn:
+    async with conn.cursor() as cur:
+      await cur.execute(sql, params)
+      return list(await cur.fetchall())
+
+
+async def run(report):
+  """Execute a queries.Report and return its converted result."""
+  if report.sql is None:
+    return report.convert([])
+  return report.convert(await fetchall(report.sql, report.params))
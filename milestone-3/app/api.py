@@ -0,0 +1,158 @@
+"""JSON API (/api/v1) mirroring the report pages.
+
+Every endpoint runs the same query as its HTML route (queries.py) and only
+serialises the rows. Responses look like
+
+  {"fields": [...], "rows": [{...}, ...], "count": n,
+   "next_cursor": "...", "prev_cursor": "..."}
+
+Query parameters, on top of each report's own filters:
+  fields=a,b         only these fields, in this order
+  format=columns     {"columns": {"a": [...], "b": [...]}} instead of "rows"
+  cursor, page_size  keyset paging for salaries, search and salary-bands;
+                     follow next_cursor / prev_cursor
+"""
+import datetime
+from decimal import Decimal
+
+from flask import Blueprint, jsonify, request
+
+import queries
+from cache import cached
+from db import get_db
+from fulltext import FulltextQuery
+from pagination import page_size_arg
+
+API_MAX_PAGE_SIZE = 1000
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+class BadRequest(ValueError):
+  pass
+
+
+@api.errorhandler(BadRequest)
+def bad_request(err):
+  return jsonify({"error": str(err)}), 400
+
+
+def _jsonable(value):
+  if isinstance(value, Decimal):
+    return float(value)
+  if isinstance(value, (datetime.date, datetime.datetime)):
+    return value.isoformat()
+  return value
+
+
+def _arg(name):
+  return (request.args.get(name, "") or "").strip()
+
+
+def respond(report, rows, page=None):
+  """Serialise report rows (dicts keyed by queries.FIELDS[report])."""
+  fields = queries.FIELDS[report]
+  if request.args.get("fields"):
+    wanted = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in fields]
+    if unknown:
+      raise BadRequest(f"unknown field(s) {', '.join(unknown)}; available: {', '.join(fields)}")
+    fields = wanted
+
+  body = {"fields": fields, "count": len(rows)}
+  if request.args.get("format") == "columns":
+    body["columns"] = {f: [_jsonable(r[f]) for r in rows] for f in fields}
+  else:
+    body["rows"] = [{f: _jsonable(r[f]) for f in fields} for r in rows]
+  if page is not None:
+    body["next_cursor"] = page.next_token
+    body["prev_cursor"] = page.prev_token
+  return jsonify(body)
+
+
+def _run(fn, *args):
+  db = get_db(); cur = db.cursor()
+  try:
+    return fn(cur, *args)
+  finally:
+    cur.close(); db.close()
+
+
+def _page_size():
+  return page_size_arg(request.args, max_size=API_MAX_PAGE_SIZE)
+
+
+@api.get("/salaries")
+def salaries():
+  query, convert = queries.salaries_query(request.args.get("cursor"))
+  page = _run(queries.fetch, query, convert, _page_size())
+  return respond("salaries", page.rows, page)
+
+
+@api.get("/search")
+def search():
+  page = _run(queries.search, _arg("q"), request.args.get("sort", "rate"), request.args.get("mode"),
+              request.args.get("cursor"), _page_size())
+  return respond("search", page.rows, page)
+
+
+@api.get("/advanced-search")
+def advanced_search():
+  ft = FulltextQuery(_arg("q"), request.args.get("mode"))
+  if not ft:
+    raise BadRequest("q is required")
+  query, convert = queries.advanced_search_query(ft, request.args.get("cursor"))
+  page = _run(queries.fetch, query, convert, _page_size())
+  return respond("advanced_search", page.rows, page)
+
+
+@api.get("/salary-bands")
+def salary_bands():
+  query, convert = queries.salary_bands_query(_arg("title"), _arg("city"), _arg("term"))
+  query["token"] = request.args.get("cursor")
+  page = _run(queries.fetch, query, convert, _page_size())
+  return respond("salary_bands", page.rows, page)
+
+
+@api.get("/avg-by-title")
+@cached(ttl=300, tables=("Salary",))
+def avg_by_title():
+  return respond("avg_by_title", _run(queries.avg_by_title, _arg("title_kw")))
+
+
+@api.get("/avg-by-term")
+@cached(ttl=300, tables=("Salary",))
+def avg_by_term():
+  return respond("avg_by_term", _run(queries.avg_by_term))
+
+
+@api.get("/top-companies")
+@cached(ttl=300, tables=("Salary",))
+def top_companies():
+  role = _arg("role")
+  if not role:
+    raise BadRequest("role is required (see /api/v1/roles)")
+  return respond("top_companies", _run(queries.top_companies, role))
+
+
+@api.get("/roles")
+@cached(ttl=300, tables=("Salary",))
+def roles():
+  return respond("roles", _run(queries.roles))
+
+
+@api.get("/avg-salary")
+@cached(ttl=300, tables=("Salary",))
+def avg_salary():
+  return respond("avg_salary", _run(queries.avg_salary, _arg("faculty"), _arg("program_kw"), _arg("term")))
+
+
+@api.get("/safe-employers")
+@cached(ttl=600, tables=("Salary", "Blacklist"))
+def safe_employers():
+  return respond("safe_employers", _run(queries.safe_employers, _arg("faculty")))
+
+
+@api.get("/blacklist")
+def blacklist():
+  return respond("blacklist", _run(queries.blacklist))
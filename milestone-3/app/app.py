@@ -1,52 +1,75 @@
-from flask import Flask, render_template, request
+import csv
+import time
+
+from flask import Flask, jsonify, render_template, request
 import mysql.connector as mysql
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
-def get_db():
-  return mysql.connect(
-    host=os.getenv("DB_HOST", "127.0.0.1"),
-    user=os.getenv("DB_USER", "root"),
-    password=os.getenv("DB_PASS", ""),
-    database=os.getenv("DB_NAME", "coop_salaries"),
-    auth_plugin="mysql_native_password"
-)
+from api import api
+import bulk
+from cache import cached, get_cache, invalidate
+import dataversion
+from db import get_db, get_pool, release_request_connections
+import employer_dedup
+from fulltext import FulltextQuery
+import metrics
+from pagination import page_size_arg, page_url
+import queries
+import search_index
+from search_index import get_search_index, search_index_enabled
+import slowlog
+import statements
+from statements import prepared_statements_enabled
+from streaming import STREAM_MAX_PAGE_SIZE, RowStream, stream_page, stream_template, streaming_enabled
 
 app = Flask(__name__)
+app.jinja_env.globals["page_url"] = page_url
+app.register_blueprint(api)
+
+# Hand back any pooled connection a handler left checked out (e.g. on error)
+app.teardown_request(release_request_connections)
+
+# Per-route latency by phase, rows and bytes at /metrics (Prometheus).
+# Registered first so its timer also covers the 304 check below.
+metrics.init_app(app, exempt={"static"})
+
+# ETag / Last-Modified from the global data version; repeat GETs get a 304
+# without running any SQL. Stats endpoints report live state and are exempt.
+dataversion.init_app(app, exempt={"pool_stats", "cache_stats", "search_index_stats", "statement_stats",
+                                  "slow_queries", "employer_aliases", "metrics", "static"})
+
+# With SEARCH_INDEX=1, load the in-memory /search index now, not on the first search
+search_index.init_app(app)
 
 @app.get("/")
 def index():
   return render_template("index.html")
 
-# Employers with blacklist_flag
+# Employers with blacklist_flag (keyset-paginated on employer_id)
 @app.get("/employers")
 def employers():
   db = get_db(); cur = db.cursor()
-  cur.execute("""
-    SELECT employer_id, name, blacklist_flag
-    FROM Employer
-    ORDER BY employer_id
-  """)
-  rows = [{"employer_id": r[0], "name": r[1], "blacklist_flag": int(r[2])} for r in cur.fetchall()]
+  query, convert = queries.employers_query(request.args.get("cursor"))
+  page = queries.fetch(cur, query, convert, page_size_arg(request.args))
   cur.close(); db.close()
-  return render_template("employers.html", rows=rows)
+  return render_template("employers.html", rows=page.rows, page=page)
 
-# Jobs with salary info (ordered by $ desc)
+# Jobs with salary info (ordered by $ desc, keyset-paginated on (hourly_rate, salary_id))
 @app.get("/salaries")
 def salaries():
   db = get_db(); cur = db.cursor()
-  cur.execute("""
-    SELECT e.name, j.title, s.hourly_rate
-    FROM Employer e
-    JOIN JobPosting j ON e.employer_id = j.employer_id
-    JOIN Salary s ON j.job_id = s.job_id
-    ORDER BY s.hourly_rate DESC
-  """)
-  rows = [{"name": r[0], "title": r[1], "hourly_rate": float(r[2])} for r in cur.fetchall()]
+  query, convert = queries.salaries_query(request.args.get("cursor"))
+
+  if streaming_enabled(request.args):
+    page = stream_page(db, cur, page_size=page_size_arg(request.args, max_size=STREAM_MAX_PAGE_SIZE),
+                       convert=convert, **query)
+    return stream_template("salaries.html", rows=page.rows, page=page)
+
+  page = queries.fetch(cur, query, convert, page_size_arg(request.args))
   cur.close(); db.close()
-  return render_template("salaries.html", rows=rows)
+  return render_template("salaries.html", rows=page.rows, page=page)
 
 # Companies paying below threshold (default $18)
 @app.get("/low-wage")
@@ -56,145 +79,74 @@ def low_wage():
   except ValueError:
     threshold = 18.0
 
-  db = get_db(); cur = db.cursor()
-  cur.execute("""
-    SELECT e.name, s.hourly_rate
-    FROM Employer e
-    JOIN JobPosting j ON e.employer_id = j.employer_id
-    JOIN Salary s ON j.job_id = s.job_id
-    WHERE s.hourly_rate < %s
-    ORDER BY s.hourly_rate
-  """, (threshold,))
-  rows = [{"name": r[0], "hourly_rate": float(r[1])} for r in cur.fetchall()]
+  db = get_db(); cur = db.statement_cursor()
+  query, convert = queries.low_wage_query(threshold, request.args.get("cursor"))
+  page = queries.fetch(cur, query, convert, page_size_arg(request.args))
   cur.close(); db.close()
-  return render_template("low_wage.html", rows=rows, threshold=threshold)
+  return render_template("low_wage.html", rows=page.rows, threshold=threshold, page=page)
 
-# Average Salary by Job Title
+# Average Salary by Job Title (from the trigger-maintained TitleSalaryStats)
 @app.get("/avg-by-title")
+@cached(ttl=300, tables=("Salary",))
 def avg_by_title():
   kw = (request.args.get("title_kw", "") or "").strip()
-  like = f"%{kw}%" if kw else "%"
-  db = get_db(); cur = db.cursor()
-  cur.execute("""
-    SELECT j.title,
-           ROUND(AVG(s.hourly_rate), 2) AS avg_hourly,
-           COUNT(*) AS n_reports
-    FROM JobPosting j
-    JOIN Salary s ON s.job_id = j.job_id
-    WHERE j.title LIKE %s
-    GROUP BY j.title
-    ORDER BY avg_hourly DESC, n_reports DESC, j.title
-  """, (like,))
-  rows = [{"title": r[0], "avg_hourly": float(r[1]), "n_reports": int(r[2])} for r in cur.fetchall()]
+  db = get_db(); cur = db.statement_cursor()
+  rows = queries.avg_by_title(cur, kw)
   cur.close(); db.close()
   return render_template("avg_by_title.html", rows=rows, title_kw=kw)
 
 # Feature: Keyword Search (R6)
+# Matches through the FULLTEXT indexes (or the in-memory index with
+# SEARCH_INDEX=1); sorted by pay (default) or ?sort=relevance
 @app.get("/search")
 def search():
   keyword = (request.args.get("q", "") or "").strip()
-  db = get_db(); cur = db.cursor()
-  like = f"%{keyword}%"
-  cur.execute("""
-    SELECT j.title, e.name AS employer, j.location, j.term, s.hourly_rate
-    FROM JobPosting j
-    JOIN Employer  e ON j.employer_id = e.employer_id
-    JOIN Salary    s ON j.job_id       = s.job_id
-    WHERE %s = '' OR j.title LIKE %s OR e.name LIKE %s OR j.location LIKE %s
-    ORDER BY s.hourly_rate DESC, j.title
-  """, (keyword, like, like, like))
-  rows = [{"title": r[0], "employer": r[1], "location": r[2], "term": r[3], "hourly_rate": float(r[4])} for r in cur.fetchall()]
+  sort = request.args.get("sort", "rate")
+  db = get_db(); cur = db.statement_cursor()
+  page = queries.search(cur, keyword, sort, request.args.get("mode"),
+                        request.args.get("cursor"), page_size_arg(request.args))
   cur.close(); db.close()
-  return render_template("search.html", q=keyword, rows=rows)
+  return render_template("search.html", q=keyword, sort=sort, rows=page.rows, page=page)
 
 # Feature: Top-Paying Companies by Given Role (R7)
 @app.route("/top-companies", methods=["GET", "POST"])
+@cached(ttl=300, tables=("Salary",))
 def top_companies():
   db = get_db()
-  cur = db.cursor(dictionary=True)
+  cur = db.statement_cursor()
 
   role = request.form.get("role") if request.method == "POST" else None
 
   if role:
-    cur.execute("""
-      SELECT e.name AS company,
-             ROUND(AVG(s.hourly_rate), 2) AS avg_hourly,
-             COUNT(*) AS n_reports
-      FROM Employer e
-      JOIN JobPosting j ON j.employer_id = e.employer_id
-      JOIN Salary     s ON s.job_id       = j.job_id
-      WHERE j.title = %s
-      GROUP BY e.name
-      ORDER BY avg_hourly DESC, n_reports DESC
-      LIMIT 20;
-    """, (role,))
-    rows = cur.fetchall()
+    rows = queries.top_companies(cur, role)
     cur.close(); db.close()
     return render_template("top_companies.html", rows=rows, role=role)
   else:
-    cur.execute("SELECT DISTINCT title FROM JobPosting ORDER BY title;")
-    roles = [row["title"] for row in cur.fetchall()]
+    roles = [row["title"] for row in queries.roles(cur)]
     cur.close(); db.close()
     return render_template("select_role.html", roles=roles)
 
 # Feature: Average Salary by Faculty / Program (R8)
 @app.get("/avg-salary")
+@cached(ttl=300, tables=("Salary",))
 def avg_salary():
     fac = request.args.get("faculty", "").strip()
     prog = request.args.get("program_kw", "").strip()
     term = request.args.get("term", "").strip()
 
-    fac_like = f"%{fac}%" if fac else "%"
-    prog_like = f"%{prog}%" if prog else "%"
-    term_like = f"%{term}%" if term else "%"
-
     db = get_db()
     cur = db.cursor()
-
-    cur.execute("""
-      SELECT s.faculty,
-             s.program,
-             ROUND(AVG(sa.hourly_rate), 2) AS avg_hourly_rate,
-             COUNT(*) AS n_placements
-      FROM Placement p
-      JOIN Student s ON p.student_id = s.student_id
-      JOIN Salary sa ON p.job_id = sa.job_id
-      JOIN JobPosting j ON p.job_id = j.job_id
-      WHERE s.faculty LIKE %s
-        AND s.program LIKE %s
-        AND j.term LIKE %s
-      GROUP BY s.faculty, s.program
-      ORDER BY avg_hourly_rate DESC, n_placements DESC
-    """, (fac_like, prog_like, term_like))
-
-    rows = [
-      {
-        "faculty": r[0],
-        "program": r[1],
-        "avg_hourly_rate": float(r[2]),
-        "n_placements": int(r[3])
-      }
-      for r in cur.fetchall()
-    ]
-
+    rows = queries.avg_salary(cur, fac, prog, term)
     cur.close(); db.close()
 
     return render_template("avg_salary.html", rows=rows, faculty=fac, program_kw=prog, term=term)
 
-# Feature: Average Salary by Term (R9)
+# Feature: Average Salary by Term (R9), from the trigger-maintained TermSalaryStats
 @app.get("/avg-by-term")
+@cached(ttl=300, tables=("Salary",))
 def avg_by_term():
   db = get_db(); cur = db.cursor()
-  cur.execute("""
-    SELECT j.term,
-           ROUND(AVG(s.hourly_rate), 2) AS avg_hourly,
-           COUNT(*) AS n_reports
-    FROM JobPosting j
-    JOIN Salary s ON s.job_id = j.job_id
-    GROUP BY j.term
-    ORDER BY j.term
-  """)
-  rows = [{"term": r[0], "avg_hourly": float(r[1]), "n_reports": int(r[2])} for r in cur.fetchall()]
+  rows = queries.avg_by_term(cur)
   cur.close(); db.close()
   return render_template("avg_by_term.html", rows=rows)
 
@@ -202,53 +154,37 @@ def avg_by_term():
 @app.get("/blacklist")
 def view_blacklist():
   db = get_db(); cur = db.cursor()
-  cur.execute("""
-      SELECT e.name AS employer_name,
-            b.reason,
-            b.date_added
-      FROM Employer e
-      JOIN Blacklist b ON e.employer_id = b.employer_id
-      WHERE e.blacklist_flag = TRUE
-      ORDER BY b.date_added DESC, e.name
-  """)
-  rows = [{"employer_name": r[0], "reason": r[1], "date_added": r[2]} for r in cur.fetchall()]
+  rows = queries.blacklist(cur)
   cur.close(); db.close()
   return render_template("blacklist.html", reports=rows)
 
 # Feature: Full-Text Relevance Search (R11)
-# FIXED: Simplified to use LIKE instead of FULLTEXT to avoid index issues
+# MATCH ... AGAINST on the title / employer / location FULLTEXT indexes,
+# ranked by weighted relevance and paged on (score, salary_id).
+# ?mode=natural|boolean (default: boolean only if the query uses operators)
 @app.get("/advanced-search")
 def advanced_search():
     keyword = request.args.get("q", "")
-    if not keyword:
-        return render_template("search_results.html", jobs=[])
+    ft = FulltextQuery(keyword, request.args.get("mode"))
+    if not ft:
+        return render_template("search_results.html", jobs=[], ft=ft)
     
     db = get_db()
-    cur = db.cursor()
-    
-    # Use LIKE search instead of FULLTEXT for better compatibility
-    like_pattern = f"%{keyword}%"
-    cur.execute("""
-        SELECT DISTINCT j.title, 
-               e.name AS employer, 
-               j.location, 
-               s.hourly_rate
-        FROM JobPosting j
-        JOIN Employer e ON j.employer_id = e.employer_id
-        JOIN Salary s ON j.job_id = s.job_id
-        WHERE j.title LIKE %s
-           OR j.location LIKE %s
-           OR e.name LIKE %s
-        ORDER BY s.hourly_rate DESC
-    """, (like_pattern, like_pattern, like_pattern))
+    cur = db.cursor(buffered=False)
     
-    rows = [{"title": r[0], "employer": r[1], "location": r[2], "hourly_rate": r[3]} 
-            for r in cur.fetchall()]
+    query, convert = queries.advanced_search_query(ft, request.args.get("cursor"))
+    if streaming_enabled(request.args):
+        page = stream_page(db, cur, page_size=page_size_arg(request.args, max_size=STREAM_MAX_PAGE_SIZE),
+                           convert=convert, **query)
+        return stream_template("search_results.html", jobs=page.rows, page=page, ft=ft,
+                               streamed=not isinstance(page.rows, list))
+
+    page = queries.fetch(cur, query, convert, page_size_arg(request.args))
     
     cur.close()
     db.close()
     
-    return render_template("search_results.html", jobs=rows)
+    return render_template("search_results.html", jobs=page.rows, page=page, ft=ft)
 
 # Feature: Add Blacklist Entry (Transactional) (R12)
 @app.post("/admin/blacklist-add")
@@ -257,7 +193,7 @@ def add_blacklist_entry():
     reason = request.form.get("reason")
     admin_user = "admin@system.com"  # From session in production
     
-    db = get_db(); cur = db.cursor()
+    db = get_db(); cur = db.statement_cursor()
     try:
         db.start_transaction()
         
@@ -273,7 +209,10 @@ def add_blacklist_entry():
             WHERE employer_id = %s
         """, (employer_id,))
         
+        dataversion.bump(cur)
         db.commit()
+        invalidate("Blacklist")
+        dataversion.notify()
         return "Employer blacklisted successfully.", 200
     except Exception as err:
         db.rollback()
@@ -284,62 +223,13 @@ def add_blacklist_entry():
 # Feature: Safe Employer Recommendations by Faculty (R13)
 # FIXED: Changed get_db_connection() to get_db()
 @app.route("/safe-employers")
+@cached(ttl=600, tables=("Salary", "Blacklist"))
 def safe_employers():
     faculty = request.args.get("faculty", "").strip()
 
     conn = get_db()  # FIXED: was get_db_connection()
-    cur = conn.cursor(dictionary=True)
-
-    query = """
-      WITH faculty_avg AS (
-        SELECT s.faculty, AVG(sa.hourly_rate) AS faculty_avg_rate
-        FROM Placement p
-        JOIN Student s ON p.student_id = s.student_id
-        JOIN Salary  sa ON sa.job_id = p.job_id
-        GROUP BY s.faculty
-      ),
-      employer_faculty_stats AS (
-        SELECT
-          e.employer_id,
-          e.name AS employer,
-          s.faculty,
-          AVG(sa.hourly_rate) AS employer_avg_rate,
-          COUNT(*) AS n_placements
-        FROM Placement p
-        JOIN Student   s ON p.student_id = s.student_id
-        JOIN Salary   sa ON sa.job_id = p.job_id
-        JOIN JobPosting j ON j.job_id = p.job_id
-        JOIN Employer  e ON e.employer_id = j.employer_id
-        GROUP BY e.employer_id, e.name, s.faculty
-      )
-      SELECT
-        efs.employer,
-        efs.faculty,
-        ROUND(efs.employer_avg_rate, 2) AS avg_hourly_rate,
-        efs.n_placements
-      FROM employer_faculty_stats efs
-      JOIN faculty_avg fa
-        ON fa.faculty = efs.faculty
-      JOIN Employer e
-        ON e.employer_id = efs.employer_id
-      WHERE (%s = '' OR efs.faculty = %s)
-        AND e.blacklist_flag = FALSE
-        AND efs.n_placements >= 2
-        AND NOT EXISTS (
-          SELECT 1
-          FROM Placement p2
-          JOIN Student  s2 ON p2.student_id = s2.student_id
-          JOIN Salary  sa2 ON sa2.job_id = p2.job_id
-          JOIN JobPosting j2 ON j2.job_id = p2.job_id
-          WHERE s2.faculty = efs.faculty
-            AND j2.employer_id = efs.employer_id
-            AND sa2.hourly_rate < 0.7 * fa.faculty_avg_rate
-        )
-      ORDER BY avg_hourly_rate DESC, n_placements DESC;
-    """
-
-    cur.execute(query, (faculty, faculty))
-    rows = cur.fetchall()
+    cur = conn.cursor()
+    rows = queries.safe_employers(cur, faculty)
     cur.close(); conn.close()
 
     return render_template("safe_employers.html",
@@ -354,7 +244,7 @@ def add_salary():
   notes = request.form.get("notes")
   
   conn = get_db()
-  cursor = conn.cursor()
+  cursor = conn.statement_cursor()
   
   try:
     conn.start_transaction()
@@ -368,9 +258,14 @@ def add_salary():
         notes = VALUES(notes)
     """, (job_id, hourly_rate, hours_per_week, notes))
     
+    dataversion.bump(cursor)
     conn.commit()
+    invalidate("Salary")
+    dataversion.notify()
+    if search_index_enabled():
+      get_search_index().refresh(conn)
   
-  except mysql.connector.Error as err:
+  except mysql.Error as err:
     conn.rollback()
     return "Error: Could not insert/update salary. Data has been rolled back.", 500
   finally:
@@ -378,77 +273,63 @@ def add_salary():
   
   return "Salary added/updated successfully.", 200
 
+# Bulk salary upload: CSV or NDJSON body (or a multipart "file"), loaded in
+# batched transactions; returns a per-row error report
+@app.post("/admin/salaries/bulk")
+def bulk_salaries():
+  upload = request.files.get("file")
+  stream = upload.stream if upload else request.stream
+  try:
+    fmt = bulk.detect_format(request.args.get("format"), upload.content_type if upload else request.content_type,
+                             upload.filename if upload else "")
+    batch_size = max(1, int(request.args.get("batch_size", bulk.BULK_BATCH_SIZE)))
+  except ValueError as err:
+    return jsonify({"error": str(err)}), 400
+
+  def committed():
+    invalidate("Salary", "Blacklist")
+    dataversion.notify()
+
+  db = get_db()
+  start = time.perf_counter()
+  try:
+    report = bulk.ingest(db, bulk.read_rows(stream, fmt), batch_size, on_commit=committed)
+    if report.inserted and search_index_enabled():
+      get_search_index().refresh(db)
+  except (bulk.BulkFormatError, UnicodeDecodeError, csv.Error) as err:
+    return jsonify({"error": str(err)}), 400
+  finally:
+    db.close()
+  return jsonify({**report.as_dict(), "seconds": round(time.perf_counter() - start, 3)})
+
 
 # Feature: Salary Percentiles and Bands (R15)
 @app.get("/salary-bands")
+@cached(ttl=120, tables=("Salary",))
 def salary_bands():
   title = (request.args.get("title", "") or "").strip()
   city  = (request.args.get("city", "") or "").strip()
   term  = (request.args.get("term", "") or "").strip()
 
-  filters, params = [], []
-
-  if title:
-    filters.append("j.title = %s")
-    params.append(title)
-
-  if city:
-    filters.append("j.location = %s")
-    params.append(city)
-
-  if term:
-    filters.append("j.term = %s")
-    params.append(term)
-
-  where_clause = " AND ".join(filters) if filters else "1=1"
-
-  query = f"""
-    WITH filtered AS (
-      SELECT
-        j.title,
-        j.location,
-        j.term,
-        e.name AS employer,
-        s.hourly_rate
-      FROM JobPosting j
-      JOIN Employer e ON j.employer_id = e.employer_id
-      JOIN Salary   s ON j.job_id      = s.job_id
-      WHERE {where_clause}
-        AND s.hourly_rate IS NOT NULL
-    ),
-    ranked AS (
-      SELECT
-        employer,
-        title,
-        location,
-        term,
-        hourly_rate,
-        PERCENT_RANK() OVER (
-          PARTITION BY title, location, term
-          ORDER BY hourly_rate
-        ) AS pct_rank,
-        NTILE(10) OVER (
-          PARTITION BY title, location, term
-          ORDER BY hourly_rate
-        ) AS decile
-      FROM filtered
-    )
-    SELECT
-      employer,
-      title,
-      location,
-      term,
-      hourly_rate,
-      ROUND(pct_rank, 2) AS pct_rank,
-      decile
-    FROM ranked
-    ORDER BY hourly_rate;
-  """
+  query, convert = queries.salary_bands_query(title, city, term)
 
   db = get_db()
-  cur = db.cursor(dictionary=True)
-  cur.execute(query, params)
-  rows = cur.fetchall()
+  cur = db.cursor(buffered=False)
+  cur.execute(query["select"] + " ORDER BY hourly_rate, salary_id", query["params"])
+
+  # Unbuffered cursor + stream_template: the header goes out with the first
+  # chunk of rows instead of after the whole distribution is rendered.
+  if streaming_enabled(request.args):
+    return stream_template(
+      "salary_bands.html",
+      rows=RowStream(db, cur, convert),
+      title=title,
+      city=city,
+      term=term,
+      streamed=True,
+    )
+
+  rows = [convert(r) for r in cur.fetchall()]
   cur.close(); db.close()
 
   return render_template(
@@ -469,7 +350,7 @@ def admin_blacklist_add():
     return "Missing employer_id", 400
   
   db = get_db()
-  cur = db.cursor()
+  cur = db.statement_cursor()
   
   # Insert blacklist record
   cur.execute("""
@@ -484,7 +365,10 @@ def admin_blacklist_add():
     WHERE employer_id = %s
   """, (employer_id,))
   
+  dataversion.bump(cur)
   db.commit()
+  invalidate("Blacklist")
+  dataversion.notify()
   cur.close()
   db.close()
   
@@ -499,7 +383,7 @@ def admin_blacklist_remove():
     return "Missing employer_id", 400
   
   db = get_db()
-  cur = db.cursor()
+  cur = db.statement_cursor()
   
   # Delete blacklist records
   cur.execute("""
@@ -514,11 +398,115 @@ def admin_blacklist_remove():
     WHERE employer_id = %s
   """, (employer_id,))
   
+  dataversion.bump(cur)
   db.commit()
+  invalidate("Blacklist")
+  dataversion.notify()
   cur.close()
   db.close()
   
   return "Employer removed from blacklist successfully."
 
+# Employer alias map (employer_dedup.py): counts by source, and with
+# ?name= or ?employer_id= every spelling that resolves to that employer
+@app.get("/admin/employer-aliases")
+def employer_aliases():
+  name = (request.args.get("name") or "").strip()
+  employer_id = request.args.get("employer_id", type=int)
+
+  db = get_db(); cur = db.cursor()
+  cur.execute("SELECT source, COUNT(*) FROM EmployerAlias GROUP BY source")
+  counts = dict(cur.fetchall())
+  aliases = []
+  if name or employer_id:
+    cur.execute("""
+      SELECT a.alias, a.employer_id, e.name, a.source, a.score
+      FROM EmployerAlias a
+      JOIN Employer e ON e.employer_id = a.employer_id
+      WHERE a.employer_id = COALESCE(%s, (SELECT employer_id FROM EmployerAlias WHERE alias = %s))
+      ORDER BY a.alias
+      LIMIT 1000
+    """, (employer_id, employer_dedup.canonical_name(name) if name else None))
+    aliases = [{"alias": alias, "employer_id": eid, "employer": employer, "source": source,
+                "score": float(score) if score is not None else None}
+               for alias, eid, employer, source, score in cur.fetchall()]
+  cur.close(); db.close()
+  return jsonify({"counts": counts, "aliases": aliases})
+
+@app.post("/admin/employer-alias-add")
+def employer_alias_add():
+  """Pin a spelling to an employer; the loader and employer_dedup.py --apply keep it"""
+  name = (request.form.get("name") or "").strip()
+  employer_id = request.form.get("employer_id")
+
+  if not name or not employer_id:
+    return "Missing name or employer_id", 400
+
+  alias = employer_dedup.canonical_name(name)
+  db = get_db()
+  cur = db.statement_cursor()
+  try:
+    cur.execute("""
+      INSERT INTO EmployerAlias (alias, employer_id, source, score)
+      VALUES (%s, %s, 'manual', NULL)
+      ON DUPLICATE KEY UPDATE employer_id = VALUES(employer_id), source = 'manual', score = NULL
+    """, (alias, employer_id))
+    db.commit()
+  except mysql.Error:
+    db.rollback()
+    return "Error: Could not add alias (unknown employer_id?).", 400
+  finally:
+    cur.close(); db.close()
+
+  return jsonify({"alias": alias, "employer_id": int(employer_id), "source": "manual"})
+
+@app.post("/admin/employer-alias-remove")
+def employer_alias_remove():
+  """Drop a spelling from the alias map (the next load that sees it adds it back as 'exact')"""
+  name = (request.form.get("name") or "").strip()
+
+  if not name:
+    return "Missing name", 400
+
+  alias = employer_dedup.canonical_name(name)
+  db = get_db()
+  cur = db.statement_cursor()
+  cur.execute("DELETE FROM EmployerAlias WHERE alias = %s", (alias,))
+  removed = cur.rowcount
+  db.commit()
+  cur.close(); db.close()
+
+  return jsonify({"alias": alias, "removed": removed})
+
+# Pool sizing: connections open / in use / waiting and checkout latency
+@app.get("/admin/pool-stats")
+def pool_stats():
+  return jsonify(get_pool().stats())
+
+# Response cache hit rate per route, size and evictions
+@app.get("/admin/cache-stats")
+def cache_stats():
+  return jsonify(get_cache().stats())
+
+# Prepared statements: executions, re-prepares and parse time saved per statement
+@app.get("/admin/statement-stats")
+def statement_stats():
+  return jsonify({"enabled": prepared_statements_enabled(), **statements.REGISTRY.stats()})
+
+# Statements slower than SLOW_QUERY_MS with their captured plans (per worker)
+@app.get("/admin/slow-queries")
+def slow_queries():
+  log = slowlog.get_slow_log()
+  if log is None:
+    return jsonify({"enabled": False})
+  return jsonify({"enabled": True, **log.stats()})
+
+# In-memory search index size and freshness (SEARCH_INDEX=1)
+@app.get("/admin/search-index")
+def search_index_stats():
+  if not search_index_enabled():
+    return jsonify({"enabled": False})
+  return jsonify({"enabled": True, **get_search_index().stats()})
+
 if __name__ == "__main__":
   app.run(debug=True)
\ No newline at end of file
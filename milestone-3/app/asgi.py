@@ -0,0 +1,244 @@
+"""Async serving mode: the read pages as async views on an event loop.
+
+The Flask app handles one request per thread, so a slow /safe-employers or
+/salary-bands query pins a worker until MySQL answers. Here the read pages
+from app.py are async Quart views: while one waits on MySQL (aiomysql,
+aiodb.py) the worker serves others. They run the same queries.py reports
+and render the same templates, so pages and ETags match the sync app.
+Everything else (admin writes, /api/v1, stats) is passed through to the
+Flask app unchanged.
+
+  pip install -r requirements-async.txt
+  uvicorn asgi:application --workers 4      # from app/
+
+Differences from the sync deployment: no response cache, and large pages
+render buffered rather than streamed.
+"""
+import asyncio
+from functools import wraps
+
+import aiomysql
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, make_response, render_template, request, url_for
+from werkzeug.exceptions import HTTPException
+
+import aiodb
+import dataversion
+import queries
+from app import app as wsgi_app
+from fulltext import FulltextQuery
+from pagination import page_size_arg
+
+app = Quart(__name__)
+
+
+def page_url(token):
+  """pagination.page_url for Quart requests."""
+  args = request.args.to_dict()
+  args["cursor"] = token
+  return url_for(request.endpoint, **args)
+
+
+app.jinja_env.globals["page_url"] = page_url
+
+
+@app.before_serving
+async def _open_pool():
+  await aiodb.open_pool()
+
+
+@app.after_serving
+async def _close_pool():
+  await aiodb.close_pool()
+
+
+async def _read_version():
+  try:
+    rows = await aiodb.fetchall(dataversion.SELECT_SQL)
+  except aiomysql.ProgrammingError:
+    rows = []  # migration 003 not applied yet
+  return rows[0] if rows else None
+
+
+def conditional(view):
+  """The async counterpart of dataversion.init_app, per view.
+
+  When the worker's copy of the data version is stale and the request has
+  no validators to check, the version is read concurrently with the
+  page's own query instead of before it. The response is only tagged if
+  the version did not move meanwhile, so an ETag never claims data the
+  page does not contain.
+  """
+  @wraps(view)
+  async def wrapper(*args, **kwargs):
+    if request.method not in ("GET", "HEAD") or not dataversion.conditional_enabled():
+      return await view(*args, **kwargs)
+    versions = dataversion.get_data_version()
+    fresh, current, marker = versions.cached()
+    validators = request.if_none_match or request.if_modified_since
+
+    if fresh or validators:
+      if not fresh:
+        current = versions.store(await _read_version(), marker)
+      if current is not None:
+        etag = dataversion.etag_for(current[0], request.endpoint, request.args)
+        if dataversion.is_fresh(request, etag, current[1]):
+          resp = await make_response("", 304)
+          dataversion.tag(resp, etag, current[1])
+          return resp
+      resp = await make_response(await view(*args, **kwargs))
+    else:
+      previous = current
+      row, body = await asyncio.gather(_read_version(), view(*args, **kwargs))
+      current = versions.store(row, marker)
+      resp = await make_response(body)
+      if current != previous:
+        return resp
+
+    if current is not None and resp.status_code == 200:
+      dataversion.tag(resp, dataversion.etag_for(current[0], request.endpoint, request.args), current[1])
+    return resp
+  return wrapper
+
+
+@app.get("/")
+@conditional
+async def index():
+  return await render_template("index.html")
+
+
+@app.get("/employers")
+@conditional
+async def employers():
+  query, convert = queries.employers_query(request.args.get("cursor"))
+  page = await aiodb.run(queries.paged(query, convert, page_size_arg(request.args)))
+  return await render_template("employers.html", rows=page.rows, page=page)
+
+
+@app.get("/salaries")
+@conditional
+async def salaries():
+  query, convert = queries.salaries_query(request.args.get("cursor"))
+  page = await aiodb.run(queries.paged(query, convert, page_size_arg(request.args)))
+  return await render_template("salaries.html", rows=page.rows, page=page)
+
+
+@app.get("/low-wage")
+@conditional
+async def low_wage():
+  try:
+    threshold = float(request.args.get("threshold", "18"))
+  except ValueError:
+    threshold = 18.0
+  query, convert = queries.low_wage_query(threshold, request.args.get("cursor"))
+  page = await aiodb.run(queries.paged(query, convert, page_size_arg(request.args)))
+  return await render_template("low_wage.html", rows=page.rows, threshold=threshold, page=page)
+
+
+@app.get("/avg-by-title")
+@conditional
+async def avg_by_title():
+  kw = (request.args.get("title_kw", "") or "").strip()
+  rows = await aiodb.run(queries.avg_by_title.build(kw))
+  return await render_template("avg_by_title.html", rows=rows, title_kw=kw)
+
+
+@app.get("/search")
+@conditional
+async def search():
+  keyword = (request.args.get("q", "") or "").strip()
+  sort = request.args.get("sort", "rate")
+  page = await aiodb.run(queries.search.build(keyword, sort, request.args.get("mode"),
+                                              request.args.get("cursor"), page_size_arg(request.args)))
+  return await render_template("search.html", q=keyword, sort=sort, rows=page.rows, page=page)
+
+
+@app.route("/top-companies", methods=["GET", "POST"])
+@conditional
+async def top_companies():
+  role = (await request.form).get("role") if request.method == "POST" else None
+  if role:
+    rows = await aiodb.run(queries.top_companies.build(role))
+    return await render_template("top_companies.html", rows=rows, role=role)
+  roles = [row["title"] for row in await aiodb.run(queries.roles.build())]
+  return await render_template("select_role.html", roles=roles)
+
+
+@app.get("/avg-salary")
+@conditional
+async def avg_salary():
+  fac = request.args.get("faculty", "").strip()
+  prog = request.args.get("program_kw", "").strip()
+  term = request.args.get("term", "").strip()
+  rows = await aiodb.run(queries.avg_salary.build(fac, prog, term))
+  return await render_template("avg_salary.html", rows=rows, faculty=fac, program_kw=prog, term=term)
+
+
+@app.get("/avg-by-term")
+@conditional
+async def avg_by_term():
+  rows = await aiodb.run(queries.avg_by_term.build())
+  return await render_template("avg_by_term.html", rows=rows)
+
+
+@app.get("/blacklist")
+@conditional
+async def view_blacklist():
+  rows = await aiodb.run(queries.blacklist.build())
+  return await render_template("blacklist.html", reports=rows)
+
+
+@app.get("/advanced-search")
+@conditional
+async def advanced_search():
+  ft = FulltextQuery(request.args.get("q", ""), request.args.get("mode"))
+  if not ft:
+    return await render_template("search_results.html", jobs=[], ft=ft)
+  query, convert = queries.advanced_search_query(ft, request.args.get("cursor"))
+  page = await aiodb.run(queries.paged(query, convert, page_size_arg(request.args)))
+  return await render_template("search_results.html", jobs=page.rows, page=page, ft=ft)
+
+
+@app.get("/safe-employers")
+@conditional
+async def safe_employers():
+  faculty = request.args.get("faculty", "").strip()
+  rows = await aiodb.run(queries.safe_employers.build(faculty))
+  return await render_template("safe_employers.html", rows=rows, faculty=faculty)
+
+
+@app.get("/salary-bands")
+@conditional
+async def salary_bands():
+  title = (request.args.get("title", "") or "").strip()
+  city = (request.args.get("city", "") or "").strip()
+  term = (request.args.get("term", "") or "").strip()
+  query, convert = queries.salary_bands_query(title, city, term)
+  rows = await aiodb.run(queries.Report(query["select"] + " ORDER BY hourly_rate, salary_id", query["params"],
+                                        lambda rows: [convert(r) for r in rows]))
+  return await render_template("salary_bands.html", rows=rows, title=title, city=city, term=term)
+
+
+class Dispatcher:
+  """Route each request to the async app if it has a view for it, else to Flask."""
+
+  def __init__(self, async_app, sync_app):
+    self.async_app = async_app
+    self.sync_app = WsgiToAsgi(sync_app)
+    self._routes = async_app.url_map.bind("localhost")
+
+  def _is_async(self, scope):
+    try:
+      self._routes.match(scope["path"], method=scope["method"])
+      return True
+    except HTTPException:
+      return False
+
+  async def __call__(self, scope, receive, send):
+    # Lifespan events (pool setup) go to the async app
+    if scope["type"] != "http" or self._is_async(scope):
+      return await self.async_app(scope, receive, send)
+    return await self.sync_app(scope, receive, send)
+
+
+application = Dispatcher(app, wsgi_app)
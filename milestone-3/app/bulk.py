@@ -0,0 +1,340 @@
+"""Bulk salary ingestion for /admin/salaries/bulk.
+
+Uploads are CSV (with a header row) or NDJSON, one salary per row/line with
+job_id, hourly_rate and optionally hours_per_week and notes. The body is
+parsed as it is read, each row is validated on its own, and the valid rows
+are written in transactions of batch_size rows:
+
+  1. executemany into a per-connection temporary staging table
+     (mysql.connector sends that as one multi-row INSERT);
+  2. rows whose job_id does not exist are reported and dropped;
+  3. one INSERT ... SELECT into Salary with @bulk_salary_load set, so the
+     per-row insert triggers (migrations/004_bulk_salary_triggers.sql) do
+     nothing;
+  4. the summary tables, EmployerPayStats auto-flagging and the safety
+     stats are brought up to date with one grouped statement each.
+
+A batch that fails is rolled back and all of its rows are reported; later
+batches still run.
+"""
+import csv
+import io
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+import mysql.connector as mysql
+
+import dataversion
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+BULK_MAX_ERRORS = 1000
+
+_STAGE_SQL = [
+  """
+  CREATE TEMPORARY TABLE IF NOT EXISTS BulkSalary (
+    line INT NOT NULL,
+    job_id INT NOT NULL,
+    hourly_rate DECIMAL(8,2) NOT NULL,
+    hours_per_week INT,
+    notes TEXT,
+    INDEX (job_id)
+  ) ENGINE=InnoDB
+  """,
+  "CREATE TEMPORARY TABLE IF NOT EXISTS BulkEmployers (employer_id INT NOT NULL PRIMARY KEY) ENGINE=InnoDB",
+]
+
+_UNKNOWN_JOBS_SQL = """
+  SELECT b.line, b.job_id
+  FROM BulkSalary b
+  LEFT JOIN JobPosting j ON j.job_id = b.job_id
+  WHERE j.job_id IS NULL
+"""
+
+_INSERT_SQL = """
+  INSERT INTO Salary (job_id, hourly_rate, hours_per_week, notes)
+  SELECT job_id, hourly_rate, hours_per_week, notes
+  FROM BulkSalary
+  ORDER BY line
+"""
+
+# What the per-row insert triggers would have done, one statement per table.
+# (A temporary table can only be opened once per statement, hence
+# BulkEmployers for the auto-flag steps.)
+_APPLY_SQL = [
+  # create-tables.sql: ApplySalaryStatsDelta
+  """
+  INSERT INTO TermSalaryStats (term, rate_sum, n_reports)
+  SELECT COALESCE(j.term, ''), SUM(b.hourly_rate), COUNT(*)
+  FROM BulkSalary b JOIN JobPosting j ON j.job_id = b.job_id
+  GROUP BY COALESCE(j.term, '')
+  ON DUPLICATE KEY UPDATE
+  rate_sum = rate_sum + VALUES(rate_sum),
+  n_reports = n_reports + VALUES(n_reports)
+  """,
+  """
+  INSERT INTO TitleSalaryStats (title, rate_sum, n_reports)
+  SELECT j.title, SUM(b.hourly_rate), COUNT(*)
+  FROM BulkSalary b JOIN JobPosting j ON j.job_id = b.job_id
+  GROUP BY j.title
+  ON DUPLICATE KEY UPDATE
+  rate_sum = rate_sum + VALUES(rate_sum),
+  n_reports = n_reports + VALUES(n_reports)
+  """,
+  """
+  INSERT INTO TitleEmployerSalaryStats (title, employer_id, rate_sum, n_reports)
+  SELECT j.title, j.employer_id, SUM(b.hourly_rate), COUNT(*)
+  FROM BulkSalary b JOIN JobPosting j ON j.job_id = b.job_id
+  GROUP BY j.title, j.employer_id
+  ON DUPLICATE KEY UPDATE
+  rate_sum = rate_sum + VALUES(rate_sum),
+  n_reports = n_reports + VALUES(n_reports)
+  """,
+  # create-tables.sql: ApplyEmployerPayChange
+  """
+  INSERT INTO EmployerPayStats (employer_id, rate_sum, n_reports, min_rate)
+  SELECT j.employer_id, SUM(b.hourly_rate), COUNT(*), MIN(b.hourly_rate)
+  FROM BulkSalary b JOIN JobPosting j ON j.job_id = b.job_id
+  GROUP BY j.employer_id
+  ON DUPLICATE KEY UPDATE
+  rate_sum = rate_sum + VALUES(rate_sum),
+  n_reports = n_reports + VALUES(n_reports),
+  min_rate = LEAST(COALESCE(min_rate, VALUES(min_rate)), VALUES(min_rate))
+  """,
+  "DELETE FROM BulkEmployers",
+  """
+  INSERT IGNORE INTO BulkEmployers (employer_id)
+  SELECT DISTINCT j.employer_id
+  FROM BulkSalary b JOIN JobPosting j ON j.job_id = b.job_id
+  """,
+  # Average recovered: drop the automatic entry, keep any manual ones
+  """
+  DELETE bl FROM Blacklist bl
+  JOIN BulkEmployers be ON be.employer_id = bl.employer_id
+  JOIN EmployerPayStats eps ON eps.employer_id = bl.employer_id
+  WHERE eps.low_pay_flag
+    AND ROUND(eps.rate_sum / eps.n_reports, 2) >= 20.00
+    AND bl.reason = 'Auto-flagged for low average pay'
+    AND bl.added_by = 'admin@system.com'
+  """,
+  """
+  UPDATE Employer e
+  JOIN BulkEmployers be ON be.employer_id = e.employer_id
+  JOIN EmployerPayStats eps ON eps.employer_id = e.employer_id
+  SET e.blacklist_flag = EXISTS (SELECT 1 FROM Blacklist b WHERE b.employer_id = e.employer_id)
+  WHERE eps.low_pay_flag
+    AND ROUND(eps.rate_sum / eps.n_reports, 2) >= 20.00
+  """,
+  # Average dropped below $20/hour: a single blacklist entry (the Blacklist
+  # trigger sets Employer.blacklist_flag)
+  """
+  INSERT INTO Blacklist (employer_id, reason, date_added, added_by)
+  SELECT eps.employer_id, 'Auto-flagged for low average pay', CURDATE(), 'admin@system.com'
+  FROM EmployerPayStats eps
+  JOIN BulkEmployers be ON be.employer_id = eps.employer_id
+  WHERE NOT eps.low_pay_flag
+    AND ROUND(eps.rate_sum / eps.n_reports, 2) < 20.00
+  """,
+  """
+  UPDATE EmployerPayStats eps
+  JOIN BulkEmployers be ON be.employer_id = eps.employer_id
+  SET eps.low_pay_flag = ROUND(eps.rate_sum / eps.n_reports, 2) < 20.00
+  """,
+  # migrations/002_safety_stats.sql: ApplySafetySalaryChange
+  """
+  INSERT INTO EmployerFacultyStats (faculty, employer_id, rate_sum, n_placements, min_rate)
+  SELECT st.faculty, j.employer_id, SUM(b.hourly_rate), COUNT(*), MIN(b.hourly_rate)
+  FROM BulkSalary b
+  JOIN JobPosting j ON j.job_id = b.job_id
+  JOIN Placement p ON p.job_id = b.job_id
+  JOIN Student st ON st.student_id = p.student_id
+  GROUP BY st.faculty, j.employer_id
+  ON DUPLICATE KEY UPDATE
+  rate_sum = rate_sum + VALUES(rate_sum),
+  n_placements = n_placements + VALUES(n_placements),
+  min_rate = LEAST(COALESCE(min_rate, VALUES(min_rate)), VALUES(min_rate))
+  """,
+  """
+  INSERT INTO FacultySalaryStats (faculty, rate_sum, n_placements)
+  SELECT st.faculty, SUM(b.hourly_rate), COUNT(*)
+  FROM BulkSalary b
+  JOIN Placement p ON p.job_id = b.job_id
+  JOIN Student st ON st.student_id = p.student_id
+  GROUP BY st.faculty
+  ON DUPLICATE KEY UPDATE
+  rate_sum = rate_sum + VALUES(rate_sum),
+  n_placements = n_placements + VALUES(n_placements)
+  """,
+]
+
+
+class BulkFormatError(ValueError):
+  """The upload as a whole cannot be read (unknown format, bad header)."""
+
+
+def detect_format(fmt, content_type, filename=""):
+  fmt = (fmt or "").lower()
+  if not fmt:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv") or filename.lower().endswith(".csv"):
+      fmt = "csv"
+    elif content_type in ("application/x-ndjson", "application/jsonl", "application/json-lines") \
+         or filename.lower().endswith((".ndjson", ".jsonl")):
+      fmt = "ndjson"
+  if fmt not in ("csv", "ndjson"):
+    raise BulkFormatError("unknown upload format: send text/csv or application/x-ndjson, or pass format=csv|ndjson")
+  return fmt
+
+
+def read_rows(stream, fmt):
+  """Yield (line, dict) from a binary stream, or (line, error string) for unparsable lines."""
+  text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+  if fmt == "csv":
+    reader = csv.DictReader(text)
+    missing = {"job_id", "hourly_rate"} - set(reader.fieldnames or [])
+    if missing:
+      raise BulkFormatError(f"CSV header is missing {', '.join(sorted(missing))}")
+    for record in reader:
+      yield reader.line_num, record
+    return
+  for line_no, line in enumerate(text, 1):
+    if not line.strip():
+      continue
+    try:
+      record = json.loads(line)
+    except ValueError as err:
+      yield line_no, f"invalid JSON: {err}"
+      continue
+    yield line_no, record if isinstance(record, dict) else "expected a JSON object"
+
+
+def _blank(value):
+  return value is None or (isinstance(value, str) and not value.strip())
+
+
+def validate(record):
+  """Return the (job_id, hourly_rate, hours_per_week, notes) row, or raise ValueError."""
+  if _blank(record.get("job_id")):
+    raise ValueError("job_id is required")
+  try:
+    job_id = int(str(record["job_id"]).strip())
+  except ValueError:
+    raise ValueError(f"job_id {record['job_id']!r} is not an integer") from None
+
+  if _blank(record.get("hourly_rate")):
+    raise ValueError("hourly_rate is required")
+  try:
+    rate = Decimal(str(record["hourly_rate"]).strip().lstrip("$"))
+  except InvalidOperation:
+    raise ValueError(f"hourly_rate {record['hourly_rate']!r} is not a number") from None
+  if not rate.is_finite() or not 0 <= rate < 1_000_000:
+    raise ValueError(f"hourly_rate {record['hourly_rate']!r} is out of range")
+  rate = rate.quantize(Decimal("0.01"))
+
+  hours = record.get("hours_per_week")
+  if _blank(hours):
+    hours = None
+  else:
+    try:
+      hours = int(str(hours).strip())
+    except ValueError:
+      raise ValueError(f"hours_per_week {hours!r} is not an integer") from None
+    if not 0 <= hours <= 80:
+      raise ValueError(f"hours_per_week {hours} is not between 0 and 80")
+
+  notes = record.get("notes")
+  notes = None if _blank(notes) else str(notes)
+  return job_id, rate, hours, notes
+
+
+class BulkReport:
+  def __init__(self):
+    self.inserted = 0
+    self.rejected = 0
+    self.batches = 0
+    self.errors = []
+
+  def error(self, line, message):
+    self.rejected += 1
+    if len(self.errors) < BULK_MAX_ERRORS:
+      self.errors.append({"line": line, "error": message})
+
+  def as_dict(self):
+    return {
+      "inserted": self.inserted,
+      "rejected": self.rejected,
+      "batches": self.batches,
+      "errors": self.errors,
+      "errors_truncated": self.rejected > len(self.errors),
+    }
+
+
+def load_batch(db, cur, batch, report):
+  """Write one batch of (line, job_id, rate, hours, notes) rows in a single transaction."""
+  unknown = []
+  try:
+    db.start_transaction()
+    cur.execute("DELETE FROM BulkSalary")
+    cur.executemany("INSERT INTO BulkSalary (line, job_id, hourly_rate, hours_per_week, notes) "
+                    "VALUES (%s, %s, %s, %s, %s)", batch)
+
+    cur.execute(_UNKNOWN_JOBS_SQL)
+    unknown = cur.fetchall()
+    for line, job_id in unknown:
+      report.error(line, f"job_id {job_id} does not exist")
+    if unknown:
+      cur.execute("DELETE FROM BulkSalary WHERE job_id NOT IN (SELECT job_id FROM JobPosting)")
+
+    cur.execute("SET @bulk_salary_load = 1")
+    try:
+      cur.execute(_INSERT_SQL)
+      inserted = cur.rowcount
+    finally:
+      cur.execute("SET @bulk_salary_load = NULL")
+    for sql in _APPLY_SQL:
+      cur.execute(sql)
+    dataversion.bump(cur)
+    db.commit()
+  except mysql.Error as err:
+    db.rollback()
+    reported = {line for line, _ in unknown}
+    for row in batch:
+      if row[0] not in reported:
+        report.error(row[0], f"batch rolled back: {err.msg}")
+    return False
+  report.inserted += inserted
+  report.batches += 1
+  return True
+
+
+def ingest(db, rows, batch_size=BULK_BATCH_SIZE, on_commit=None):
+  """Validate and load (line, record) rows; return a BulkReport.
+
+  on_commit() runs after every committed batch (cache invalidation etc.).
+  """
+  report = BulkReport()
+  cur = db.cursor()
+  try:
+    for sql in _STAGE_SQL:
+      cur.execute(sql)
+    batch = []
+    for line, record in rows:
+      if isinstance(record, str):
+        report.error(line, record)
+        continue
+      try:
+        batch.append((line, *validate(record)))
+      except ValueError as err:
+        report.error(line, str(err))
+        continue
+      if len(batch) >= batch_size:
+        if load_batch(db, cur, batch, report) and on_commit:
+          on_commit()
+        batch = []
+    if batch and load_batch(db, cur, batch, report) and on_commit:
+      on_commit()
+  finally:
+    # The connection goes back to the pool
+    cur.execute("DROP TEMPORARY TABLE IF EXISTS BulkSalary, BulkEmployers")
+    cur.close()
+  return report
@@ -0,0 +1,229 @@
+"""Read-through response cache for the report routes.
+
+Rendered responses are kept per worker, keyed by route and normalised query
+(and form) arguments, in an LRU bounded by total bytes, each route with its
+own TTL. Every entry also records the generation of the tables it was built
+from. The admin write routes bump a table's generation after they commit,
+and any entry built from an older generation is treated as a miss. The
+generation includes the DataVersion the request is tagged with
+(dataversion.py), so loads that only bump that version (data_transform.py,
+synthetic.load(), employer_dedup --merge) also turn entries into misses,
+and a hit always carries the ETag of the version it was rendered from.
+
+Generations are the mtimes of small marker files under CACHE_DIR, so a
+write in one worker (or in another process on the same host) invalidates
+every worker's copy for the cost of a stat() per lookup.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, make_response, request
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "coop-salaries-cache"))
+
+
+def cache_enabled():
+  return os.getenv("RESPONSE_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+class TableGenerations:
+  """Cross-process change counters, one marker file per table."""
+
+  def __init__(self, directory):
+    self.directory = directory
+    os.makedirs(directory, exist_ok=True)
+
+  def _path(self, table):
+    return os.path.join(self.directory, table + ".gen")
+
+  def current(self, tables):
+    gens = []
+    for table in tables:
+      try:
+        gens.append(os.stat(self._path(table)).st_mtime_ns)
+      except FileNotFoundError:
+        gens.append(0)
+    return tuple(gens)
+
+  def bump(self, tables):
+    for table in tables:
+      path = self._path(table)
+      with open(path, "a"):
+        pass
+      # Strictly newer than before, even within the filesystem's timestamp granularity
+      previous = os.stat(path).st_mtime_ns
+      now = max(time.time_ns(), previous + 1)
+      os.utime(path, ns=(now, now))
+
+
+class _Entry:
+  __slots__ = ("body", "status", "content_type", "expires", "gens")
+
+  def __init__(self, body, status, content_type, expires, gens):
+    self.body = body
+    self.status = status
+    self.content_type = content_type
+    self.expires = expires
+    self.gens = gens
+
+
+class ResponseCache:
+  """Byte-bounded LRU of rendered responses."""
+
+  def __init__(self, generations, max_bytes, max_entry_bytes=None):
+    self.generations = generations
+    self.max_bytes = max_bytes
+    self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+    self._entries = OrderedDict()
+    self._bytes = 0
+    self._lock = threading.Lock()
+    self._counters = {}  # endpoint -> [hits, misses]
+    self.evictions = 0
+    self.invalidations = 0
+
+  def get(self, key, gens):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and (entry.gens != gens or entry.expires <= time.monotonic()):
+        self._drop(key)
+        entry = None
+      if entry is not None:
+        self._entries.move_to_end(key)
+      self._counters.setdefault(key[0], [0, 0])[0 if entry else 1] += 1
+      return entry
+
+  def put(self, key, entry):
+    if len(entry.body) > self.max_entry_bytes:
+      return
+    with self._lock:
+      if key in self._entries:
+        self._drop(key)
+      self._entries[key] = entry
+      self._bytes += len(entry.body)
+      while self._bytes > self.max_bytes:
+        self._drop(next(iter(self._entries)))
+        self.evictions += 1
+
+  def _drop(self, key):
+    self._bytes -= len(self._entries.pop(key).body)
+
+  def invalidate(self, *tables):
+    """Mark tables as changed; call after the write has committed."""
+    self.generations.bump(tables)
+    self.invalidations += 1
+
+  def stats(self):
+    with self._lock:
+      hits = sum(h for h, _ in self._counters.values())
+      misses = sum(m for _, m in self._counters.values())
+      return {
+        "entries": len(self._entries),
+        "bytes": self._bytes,
+        "max_bytes": self.max_bytes,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        "evictions": self.evictions,
+        "invalidations": self.invalidations,
+        "routes": {endpoint: {"hits": h, "misses": m} for endpoint, (h, m) in sorted(self._counters.items())},
+      }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+  """Return this process's cache, creating it on first use (and after fork)."""
+  global _cache
+  if _cache is None or _cache.pid != os.getpid():
+    with _cache_lock:
+      if _cache is None or _cache.pid != os.getpid():
+        _cache = ResponseCache(
+          TableGenerations(CACHE_DIR),
+          max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        )
+        _cache.pid = os.getpid()
+  return _cache
+
+
+def invalidate(*tables):
+  get_cache().invalidate(*tables)
+
+
+def _request_key():
+  args = tuple(sorted((k, tuple(sorted(v))) for k, v in request.args.lists()))
+  form = tuple(sorted((k, tuple(sorted(v))) for k, v in request.form.lists())) if request.method == "POST" else ()
+  return (request.endpoint, request.method, args, form)
+
+
+def _data_version():
+  """The DataVersion this request's ETag is computed from, else the current one."""
+  if "data_version" in g:
+    return g.data_version
+  import dataversion
+
+  current = dataversion.get_data_version().current()
+  return current[0] if current else None
+
+
+def _tee(chunks, limit, store):
+  """Pass a streamed body through, then store it if it stayed under limit."""
+  buf, size = [], 0
+  try:
+    for chunk in chunks:
+      if isinstance(chunk, str):
+        chunk = chunk.encode()
+      if buf is not None:
+        buf.append(chunk)
+        size += len(chunk)
+        if size > limit:
+          buf = None
+      yield chunk
+  finally:
+    # The client may have gone away mid-stream; let the view clean up
+    if hasattr(chunks, "close"):
+      chunks.close()
+  if buf is not None:
+    store(b"".join(buf))
+
+
+def cached(ttl, tables):
+  """Serve a view from the response cache.
+
+  ttl     seconds an entry may be served for
+  tables  tables the response is computed from; invalidate(table) drops it
+  """
+  def decorator(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      if not cache_enabled():
+        return view(*args, **kwargs)
+      cache = get_cache()
+      key = _request_key()
+      # Read generations before running the view, so a write that commits
+      # while we render makes this entry stale rather than hiding the write.
+      gens = cache.generations.current(tables) + (_data_version(),)
+      entry = cache.get(key, gens)
+      if entry is not None:
+        resp = Response(entry.body, status=entry.status, content_type=entry.content_type)
+        resp.headers["X-Cache"] = "HIT"
+        return resp
+
+      resp = make_response(view(*args, **kwargs))
+      resp.headers["X-Cache"] = "MISS"
+      if resp.status_code != 200:
+        return resp
+      store = lambda body: cache.put(key, _Entry(body, resp.status_code, resp.content_type,
+                                                 time.monotonic() + ttl, gens))
+      if resp.is_streamed:
+        resp.response = _tee(resp.response, cache.max_entry_bytes, store)
+      else:
+        store(resp.get_data())
+      return resp
+    return wrapper
+  return decorator
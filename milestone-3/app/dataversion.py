@@ -0,0 +1,163 @@
+"""Global data version and conditional GET (ETag / 304) for the read routes.
+
+DataVersion (migrations/003_data_version.sql) holds a single counter that
+every write bumps in its own transaction: the admin routes via bump(), and
+data_transform.py after each load. A read route's response is a function of
+that version, its endpoint and its arguments, so those hash to a strong
+ETag. A request whose If-None-Match (or If-Modified-Since) still matches
+gets a 304 before the view runs, i.e. without touching the database.
+
+Each worker keeps the last version it read. It is re-read when the
+DataVersion marker under CACHE_DIR changes (notify(), called by the admin
+routes after commit) or, for writers that cannot reach that directory,
+after DATA_VERSION_TTL seconds (default 5). The response cache (cache.py)
+keys its entries on the version too, so it misses from the same moment.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import mysql.connector as mysql
+from flask import g, request
+
+from cache import CACHE_DIR, TableGenerations
+
+DATA_VERSION_TTL = float(os.getenv("DATA_VERSION_TTL", "5"))
+_MARKER = "DataVersion"
+
+SELECT_SQL = "SELECT version, updated_at FROM DataVersion WHERE id = 1"
+BUMP_SQL = "UPDATE DataVersion SET version = version + 1, updated_at = UTC_TIMESTAMP() WHERE id = 1"
+
+
+def conditional_enabled():
+  return os.getenv("CONDITIONAL_GET", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def bump(cur):
+  """Increment the data version; call inside the write's transaction, before commit."""
+  cur.execute(BUMP_SQL)
+
+
+class DataVersion:
+  """This worker's view of the DataVersion row."""
+
+  def __init__(self, generations, ttl):
+    self.generations = generations
+    self.ttl = ttl
+    self._lock = threading.Lock()
+    self._value = None  # (version, updated_at)
+    self._marker = None
+    self._read_at = 0.0
+    self.reads = 0
+
+  def notify(self):
+    """After commit: have every worker on this host re-read the version."""
+    self.generations.bump([_MARKER])
+
+  def cached(self):
+    """Return (fresh, value, marker); if not fresh, read the row and store(row, marker)."""
+    marker = self.generations.current([_MARKER])
+    with self._lock:
+      fresh = self._read_at and marker == self._marker and time.monotonic() - self._read_at < self.ttl
+      return bool(fresh), self._value, marker
+
+  def store(self, row, marker):
+    with self._lock:
+      self._value = tuple(row) if row else None
+      self._marker, self._read_at = marker, time.monotonic()
+      self.reads += 1
+      return self._value
+
+  def current(self):
+    """Return (version, updated_at UTC datetime), or None without the table."""
+    fresh, value, marker = self.cached()
+    if fresh:
+      return value
+    from db import get_db
+
+    db = get_db(); cur = db.cursor()
+    try:
+      cur.execute(SELECT_SQL)
+      row = cur.fetchone()
+    except mysql.errors.ProgrammingError:
+      row = None  # migration 003 not applied yet
+    finally:
+      cur.close(); db.close()
+    return self.store(row, marker)
+
+
+_version = None
+_version_lock = threading.Lock()
+
+
+def get_data_version():
+  """Return this process's DataVersion, creating it on first use (and after fork)."""
+  global _version
+  if _version is None or _version.pid != os.getpid():
+    with _version_lock:
+      if _version is None or _version.pid != os.getpid():
+        _version = DataVersion(TableGenerations(CACHE_DIR), DATA_VERSION_TTL)
+        _version.pid = os.getpid()
+  return _version
+
+
+def notify():
+  get_data_version().notify()
+
+
+def etag_for(version, endpoint, args):
+  args = sorted((k, v) for k, vs in args.lists() for v in vs)
+  key = repr((version, endpoint, args)).encode()
+  return hashlib.sha1(key).hexdigest()
+
+
+def is_fresh(req, etag, updated_at):
+  """Whether the request's validators still match (req is a Flask or Quart request)."""
+  if req.if_none_match:
+    return req.if_none_match.contains(etag)
+  if req.if_modified_since and updated_at:
+    return updated_at.replace(microsecond=0) <= req.if_modified_since.replace(tzinfo=None)
+  return False
+
+
+def init_app(app, exempt=()):
+  """Add ETag / Last-Modified to GET responses and answer 304s early.
+
+  exempt  endpoints whose responses do not derive from the tables
+          (e.g. live stats), which are left alone
+  """
+  exempt = set(exempt)
+
+  @app.before_request
+  def _check_not_modified():
+    if request.method not in ("GET", "HEAD") or request.endpoint in exempt or request.endpoint is None \
+       or not conditional_enabled():
+      return None
+    current = get_data_version().current()
+    if current is None:
+      return None
+    version, updated_at = current
+    # cache.cached() keys its entries on the same version, so a hit is never
+    # served under a newer ETag than the one it was rendered for
+    g.data_version = version
+    g.data_etag, g.data_modified = etag_for(version, request.endpoint, request.args), updated_at
+    if is_fresh(request, g.data_etag, updated_at):
+      resp = app.response_class(status=304)
+      tag(resp, g.data_etag, g.data_modified)
+      return resp
+    return None
+
+  @app.after_request
+  def _add_validators(resp):
+    if "data_etag" in g and resp.status_code == 200:
+      tag(resp, g.data_etag, g.data_modified)
+    return resp
+
+
+def tag(resp, etag, modified):
+  resp.set_etag(etag)
+  if modified:
+    resp.last_modified = modified
+  # Cacheable, but revalidated on every use
+  resp.headers["Cache-Control"] = "no-cache"
@@ -0,0 +1,401 @@
+"""Database access for the Flask app: a per-worker MySQL connection pool.
+
+Opening a mysql.connector connection costs a TCP connect plus a full auth
+handshake, which is more than most of our queries take. get_db() now checks a
+connection out of a small pool instead; route handlers keep calling
+db.close(), which hands the connection back rather than closing the socket.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import mysql.connector as mysql
+from flask import g, has_request_context
+
+import metrics
+import slowlog
+from statements import StatementCursor, prepared_statements_enabled
+
+
+class PoolTimeout(mysql.errors.PoolError):
+  """No connection became free within the pool's checkout timeout."""
+
+
+class _Slot:
+  """One physical connection owned by the pool."""
+
+  __slots__ = ("raw", "created_at", "last_used", "prepared")
+
+  def __init__(self, raw):
+    self.raw = raw
+    self.created_at = self.last_used = time.monotonic()
+    self.prepared = OrderedDict()  # statements.StatementCursor's cache
+
+
+class PooledConnection:
+  """A single checkout of a pooled connection.
+
+  Attribute access is forwarded to the underlying mysql.connector
+  connection, so handlers use it exactly like the object mysql.connect()
+  returns. close() returns the connection to the pool and is safe to call
+  more than once.
+  """
+
+  def __init__(self, pool, slot):
+    self._pool = pool
+    self._slot = slot
+
+  def __getattr__(self, name):
+    slot = self.__dict__.get("_slot")
+    if slot is None:
+      raise mysql.errors.OperationalError("Connection already returned to the pool")
+    return getattr(slot.raw, name)
+
+  def cursor(self, *args, **kwargs):
+    try:
+      cur = self.__getattr__("cursor")(*args, **kwargs)
+    except mysql.Error as err:
+      # cursor() checks the socket first; a dead connection must not be pooled again
+      if connection_lost(err):
+        self.invalidate()
+      raise
+    return _observe(cur)
+
+  def statement_cursor(self):
+    """Cursor that runs hot statements as cached server-side prepared statements."""
+    if not prepared_statements_enabled():
+      return self.cursor()
+    return _observe(StatementCursor(self._slot.raw, self._slot.prepared))
+
+  def close(self):
+    slot, self._slot = self._slot, None
+    if slot is not None:
+      self._pool.release(slot)
+
+  def discard(self):
+    """Close the physical connection instead of pooling it.
+
+    Used when a streamed result is abandoned half-read: draining the rest
+    of a large unbuffered result would cost more than reconnecting.
+    """
+    slot, self._slot = self._slot, None
+    if slot is not None:
+      self._pool.release(slot, reuse=False)
+
+  def invalidate(self):
+    """Close a connection the server has dropped, counting it in stats()."""
+    slot, self._slot = self._slot, None
+    if slot is not None:
+      self._pool.release(slot, reuse=False, invalidated=True)
+
+
+# Client errors meaning the server side of the connection is gone
+_LOST_ERRNOS = {2006, 2013, 2055}
+
+
+def connection_lost(err):
+  return (isinstance(err, (mysql.errors.OperationalError, mysql.errors.InterfaceError))
+          or isinstance(err, mysql.Error) and err.errno in _LOST_ERRNOS)
+
+
+# Callables(sql, params) told about every statement run on a pooled cursor
+_statement_listeners = []
+
+
+def _observe(cur):
+  timer, slow = metrics.current(), slowlog.get_slow_log()
+  if _statement_listeners or timer is not None or slow is not None:
+    return _ObservedCursor(cur, timer, slow)
+  return cur
+
+
+class _ObservedCursor:
+  """Cursor wrapper that reports each execute() to the statement listeners.
+
+  Inside a timed request (metrics.py) it also times execute() and fetch*()
+  and counts the rows fetched; slow statements go to the slow-query log.
+  """
+
+  def __init__(self, cur, timer=None, slow=None):
+    self._cur = cur
+    self._timer = timer
+    self._slow = slow
+
+  def __getattr__(self, name):
+    return getattr(self._cur, name)
+
+  def __iter__(self):
+    if self._timer is None:
+      return iter(self._cur)
+    return iter(lambda: self.fetchone(), None)
+
+  def execute(self, operation, params=None, *args, **kwargs):
+    for listener in _statement_listeners:
+      listener(operation, params)
+    if self._timer is None and self._slow is None:
+      return self._cur.execute(operation, params, *args, **kwargs)
+    started = self._timer.begin() if self._timer is not None else time.perf_counter()
+    try:
+      return self._cur.execute(operation, params, *args, **kwargs)
+    finally:
+      if self._timer is not None:
+        self._timer.end("execute", started)
+      if self._slow is not None:
+        self._slow.observe(operation, params, time.perf_counter() - started)
+
+  def executemany(self, operation, seq_params):
+    if self._timer is None:
+      return self._cur.executemany(operation, seq_params)
+    with self._timer.phase("execute"):
+      return self._cur.executemany(operation, seq_params)
+
+  def fetchall(self):
+    return self._fetch(self._cur.fetchall)
+
+  def fetchmany(self, size=1):
+    return self._fetch(self._cur.fetchmany, size)
+
+  def fetchone(self):
+    return self._fetch(self._cur.fetchone)
+
+  def _fetch(self, fetch, *args):
+    if self._timer is None:
+      return fetch(*args)
+    with self._timer.phase("fetch"):
+      rows = fetch(*args)
+    if isinstance(rows, list):
+      self._timer.rows += len(rows)
+    elif rows is not None:
+      self._timer.rows += 1
+    return rows
+
+
+@contextmanager
+def watch_statements():
+  """Collect the (sql, params) of every statement run while the block is active."""
+  seen = []
+  listener = lambda sql, params: seen.append((sql, params))
+  _statement_listeners.append(listener)
+  try:
+    yield seen
+  finally:
+    _statement_listeners.remove(listener)
+
+
+class ConnectionPool:
+  """Thread-safe pool of MySQL connections with overflow and recycling.
+
+  size          connections kept open while idle
+  max_overflow  extra connections opened under load, closed once returned
+  timeout       seconds to wait for a free connection before PoolTimeout
+  recycle       reconnect connections older than this many seconds
+  ping_after    validate a connection on checkout if it sat idle this long
+  """
+
+  def __init__(self, connect, size=5, max_overflow=10, timeout=30.0,
+               recycle=3600, ping_after=5.0):
+    self.connect = connect
+    self.size = size
+    self.max_overflow = max_overflow
+    self.timeout = timeout
+    self.recycle = recycle
+    self.ping_after = ping_after
+    self.pid = os.getpid()
+
+    self._cond = threading.Condition()
+    self._idle = deque()
+    self._open = 0
+    self._in_use = 0
+    self._waiting = 0
+
+    self._checkouts = 0
+    self._timeouts = 0
+    self._recycled = 0
+    self._invalidated = 0
+    self._wait_total = 0.0
+    self._wait_max = 0.0
+    self._wait_recent = deque(maxlen=1024)
+
+  def acquire(self):
+    start = time.monotonic()
+    deadline = start + self.timeout
+    with self._cond:
+      self._waiting += 1
+      try:
+        while not self._idle and self._open >= self.size + self.max_overflow:
+          remaining = deadline - time.monotonic()
+          if remaining <= 0:
+            self._timeouts += 1
+            raise PoolTimeout(
+              f"No connection available within {self.timeout}s "
+              f"(size={self.size}, max_overflow={self.max_overflow})")
+          self._cond.wait(remaining)
+      finally:
+        self._waiting -= 1
+      # LIFO: reuse the most recently returned connection so that surplus
+      # idle connections age out through recycling.
+      slot = self._idle.pop() if self._idle else None
+      if slot is None:
+        self._open += 1
+      self._in_use += 1
+
+    try:
+      slot = self._prepare(slot)
+    except Exception:
+      with self._cond:
+        self._open -= 1
+        self._in_use -= 1
+        self._cond.notify()
+      raise
+
+    waited = time.monotonic() - start
+    with self._cond:
+      self._checkouts += 1
+      self._wait_total += waited
+      self._wait_max = max(self._wait_max, waited)
+      self._wait_recent.append(waited)
+    return PooledConnection(self, slot)
+
+  def _prepare(self, slot):
+    """Return a usable slot, replacing stale or broken connections."""
+    if slot is None:
+      return _Slot(self.connect())
+
+    now = time.monotonic()
+    if self.recycle and now - slot.created_at > self.recycle:
+      _close_quietly(slot.raw)
+      with self._cond:
+        self._recycled += 1
+      return _Slot(self.connect())
+
+    if now - slot.last_used > self.ping_after:
+      try:
+        slot.raw.ping(reconnect=False)
+      except mysql.Error:
+        _close_quietly(slot.raw)
+        with self._cond:
+          self._invalidated += 1
+        return _Slot(self.connect())
+    return slot
+
+  def release(self, slot, reuse=True, invalidated=False):
+    raw = slot.raw
+    healthy = reuse
+    if reuse:
+      try:
+        # Never hand the next request a half-read result set or an open
+        # transaction (which would also pin a stale REPEATABLE READ snapshot).
+        if raw.unread_result:
+          raw.consume_results()
+        if raw.in_transaction:
+          raw.rollback()
+      except mysql.Error:
+        healthy = False
+
+    with self._cond:
+      self._in_use -= 1
+      if healthy and len(self._idle) < self.size:
+        slot.last_used = time.monotonic()
+        self._idle.append(slot)
+        raw = None
+      else:
+        self._open -= 1
+        if invalidated or (reuse and not healthy):
+          self._invalidated += 1
+      self._cond.notify()
+
+    if raw is not None:
+      _close_quietly(raw)
+
+  def dispose(self):
+    """Close every idle connection; checked-out ones close on return."""
+    with self._cond:
+      idle, self._idle = list(self._idle), deque()
+      self._open -= len(idle)
+    for slot in idle:
+      _close_quietly(slot.raw)
+
+  def stats(self):
+    with self._cond:
+      recent = sorted(self._wait_recent)
+      return {
+        "size": self.size,
+        "max_overflow": self.max_overflow,
+        "open": self._open,
+        "idle": len(self._idle),
+        "in_use": self._in_use,
+        "overflow": max(0, self._open - self.size),
+        "waiting": self._waiting,
+        "checkouts": self._checkouts,
+        "timeouts": self._timeouts,
+        "recycled": self._recycled,
+        "invalidated": self._invalidated,
+        "checkout_ms_avg": round(1000 * self._wait_total / self._checkouts, 3) if self._checkouts else 0.0,
+        "checkout_ms_p95": round(1000 * recent[int(0.95 * (len(recent) - 1))], 3) if recent else 0.0,
+        "checkout_ms_max": round(1000 * self._wait_max, 3),
+      }
+
+
+def _close_quietly(raw):
+  try:
+    raw.close()
+  except mysql.Error:
+    pass
+
+
+def _connect():
+  return mysql.connect(
+    host=os.getenv("DB_HOST", "127.0.0.1"),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASS", ""),
+    database=os.getenv("DB_NAME", "coop_salaries"),
+    auth_plugin="mysql_native_password"
+  )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+  """Return this process's pool, creating it on first use (and after fork)."""
+  global _pool
+  if _pool is None or _pool.pid != os.getpid():
+    with _pool_lock:
+      if _pool is None or _pool.pid != os.getpid():
+        _pool = ConnectionPool(
+          _connect,
+          size=int(os.getenv("DB_POOL_SIZE", "5")),
+          max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),
+          timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+          recycle=float(os.getenv("DB_POOL_RECYCLE", "3600")),
+          ping_after=float(os.getenv("DB_POOL_PING_AFTER", "5")),
+        )
+  return _pool
+
+
+def get_db():
+  """Check out a pooled connection.
+
+  Inside a request the connection is also remembered on flask.g, so
+  release_request_connections() can return it if the handler raised before
+  reaching its own db.close().
+  """
+  with metrics.phase("acquire"):
+    conn = get_pool().acquire()
+  if has_request_context():
+    g.setdefault("_db_conns", []).append(conn)
+  return conn
+
+
+def release_request_connections(exc=None):
+  # A request that failed on a lost connection can't tell which of its
+  # connections died, and none of them is worth a ping to find out.
+  lost = exc is not None and connection_lost(exc)
+  for conn in g.pop("_db_conns", ()):
+    if lost:
+      conn.invalidate()
+    else:
+      conn.close()
@@ -0,0 +1,385 @@
+"""Fuzzy employer de-duplication and the EmployerAlias map.
+
+The loader used to match employers on the exact stripped name, so "Google",
+"Google Inc." and "google" became three Employer rows and split every
+per-employer aggregate. Names are now resolved in three steps:
+
+  1. canonical_name(): accents, case, punctuation, a leading "The" and
+     trailing legal suffixes (Inc., Ltd., Corp., LLC, ...) are dropped.
+     Names with the same canonical key are the same employer.
+  2. blocking: each distinct key (spaces removed, padded with '#') is cut
+     into character 3-grams, and gets LSH_BANDS block keys, each made of
+     LSH_ROWS min-hashes of its gram set (MinHash LSH). Keys with similar
+     gram sets almost always share a block key; unrelated ones almost
+     never do, so candidate pairs come from small blocks, never from all
+     n^2 pairs. Grams found in many keys ("sys", "ing") are left out of
+     the block keys, and blocks over --max-block keys are skipped.
+  3. scoring: candidates whose sizes allow Jaccard >= t, and whose digits
+     agree ("Store 12" is not "Store 13"), are scored on their gram sets.
+     Pairs at or above t are linked, and each connected group of keys is
+     one employer: the lowest employer_id in it.
+
+The result is kept in EmployerAlias (migrations/008_employer_alias.sql),
+canonical key -> employer_id. data_transform's loader looks every incoming
+name up there before it creates an employer, and /admin/employer-aliases
+lists it; manual entries (/admin/employer-alias-add) are never overwritten.
+
+  python3 employer_dedup.py --check            # report the groups found, change nothing
+  python3 employer_dedup.py --apply            # write the alias map
+  python3 employer_dedup.py --apply --merge    # and fold duplicate employers into one
+
+NumPy and pandas are only needed by resolve() and canonical_names().
+"""
+import argparse
+import re
+import sys
+import time
+import unicodedata
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_MAX_BLOCK = 2000
+MAX_KEY_BYTES = 128  # longer keys are compared on their first 128 bytes
+SCORE_BATCH = 1_000_000  # candidate pairs verified at a time
+# MinHash bands: keys with Jaccard s share a block with probability
+# 1 - (1 - s**LSH_ROWS)**LSH_BANDS (0.9996 at s = 0.8, 0.80 at 0.6, 0.006 at 0.2)
+LSH_BANDS, LSH_ROWS, LSH_SEED = 24, 6, 348
+_PRIME = 2**31 - 1
+# Grams in more than this share of the keys (and STOP_GRAM_MIN) are left out of the block keys
+STOP_GRAM_SHARE, STOP_GRAM_MIN = 0.001, 50
+
+_LEADING_THE = re.compile(r"^the ")
+_LEGAL_SUFFIX = re.compile(r"(?: (?:inc|incorporated|corp|corporation|co|company|ltd|limited|llc|llp|lp|plc|ulc"
+                           r"|gmbh|ag|sa|pvt|private))+$")
+_DROPPED = re.compile(r"['’.]")
+_SEPARATOR = re.compile(r"[^a-z0-9]+")
+_DIGITS = re.compile(r"\D+")
+
+
+def canonical_name(name):
+  """The alias key for an employer name: "The Google, Inc." -> "google"."""
+  text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+  text = _SEPARATOR.sub(" ", _DROPPED.sub("", text.replace("&", " and "))).strip()
+  stripped = _LEGAL_SUFFIX.sub("", _LEADING_THE.sub("", text))
+  # Names with no ASCII letters or digits keep their own (lower-cased) spelling
+  return (stripped or text or " ".join(str(name).lower().split()))[:255]
+
+
+def canonical_names(names):
+  """canonical_name() of every name in a pandas Series, each distinct name normalized once (None for missing)."""
+  import pandas as pd
+
+  codes, uniques = pd.factorize(names)
+  keys = pd.Series([canonical_name(name) for name in uniques] + [None], dtype=object)
+  return pd.Series(keys.to_numpy()[codes], index=names.index, dtype=object)
+
+
+def _unique(values, np):
+  """Sorted distinct values (np.unique hashes instead of sorting for plain ints, which is slower here)."""
+  values = np.sort(values)
+  return values[np.concatenate(([True], values[1:] != values[:-1]))] if len(values) else values
+
+
+def _grams(keys, np):
+  """Sorted, distinct (key, 3-gram) entries: key index * 2**24 + the gram's three bytes."""
+  padded = [("#" + key.replace(" ", "") + "#").encode()[:MAX_KEY_BYTES] for key in keys]
+  lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+  data = np.frombuffer(b"".join(padded), dtype=np.uint8).astype(np.int64)
+  per_key = np.maximum(lengths - 2, 0)
+  owner = np.repeat(np.arange(len(keys), dtype=np.int64), per_key)
+  # Position of each gram's first byte: its key's offset plus its place in the key
+  offsets = np.cumsum(lengths) - lengths
+  firsts = np.cumsum(per_key) - per_key
+  at = np.arange(per_key.sum(), dtype=np.int64) - np.repeat(firsts - offsets, per_key)
+  grams = (data[at] << 16) | (data[at + 1] << 8) | data[at + 2]
+  return _unique((owner << 24) | grams, np)
+
+
+def _signatures(entries, sizes, starts, np):
+  """LSH_BANDS block keys per key (-1 for keys with no grams), from LSH_ROWS min-hashes each."""
+  rng = np.random.default_rng(LSH_SEED)
+  grams = entries & 0xFFFFFF
+  filled = sizes > 0
+  keys = np.full((LSH_BANDS, len(sizes)), -1, dtype=np.int64)
+  for band in range(LSH_BANDS):
+    key = np.full(int(filled.sum()), band, dtype=np.int64)
+    for multiplier, offset in rng.integers(1, _PRIME, (LSH_ROWS, 2)):
+      lowest = np.minimum.reduceat((grams * multiplier + offset) % _PRIME, starts[filled])
+      key = key * 1_000_003 ^ lowest  # wraps around; a collision only adds a candidate
+    keys[band, filled] = key
+  return keys
+
+
+def _block_pairs(members, blocks, n, max_block, np):
+  """Pairs (a < b) of members that share a block, and the number of blocks over max_block skipped."""
+  order = np.lexsort((members, blocks))
+  members, blocks = members[order], blocks[order]
+  _, first, block_size = np.unique(blocks, return_index=True, return_counts=True)
+  skipped = int((block_size > max_block).sum())
+  keep = (block_size > 1) & (block_size <= max_block)
+  first, block_size = first[keep], block_size[keep]
+  # Each member pairs with every member after it in its block
+  size = np.repeat(block_size, block_size)
+  position = np.arange(block_size.sum()) - np.repeat(np.cumsum(block_size) - block_size, block_size)
+  entry = np.repeat(first, block_size) + position
+  after = size - position - 1
+  left = np.repeat(entry, after)
+  right = left + 1 + np.arange(after.sum()) - np.repeat(np.cumsum(after) - after, after)
+  a, b = members[left], members[right]
+  pairs = _unique(np.minimum(a, b) * n + np.maximum(a, b), np)
+  return pairs // n, pairs % n, skipped
+
+
+def _shared(entries, a, b, sizes, starts, np):
+  """Number of grams keys a[i] and b[i] have in common, for every pair."""
+  shared = np.zeros(len(a), dtype=np.int64)
+  for lo in range(0, len(a), SCORE_BATCH):
+    pa, pb = a[lo:lo + SCORE_BATCH], b[lo:lo + SCORE_BATCH]
+    n = sizes[pb]
+    pair = np.repeat(np.arange(len(pb)), n)
+    at = np.repeat(starts[pb] - (np.cumsum(n) - n), n) + np.arange(n.sum())
+    # b's grams looked up under a's key (pairs are sorted by a, so the lookups are too)
+    wanted = (pa[pair] << 24) | (entries[at] & 0xFFFFFF)
+    found = entries[np.minimum(np.searchsorted(entries, wanted), len(entries) - 1)] == wanted
+    shared[lo:lo + SCORE_BATCH] = np.bincount(pair, weights=found, minlength=len(pa)).astype(np.int64)
+  return shared
+
+
+def _components(n, a, b, np):
+  """Connected component label (its smallest member) of each of n nodes, given edges a-b."""
+  labels = np.arange(n)
+  while True:
+    before = labels.copy()
+    np.minimum.at(labels, a, labels[b])
+    np.minimum.at(labels, b, labels[a])
+    labels = labels[labels]
+    if np.array_equal(labels, before):
+      return labels
+
+
+def resolve(employer_ids, names, threshold=DEFAULT_THRESHOLD, max_block=DEFAULT_MAX_BLOCK):
+  """Group employer names into employers.
+
+  Returns (aliases, stats). aliases has one row per canonical key: alias,
+  employer_id (the lowest id in the key's group), source ('exact' for a key
+  on its own, 'fuzzy' when it was linked to others) and score (its best
+  Jaccard similarity to another key in the group). stats counts the work
+  done at each step, with seconds.
+  """
+  import numpy as np
+  import pandas as pd
+
+  stats = {"names": len(names)}
+  start = time.perf_counter()
+  employers = pd.DataFrame({"employer_id": pd.Series(employer_ids).to_numpy(),
+                            "alias": canonical_names(pd.Series(names)).to_numpy()}).dropna()
+  key_codes, keys = pd.factorize(employers["alias"])
+  keys = keys.tolist()
+  stats["keys"] = len(keys)
+  stats["normalize_seconds"] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  entries = _grams(keys, np)
+  owner = entries >> 24
+  sizes = np.bincount(owner, minlength=len(keys))
+  starts = np.cumsum(sizes) - sizes
+  # Grams in many keys ("sys", "tem", "ing#") say little about which
+  # employer a name is: block on the rest, or on everything if that is all
+  _, gram_of, frequency = np.unique(entries & 0xFFFFFF, return_inverse=True, return_counts=True)
+  common = frequency[gram_of] > max(STOP_GRAM_MIN, STOP_GRAM_SHARE * len(keys))
+  all_common = np.bincount(owner, weights=~common, minlength=len(keys)) == 0
+  signed = entries[~common | all_common[owner]]
+  signed_sizes = np.bincount(signed >> 24, minlength=len(keys))
+  signatures = _signatures(signed, signed_sizes, np.cumsum(signed_sizes) - signed_sizes, np)
+  listed = signatures != -1
+  members = np.broadcast_to(np.arange(len(keys)), signatures.shape)[listed]
+  a, b, stats["blocks_skipped"] = _block_pairs(members, signatures[listed], len(keys), max_block, np)
+  stats["grams"] = len(entries)
+  stats["candidates"] = len(a)
+  stats["index_seconds"] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  # Length filter: Jaccard >= t needs t * larger <= smaller; and equal digits
+  digits = pd.factorize(pd.Series([_DIGITS.sub("", key) for key in keys], dtype=object))[0]
+  small, large = np.minimum(sizes[a], sizes[b]), np.maximum(sizes[a], sizes[b])
+  keep = (small >= threshold * large) & (digits[a] == digits[b])
+  a, b = a[keep], b[keep]
+  shared = _shared(entries, a, b, sizes, starts, np)
+  score = shared / (sizes[a] + sizes[b] - shared)
+  linked = score >= threshold
+  a, b, score = a[linked], b[linked], score[linked]
+  stats["scored"] = int(keep.sum())
+  stats["linked"] = len(a)
+  stats["score_seconds"] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  group = _components(len(keys), a, b, np)
+  best = np.full(len(keys), np.nan)
+  np.fmax.at(best, a, score)
+  np.fmax.at(best, b, score)
+  lowest = pd.Series(employers["employer_id"].to_numpy()).groupby(group[key_codes]).min()
+  aliases = pd.DataFrame({
+    "alias": keys,
+    "employer_id": lowest.reindex(group).to_numpy(),
+    "source": np.where(np.isnan(best), "exact", "fuzzy"),
+    "score": best,
+  })
+  stats["groups_merged"] = int((np.bincount(group[key_codes], minlength=len(keys)) > 1).sum())
+  stats["employers_merged"] = int((employers["employer_id"].to_numpy() != aliases["employer_id"].to_numpy()[key_codes]).sum())
+  stats["group_seconds"] = time.perf_counter() - start
+  return aliases, stats
+
+
+def apply(db, aliases, batch_size=5000):
+  """Write the alias map; manual entries keep their employer."""
+  cur = db.cursor()
+  rows = [(alias, int(employer_id), source, None if score != score else round(float(score), 3))
+          for alias, employer_id, source, score in aliases.itertuples(index=False)]
+  try:
+    for lo in range(0, len(rows), batch_size):
+      cur.executemany("""
+        INSERT INTO EmployerAlias (alias, employer_id, source, score)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+          employer_id = IF(source = 'manual', employer_id, VALUES(employer_id)),
+          score = IF(source = 'manual', score, VALUES(score)),
+          source = IF(source = 'manual', source, VALUES(source))
+      """, rows[lo:lo + batch_size])
+    db.commit()
+  except Exception:
+    db.rollback()
+    raise
+  finally:
+    cur.close()
+
+
+def moves(employer_ids, names, aliases):
+  """(employer_id, keep_id) for every employer whose key points at another employer in aliases ({key: employer_id})."""
+  import pandas as pd
+
+  keys = canonical_names(pd.Series(names)).tolist()
+  keep = {employer_id: aliases.get(key, employer_id) for employer_id, key in zip(employer_ids, keys)}
+  for employer_id in keep:
+    # Follow chains: a manual alias can point at an employer that is itself folded away
+    target, seen = keep[employer_id], {employer_id}
+    while target not in seen and keep.get(target, target) != target:
+      seen.add(target)
+      target = keep[target]
+    keep[employer_id] = target
+  return [(employer_id, target) for employer_id, target in keep.items() if target != employer_id]
+
+
+def merge(db, pairs):
+  """Fold each employer into its keep_id, given (employer_id, keep_id) pairs; returns the number removed.
+
+  Postings that end up with the same (employer, title, location, term)
+  keep the lowest job_id, as in migrations/007_jobposting_unique_key.sql.
+  The summary tables and the automatic low-pay Blacklist entries are
+  recomputed in the same transaction: moving the salaries fires the pay
+  triggers while the postings still belong to the old employers.
+  """
+  import dataversion
+  from cache import invalidate
+  from summaries import recompute
+
+  cur = db.cursor()
+  try:
+    cur.execute("""
+      CREATE TEMPORARY TABLE EmployerMerge (employer_id INT NOT NULL PRIMARY KEY, keep_id INT NOT NULL) ENGINE=InnoDB
+    """)
+    # The employers kept map to themselves, so their postings join in too
+    kept = sorted({keep_id for _, keep_id in pairs})
+    cur.executemany("INSERT INTO EmployerMerge (employer_id, keep_id) VALUES (%s, %s)",
+                    list(pairs) + [(keep_id, keep_id) for keep_id in kept])
+    cur.execute("""
+      CREATE TEMPORARY TABLE JobPostingTarget ENGINE=InnoDB AS
+      SELECT j.job_id, m.keep_id AS employer_id, j.title, j.location, j.term
+      FROM JobPosting j JOIN EmployerMerge m ON m.employer_id = j.employer_id
+    """)
+    cur.execute("""
+      CREATE TEMPORARY TABLE JobPostingKeep ENGINE=InnoDB AS
+      SELECT employer_id, title, location, term, MIN(job_id) AS keep_job
+      FROM JobPostingTarget GROUP BY employer_id, title, location, term
+    """)
+    for table in ("Salary", "Placement"):
+      cur.execute(f"""
+        UPDATE {table} x
+        JOIN JobPostingTarget t ON t.job_id = x.job_id
+        JOIN JobPostingKeep k ON k.employer_id = t.employer_id AND k.title = t.title
+                             AND k.location <=> t.location AND k.term <=> t.term
+        SET x.job_id = k.keep_job
+        WHERE x.job_id <> k.keep_job
+      """)
+    cur.execute("""
+      DELETE j FROM JobPosting j
+      JOIN JobPostingTarget t ON t.job_id = j.job_id
+      JOIN JobPostingKeep k ON k.employer_id = t.employer_id AND k.title = t.title
+                           AND k.location <=> t.location AND k.term <=> t.term
+      WHERE j.job_id <> k.keep_job
+    """)
+    cur.execute("UPDATE JobPosting j JOIN EmployerMerge m ON m.employer_id = j.employer_id SET j.employer_id = m.keep_id")
+    cur.execute("UPDATE Blacklist b JOIN EmployerMerge m ON m.employer_id = b.employer_id SET b.employer_id = m.keep_id")
+    cur.execute("UPDATE EmployerAlias a JOIN EmployerMerge m ON m.employer_id = a.employer_id SET a.employer_id = m.keep_id")
+    cur.execute("DELETE e FROM Employer e JOIN EmployerMerge m ON m.employer_id = e.employer_id WHERE m.keep_id <> e.employer_id")
+    removed = cur.rowcount
+    # Also sets blacklist_flag and bumps the data version
+    recompute(cur)
+    db.commit()
+  except Exception:
+    db.rollback()
+    raise
+  finally:
+    cur.execute("DROP TEMPORARY TABLE IF EXISTS EmployerMerge, JobPostingTarget, JobPostingKeep")
+    cur.close()
+  invalidate("Salary", "Blacklist")
+  dataversion.notify()
+  return removed
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  mode = parser.add_mutually_exclusive_group(required=True)
+  mode.add_argument("--check", action="store_true", help="print the groups found; change nothing")
+  mode.add_argument("--apply", action="store_true", help="write the alias map")
+  parser.add_argument("--merge", action="store_true", help="with --apply: fold duplicate employers into one")
+  parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="3-gram Jaccard similarity to link")
+  parser.add_argument("--max-block", type=int, default=DEFAULT_MAX_BLOCK, help="skip blocks with more keys")
+  args = parser.parse_args()
+
+  from dotenv import load_dotenv
+  load_dotenv()
+  from db import get_db
+
+  db = get_db()
+  try:
+    cur = db.cursor()
+    cur.execute("SELECT employer_id, name FROM Employer")
+    employers = cur.fetchall()
+    cur.close()
+    aliases, stats = resolve([e for e, _ in employers], [n for _, n in employers], args.threshold, args.max_block)
+    print(f"{stats['names']:,} names, {stats['keys']:,} keys, {stats['candidates']:,} candidate pairs "
+          f"({stats['blocks_skipped']} blocks skipped), {stats['linked']:,} linked; "
+          f"{stats['employers_merged']:,} employers fold into {stats['groups_merged']:,} groups")
+
+    if args.check:
+      names = dict(employers)
+      merged = aliases[aliases["source"] == "fuzzy"].sort_values(["employer_id", "alias"])
+      for employer_id, group in list(merged.groupby("employer_id", sort=False))[:20]:
+        print(f"  #{employer_id} {names[employer_id]}: " + ", ".join(
+          f"{alias} ({score:.2f})" for alias, score in zip(group["alias"], group["score"])))
+      return 0
+
+    apply(db, aliases)
+    print(f"EmployerAlias: {len(aliases):,} keys written")
+    if args.merge:
+      cur = db.cursor()
+      cur.execute("SELECT alias, employer_id FROM EmployerAlias")
+      pairs = moves([e for e, _ in employers], [n for _, n in employers], dict(cur.fetchall()))
+      cur.close()
+      print(f"Employer: {merge(db, pairs) if pairs else 0:,} duplicates merged")
+    return 0
+  finally:
+    db.close()
+
+
+if __name__ == "__main__":
+  sys.exit(main())
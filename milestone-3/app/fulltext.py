@@ -0,0 +1,117 @@
+"""FULLTEXT search over job titles, employer names and locations.
+
+Uses the ft_job_title, ft_employer_name and ft_job_location indexes from
+create-tables.sql. Candidate jobs are gathered with one MATCH ... AGAINST per
+index (UNIONed, so each uses its own index rather than an OR across tables),
+then ranked by a weighted sum of the three relevance scores. Terms shorter
+than innodb_ft_min_token_size never make it into a FULLTEXT index, so only
+those fall back to LIKE.
+"""
+import os
+import re
+
+# Must match the server's innodb_ft_min_token_size (MySQL default: 3)
+FT_MIN_TOKEN_SIZE = int(os.getenv("FT_MIN_TOKEN_SIZE", "3"))
+
+# Relevance weight per field; a title hit matters more than a location hit
+FIELD_WEIGHTS = (("j.title", 3.0), ("e.name", 2.0), ("j.location", 1.0))
+LIKE_WEIGHT = 0.5
+
+# Explicit boolean-mode syntax: a leading operator on a word, quotes or a
+# trailing wildcard. (A bare hyphen is not enough; "Co-op" is a title.)
+_BOOLEAN_SYNTAX = re.compile(r'(^|\s)[+\-~<>(]|["*]')
+_WORD = re.compile(r"(^|\s|-)?(\w+)")
+
+
+class FulltextQuery:
+  """A parsed search string plus the SQL fragments to find and rank matches.
+
+  mode is "natural", "boolean", or None to pick boolean mode only when the
+  text uses boolean operators.
+  """
+
+  def __init__(self, text, mode=None):
+    self.text = (text or "").strip()
+    if mode in ("natural", "boolean"):
+      self.boolean = mode == "boolean"
+    else:
+      self.boolean = bool(_BOOLEAN_SYNTAX.search(self.text))
+
+    words = []
+    for m in _WORD.finditer(self.text):
+      excluded = self.boolean and m.group(1) == "-"
+      if not excluded and m.group(2).lower() not in (w.lower() for w in words):
+        words.append(m.group(2))
+    self.long_terms = [w for w in words if len(w) >= FT_MIN_TOKEN_SIZE]
+    self.short_terms = [w for w in words if len(w) < FT_MIN_TOKEN_SIZE]
+
+  def __bool__(self):
+    return bool(self.long_terms or self.short_terms)
+
+  @property
+  def mode_sql(self):
+    return "IN BOOLEAN MODE" if self.boolean else "IN NATURAL LANGUAGE MODE"
+
+  @property
+  def against(self):
+    return self.text if self.boolean else " ".join(self.long_terms)
+
+  def _likes(self):
+    return ["%" + t.replace("_", r"\_") + "%" for t in self.short_terms]
+
+  def candidates(self):
+    """SQL selecting the job_ids that match at least one field, and its params."""
+    parts, params = [], []
+    if self.long_terms:
+      m = self.mode_sql
+      parts += [
+        f"SELECT job_id FROM JobPosting WHERE MATCH(title) AGAINST (%s {m})",
+        f"SELECT job_id FROM JobPosting WHERE MATCH(location) AGAINST (%s {m})",
+        f"""SELECT j.job_id FROM Employer e JOIN JobPosting j ON j.employer_id = e.employer_id
+            WHERE MATCH(e.name) AGAINST (%s {m})""",
+      ]
+      params += [self.against] * 3
+    for like in self._likes():
+      parts.append("""SELECT j.job_id FROM JobPosting j JOIN Employer e ON e.employer_id = j.employer_id
+                      WHERE j.title LIKE %s OR e.name LIKE %s OR j.location LIKE %s""")
+      params += [like] * 3
+    return "\n      UNION\n      ".join(parts), params
+
+  def score(self):
+    """Integer relevance expression (x1000, so keyset comparisons are exact)."""
+    terms, params = [], []
+    if self.long_terms:
+      for col, weight in FIELD_WEIGHTS:
+        terms.append(f"{weight} * MATCH({col}) AGAINST (%s {self.mode_sql})")
+        params.append(self.against)
+    for like in self._likes():
+      for col, _ in FIELD_WEIGHTS:
+        terms.append(f"{LIKE_WEIGHT} * ({col} LIKE %s)")
+        params.append(like)
+    return "CAST(ROUND(1000 * (" + " + ".join(terms) + ")) AS SIGNED)", params
+
+  def candidate_join(self):
+    """JOIN clause restricting `j` to matching jobs, for use in another query."""
+    sql, params = self.candidates()
+    return f"JOIN (\n      {sql}\n    ) ft ON ft.job_id = j.job_id", params
+
+  def ranked_select(self):
+    """One row per matching salary with a `score` column, for keyset paging.
+
+    Page through it on ("score", "salary_id"), descending.
+    """
+    cand_sql, cand_params = self.candidates()
+    score_sql, score_params = self.score()
+    sql = f"""
+    SELECT * FROM (
+      SELECT j.title, e.name AS employer, j.location, j.term, s.hourly_rate, s.salary_id,
+             {score_sql} AS score
+      FROM (
+      {cand_sql}
+      ) ft
+      JOIN JobPosting j ON j.job_id = ft.job_id
+      JOIN Employer   e ON e.employer_id = j.employer_id
+      JOIN Salary     s ON s.job_id = j.job_id
+    ) ranked
+    """
+    return sql, score_params + cand_params
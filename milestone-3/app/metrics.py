@@ -0,0 +1,353 @@
+"""Per-route latency metrics, exposed at /metrics in Prometheus text format.
+
+Each request's wall time is split into exclusive phases:
+
+  acquire  waiting for a pooled connection (db.get_db)
+  execute  cursor execute() calls
+  fetch    cursor fetch*() calls, plus row conversion in queries.Report
+  render   template rendering (streamed pages: producing each chunk)
+  other    everything else: routing, view code, writing streamed chunks
+
+Phases nest (a streamed template fetches rows while it renders), and time
+spent in an inner phase is not also counted in the outer one, so the five
+phases of a request always add up to its total. Rows fetched and response
+bytes are recorded per route too.
+
+Recording is a few perf_counter() calls per query and one dict update per
+request. Every worker flushes its counters to METRICS_DIR at most every
+METRICS_FLUSH_INTERVAL seconds (default 5), and /metrics serves the sum over
+all live workers, so any worker can answer the scrape. METRICS=0 turns
+recording off.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+
+from cache import CACHE_DIR
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(CACHE_DIR, "metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+PHASES = ("acquire", "execute", "fetch", "render", "other")
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# name -> (type, help, buckets)
+METRICS = {
+  "app_request_duration_seconds": ("histogram", "Request wall time, first byte of the request to last byte sent.",
+                                   SECONDS_BUCKETS),
+  "app_request_phase_seconds": ("histogram", "Request time spent in each phase; phases add up to the request time.",
+                                SECONDS_BUCKETS),
+  "app_response_rows": ("histogram", "Rows fetched from MySQL per request.", ROWS_BUCKETS),
+  "app_response_bytes": ("histogram", "Response body size.", BYTES_BUCKETS),
+  "app_requests_total": ("counter", "Requests by route and status.", None),
+}
+
+
+def metrics_enabled():
+  return os.getenv("METRICS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+class RequestTimer:
+  """Phase times of one request.
+
+  begin() / end(phase, started) bracket a timed section; a section's time
+  minus that of the sections nested in it goes to its phase.
+  """
+
+  __slots__ = ("started", "phases", "rows", "_stack")
+
+  def __init__(self):
+    self.started = time.perf_counter()
+    self.phases = dict.fromkeys(PHASES, 0.0)
+    self.rows = 0
+    self._stack = []
+
+  def begin(self):
+    self._stack.append(0.0)
+    return time.perf_counter()
+
+  def end(self, phase, started):
+    elapsed = time.perf_counter() - started
+    inner = self._stack.pop()
+    self.phases[phase] += elapsed - inner
+    if self._stack:
+      self._stack[-1] += elapsed
+
+  def phase(self, phase):
+    return _Phase(self, phase)
+
+  def finish(self):
+    total = time.perf_counter() - self.started
+    self.phases["other"] = max(0.0, total - sum(v for k, v in self.phases.items() if k != "other"))
+    return total
+
+
+class _Phase:
+  __slots__ = ("timer", "name", "started")
+
+  def __init__(self, timer, name):
+    self.timer, self.name = timer, name
+
+  def __enter__(self):
+    self.started = self.timer.begin()
+
+  def __exit__(self, *exc):
+    self.timer.end(self.name, self.started)
+
+
+class _NoPhase:
+  def __enter__(self):
+    pass
+
+  def __exit__(self, *exc):
+    pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def current():
+  """The active request's RequestTimer, or None (outside requests, or disabled)."""
+  return g.get("_metrics") if has_request_context() else None
+
+
+def phase(name):
+  """Context manager timing a block as `name` in the current request, if any."""
+  timer = current()
+  return timer.phase(name) if timer is not None else _NO_PHASE
+
+
+def timed(chunks, name):
+  """Pass an iterable through, timing the production of each item as `name`."""
+  timer = current()
+  if timer is None:
+    yield from chunks
+    return
+  it = iter(chunks)
+  try:
+    while True:
+      started = timer.begin()
+      try:
+        chunk = next(it)
+      except StopIteration:
+        return
+      finally:
+        timer.end(name, started)
+      yield chunk
+  finally:
+    if hasattr(chunks, "close"):
+      chunks.close()
+
+
+class MetricsRegistry:
+  """This worker's counters: {(name, labels): [bucket counts..., sum, count]}."""
+
+  def __init__(self, directory, flush_interval):
+    self.directory = directory
+    self.flush_interval = flush_interval
+    self.pid = os.getpid()
+    self._values = {}
+    self._lock = threading.Lock()
+    self._flushed_at = 0.0
+    os.makedirs(directory, exist_ok=True)
+
+  def _observe(self, name, labels, value):
+    buckets = METRICS[name][2]
+    key = (name, labels)
+    series = self._values.get(key)
+    if series is None:
+      series = self._values[key] = [0] * len(buckets) + [0.0, 0]
+    for i, bound in enumerate(buckets):
+      if value <= bound:
+        series[i] += 1
+    series[-2] += value
+    series[-1] += 1
+
+  def record(self, route, status, timer, total, body_bytes):
+    route = (("route", route),)
+    with self._lock:
+      self._observe("app_request_duration_seconds", route, total)
+      for name, seconds in timer.phases.items():
+        self._observe("app_request_phase_seconds", route + (("phase", name),), seconds)
+      self._observe("app_response_rows", route, timer.rows)
+      if body_bytes is not None:
+        self._observe("app_response_bytes", route, body_bytes)
+      key = ("app_requests_total", route + (("status", str(status)),))
+      self._values[key] = self._values.get(key, 0) + 1
+      due = time.monotonic() - self._flushed_at >= self.flush_interval
+    if due:
+      self.flush()
+
+  def snapshot(self):
+    with self._lock:
+      return [[name, list(labels), value if isinstance(value, int) else list(value)]
+              for (name, labels), value in self._values.items()]
+
+  def flush(self):
+    """Write this worker's counters where every worker's /metrics can read them."""
+    self._flushed_at = time.monotonic()
+    path = os.path.join(self.directory, f"{self.pid}.json")
+    fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+      json.dump(self.snapshot(), f)
+    os.replace(tmp, path)
+
+  def collect(self):
+    """Sum the counters of every live worker (this one read fresh)."""
+    self.flush()
+    totals = {}
+    for entry in os.listdir(self.directory):
+      pid, ext = os.path.splitext(entry)
+      if ext != ".json" or not pid.isdigit():
+        continue
+      path = os.path.join(self.directory, entry)
+      if not _alive(int(pid)):
+        _remove_quietly(path)
+        continue
+      try:
+        with open(path) as f:
+          series = json.load(f)
+      except (OSError, ValueError):
+        continue  # being replaced; it is picked up next scrape
+      for name, labels, value in series:
+        if name not in METRICS:
+          continue
+        key = (name, tuple(tuple(pair) for pair in labels))
+        if isinstance(value, int):
+          totals[key] = totals.get(key, 0) + value
+        else:
+          old = totals.get(key)
+          totals[key] = value if old is None else [a + b for a, b in zip(old, value)]
+    return totals
+
+
+def _alive(pid):
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except PermissionError:
+    pass
+  return True
+
+
+def _remove_quietly(path):
+  try:
+    os.remove(path)
+  except OSError:
+    pass
+
+
+def _labels(labels, extra=()):
+  pairs = list(labels) + list(extra)
+  if not pairs:
+    return ""
+  escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+  return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+  return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition(totals):
+  """Render summed counters in the Prometheus text format (version 0.0.4)."""
+  lines = []
+  for name, (kind, help_text, buckets) in METRICS.items():
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for (series_name, labels), value in sorted(totals.items()):
+      if series_name != name:
+        continue
+      if kind == "counter":
+        lines.append(f"{name}{_labels(labels)} {value}")
+        continue
+      for bound, count in zip(buckets, value):
+        lines.append(f"{name}_bucket{_labels(labels, [('le', _number(bound))])} {count}")
+      lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {value[-1]}")
+      lines.append(f"{name}_sum{_labels(labels)} {_number(value[-2])}")
+      lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+  return "\n".join(lines) + "\n"
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+  """Return this process's registry, creating it on first use (and after fork)."""
+  global _registry
+  if _registry is None or _registry.pid != os.getpid():
+    with _registry_lock:
+      if _registry is None or _registry.pid != os.getpid():
+        _registry = MetricsRegistry(METRICS_DIR, METRICS_FLUSH_INTERVAL)
+  return _registry
+
+
+def _counted(chunks, counter):
+  try:
+    for chunk in chunks:
+      counter[0] += len(chunk)
+      yield chunk
+  finally:
+    if hasattr(chunks, "close"):
+      chunks.close()
+
+
+def init_app(app, exempt=()):
+  """Time every request and serve the totals at /metrics.
+
+  Call before any other before_request hook is registered, so the timer
+  also covers those (e.g. dataversion's 304 check).
+  """
+  exempt = set(exempt) | {"metrics"}
+
+  @app.get("/metrics")
+  def metrics():
+    return Response(exposition(get_registry().collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+  if not metrics_enabled():
+    return
+
+  @app.before_request
+  def _start_timer():
+    if request.endpoint not in exempt:
+      g._metrics = RequestTimer()
+
+  # render_template() announces itself with signals; streaming.stream_template
+  # times its chunks with timed() instead
+  def _render_started(sender, **extra):
+    timer = current()
+    if timer is not None:
+      g._metrics_render = timer.begin()
+
+  def _render_done(sender, **extra):
+    timer = current()
+    if timer is not None and "_metrics_render" in g:
+      timer.end("render", g.pop("_metrics_render"))
+
+  before_render_template.connect(_render_started, app, weak=False)
+  template_rendered.connect(_render_done, app, weak=False)
+
+  @app.after_request
+  def _record(resp):
+    # Left on g: a streamed body still fetches and renders under it
+    timer = g.get("_metrics")
+    if timer is None:
+      return resp
+    route, status = request.endpoint or "unmatched", resp.status_code
+    if not resp.is_streamed:
+      body_bytes = resp.calculate_content_length() or 0
+      get_registry().record(route, status, timer, timer.finish(), body_bytes)
+      return resp
+    # Streamed: the body is produced after this hook, so finish when it is sent
+    counter = [0]
+    resp.response = _counted(resp.iter_encoded(), counter)
+    resp.call_on_close(lambda: get_registry().record(route, status, timer, timer.finish(), counter[0]))
+    return resp
@@ -0,0 +1,110 @@
+"""Apply versioned schema migrations on top of create-tables.sql.
+
+Migrations are the NNN_name.sql files in app/migrations, applied in version
+order, each at most once. Applied versions are recorded in SchemaMigrations
+together with a checksum, so an edit to a migration that already ran is
+reported rather than silently ignored.
+
+  python3 migrate.py            # apply everything pending
+  python3 migrate.py --status   # list applied / pending migrations
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+from dotenv import load_dotenv
+
+from sqlscript import run_script
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def discover(directory=MIGRATIONS_DIR):
+  """Return [(version, name, path)] sorted by version."""
+  found = []
+  for filename in os.listdir(directory):
+    m = _FILENAME.match(filename)
+    if m:
+      found.append((int(m.group(1)), m.group(2), os.path.join(directory, filename)))
+  found.sort()
+  versions = [v for v, _, _ in found]
+  if len(versions) != len(set(versions)):
+    raise ValueError(f"duplicate migration version in {directory}")
+  return found
+
+
+def _checksum(text):
+  return hashlib.sha256(text.encode()).hexdigest()
+
+
+def applied(cur):
+  """Return {version: checksum} for migrations already applied."""
+  cur.execute("""
+    CREATE TABLE IF NOT EXISTS SchemaMigrations (
+      version INT NOT NULL PRIMARY KEY,
+      name VARCHAR(255) NOT NULL,
+      checksum CHAR(64) NOT NULL,
+      applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+  """)
+  cur.execute("SELECT version, checksum FROM SchemaMigrations")
+  return dict(cur.fetchall())
+
+
+def migrate(db, directory=MIGRATIONS_DIR, log=print):
+  """Apply pending migrations in order; return the versions applied.
+
+  MySQL commits DDL implicitly, so a migration that fails halfway is not
+  rolled back: fix the cause, undo the statements that did run, then rerun.
+  """
+  cur = db.cursor()
+  try:
+    done = applied(cur)
+    ran = []
+    for version, name, path in discover(directory):
+      with open(path) as f:
+        text = f.read()
+      if version in done:
+        if done[version] != _checksum(text):
+          log(f"warning: {version:03d}_{name} changed since it was applied")
+        continue
+      log(f"applying {version:03d}_{name}")
+      run_script(cur, text)
+      cur.execute("INSERT INTO SchemaMigrations (version, name, checksum) VALUES (%s, %s, %s)",
+                  (version, name, _checksum(text)))
+      db.commit()
+      ran.append(version)
+    return ran
+  finally:
+    cur.close()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--status", action="store_true", help="show migration status without applying")
+  args = parser.parse_args()
+
+  load_dotenv()
+  from db import get_db
+
+  db = get_db()
+  try:
+    if args.status:
+      cur = db.cursor()
+      done = applied(cur)
+      cur.close()
+      for version, name, _ in discover():
+        print(f"{version:03d}_{name}: {'applied' if version in done else 'pending'}")
+      return 0
+    ran = migrate(db)
+    print(f"Applied {len(ran)} migration(s)" if ran else "Schema is up to date")
+    return 0
+  finally:
+    db.close()
+
+
+if __name__ == "__main__":
+  sys.exit(main())
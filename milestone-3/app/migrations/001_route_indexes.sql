@@ -0,0 +1,32 @@
+-- =====================================
+-- Secondary indexes for the app.py route queries
+-- Apply with: python3 app/migrate.py
+-- Plans are checked by: python3 app/plan_check.py
+-- =====================================
+
+-- /salary-bands filters on title, location and term (any prefix of them);
+-- /top-companies lists DISTINCT title ORDER BY title straight off it
+CREATE INDEX idx_job_title_location_term ON JobPosting (title, location, term);
+
+-- /salary-bands ?term=, /avg-salary term filter
+CREATE INDEX idx_job_term ON JobPosting (term);
+
+-- Every report joins Salary on job_id just to read hourly_rate; covering it
+-- saves a clustered-index lookup per salary. (Replaces the implicit
+-- foreign-key index on job_id.)
+CREATE INDEX idx_salary_job_rate ON Salary (job_id, hourly_rate);
+
+-- /avg-salary and /safe-employers group by faculty (and program)
+CREATE INDEX idx_student_faculty_program ON Student (faculty, program);
+
+-- /avg-salary walks students in (faculty, program) order and joins their
+-- placements; covering job_id avoids reading the Placement rows themselves.
+-- (Replaces the implicit foreign-key index on student_id.)
+CREATE INDEX idx_placement_student_job ON Placement (student_id, job_id);
+
+-- /blacklist joins flagged employers to their entries, newest first;
+-- /admin/blacklist-remove deletes by employer_id
+CREATE INDEX idx_blacklist_employer_date ON Blacklist (employer_id, date_added);
+
+-- /blacklist and /safe-employers filter on the (rarely set) flag
+CREATE INDEX idx_employer_blacklist_flag ON Employer (blacklist_flag);
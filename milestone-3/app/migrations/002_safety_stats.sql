@@ -0,0 +1,203 @@
+-- =====================================
+-- Precomputed stats for /safe-employers
+-- Running SUM / COUNT / MIN of hourly_rate over Placement x Salary (one row
+-- per placement per salary report of the placed job), per employer and
+-- faculty and per faculty, kept current by Salary and Placement triggers.
+-- An employer is "safe" for a faculty when none of its rates is below 0.7x
+-- the faculty average, i.e. min_rate >= 0.7 * faculty average.
+-- Check or rebuild with: python3 app/summaries.py --check | --rebuild
+-- =====================================
+
+DROP PROCEDURE IF EXISTS ApplySafetySalaryChange;
+DROP PROCEDURE IF EXISTS ApplySafetyPlacementChange;
+DROP PROCEDURE IF EXISTS RecomputeSafetyMin;
+
+CREATE TABLE EmployerFacultyStats (
+    faculty VARCHAR(100) NOT NULL,
+    employer_id INT NOT NULL,
+    rate_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    n_placements INT NOT NULL DEFAULT 0,
+    min_rate DECIMAL(8,2),
+    PRIMARY KEY (faculty, employer_id),
+    FOREIGN KEY (employer_id)
+        REFERENCES Employer(employer_id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE FacultySalaryStats (
+    faculty VARCHAR(100) NOT NULL PRIMARY KEY,
+    rate_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    n_placements INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+INSERT INTO EmployerFacultyStats (faculty, employer_id, rate_sum, n_placements, min_rate)
+SELECT st.faculty, j.employer_id, SUM(sa.hourly_rate), COUNT(*), MIN(sa.hourly_rate)
+FROM Placement p
+JOIN Student st ON st.student_id = p.student_id
+JOIN Salary sa ON sa.job_id = p.job_id
+JOIN JobPosting j ON j.job_id = p.job_id
+GROUP BY st.faculty, j.employer_id;
+
+INSERT INTO FacultySalaryStats (faculty, rate_sum, n_placements)
+SELECT st.faculty, SUM(sa.hourly_rate), COUNT(*)
+FROM Placement p
+JOIN Student st ON st.student_id = p.student_id
+JOIN Salary sa ON sa.job_id = p.job_id
+GROUP BY st.faculty;
+
+DELIMITER $$
+
+-- The employer's minimum for a faculty (or every faculty) may have been
+-- removed: recompute it from the remaining placements
+CREATE PROCEDURE RecomputeSafetyMin(
+    IN p_employer_id INT,
+    IN p_faculty VARCHAR(100),
+    IN p_removed_rate DECIMAL(8,2)
+)
+BEGIN
+UPDATE EmployerFacultyStats efs
+SET efs.min_rate = (
+    SELECT MIN(sa.hourly_rate)
+    FROM JobPosting j
+    JOIN Placement p ON p.job_id = j.job_id
+    JOIN Student st ON st.student_id = p.student_id
+    JOIN Salary sa ON sa.job_id = j.job_id
+    WHERE j.employer_id = efs.employer_id
+      AND st.faculty = efs.faculty
+)
+WHERE efs.employer_id = p_employer_id
+  AND (p_faculty IS NULL OR efs.faculty = p_faculty)
+  AND efs.min_rate >= p_removed_rate;
+END$$
+
+-- One salary report added (p_sign = 1) or removed (-1): it counts once per
+-- placement of its job
+CREATE PROCEDURE ApplySafetySalaryChange(
+    IN p_job_id INT,
+    IN p_rate DECIMAL(8,2),
+    IN p_sign INT
+)
+BEGIN
+DECLARE emp_id INT;
+
+SELECT employer_id INTO emp_id
+FROM JobPosting
+WHERE job_id = p_job_id;
+
+INSERT INTO EmployerFacultyStats (faculty, employer_id, rate_sum, n_placements, min_rate)
+SELECT st.faculty, emp_id, p_sign * p_rate * COUNT(*), p_sign * COUNT(*), p_rate
+FROM Placement p
+JOIN Student st ON st.student_id = p.student_id
+WHERE p.job_id = p_job_id
+GROUP BY st.faculty
+ON DUPLICATE KEY UPDATE
+rate_sum = rate_sum + VALUES(rate_sum),
+n_placements = n_placements + VALUES(n_placements),
+min_rate = IF(p_sign > 0, LEAST(COALESCE(min_rate, p_rate), p_rate), min_rate);
+
+INSERT INTO FacultySalaryStats (faculty, rate_sum, n_placements)
+SELECT st.faculty, p_sign * p_rate * COUNT(*), p_sign * COUNT(*)
+FROM Placement p
+JOIN Student st ON st.student_id = p.student_id
+WHERE p.job_id = p_job_id
+GROUP BY st.faculty
+ON DUPLICATE KEY UPDATE
+rate_sum = rate_sum + VALUES(rate_sum),
+n_placements = n_placements + VALUES(n_placements);
+
+IF p_sign < 0 THEN
+CALL RecomputeSafetyMin(emp_id, NULL, p_rate);
+END IF;
+END$$
+
+-- One placement added (p_sign = 1) or removed (-1): it counts once per
+-- salary report of its job
+CREATE PROCEDURE ApplySafetyPlacementChange(
+    IN p_job_id INT,
+    IN p_student_id INT,
+    IN p_sign INT
+)
+BEGIN
+DECLARE emp_id INT;
+DECLARE fac VARCHAR(100);
+DECLARE job_sum DECIMAL(14,2);
+DECLARE job_n INT;
+DECLARE job_min DECIMAL(8,2);
+
+SELECT employer_id INTO emp_id
+FROM JobPosting
+WHERE job_id = p_job_id;
+
+SELECT faculty INTO fac
+FROM Student
+WHERE student_id = p_student_id;
+
+SELECT SUM(hourly_rate), COUNT(*), MIN(hourly_rate)
+INTO job_sum, job_n, job_min
+FROM Salary
+WHERE job_id = p_job_id;
+
+IF job_n > 0 THEN
+INSERT INTO EmployerFacultyStats (faculty, employer_id, rate_sum, n_placements, min_rate)
+VALUES (fac, emp_id, p_sign * job_sum, p_sign * job_n, job_min)
+ON DUPLICATE KEY UPDATE
+rate_sum = rate_sum + VALUES(rate_sum),
+n_placements = n_placements + VALUES(n_placements),
+min_rate = IF(p_sign > 0, LEAST(COALESCE(min_rate, job_min), job_min), min_rate);
+
+INSERT INTO FacultySalaryStats (faculty, rate_sum, n_placements)
+VALUES (fac, p_sign * job_sum, p_sign * job_n)
+ON DUPLICATE KEY UPDATE
+rate_sum = rate_sum + VALUES(rate_sum),
+n_placements = n_placements + VALUES(n_placements);
+
+IF p_sign < 0 THEN
+CALL RecomputeSafetyMin(emp_id, fac, job_min);
+END IF;
+END IF;
+END$$
+
+CREATE TRIGGER safety_stats_salary_insert AFTER INSERT ON Salary
+FOR EACH ROW
+BEGIN
+CALL ApplySafetySalaryChange(NEW.job_id, NEW.hourly_rate, 1);
+END$$
+
+CREATE TRIGGER safety_stats_salary_update AFTER UPDATE ON Salary
+FOR EACH ROW
+BEGIN
+IF NOT (NEW.job_id <=> OLD.job_id AND NEW.hourly_rate <=> OLD.hourly_rate) THEN
+CALL ApplySafetySalaryChange(OLD.job_id, OLD.hourly_rate, -1);
+CALL ApplySafetySalaryChange(NEW.job_id, NEW.hourly_rate, 1);
+END IF;
+END$$
+
+CREATE TRIGGER safety_stats_salary_delete AFTER DELETE ON Salary
+FOR EACH ROW
+BEGIN
+CALL ApplySafetySalaryChange(OLD.job_id, OLD.hourly_rate, -1);
+END$$
+
+CREATE TRIGGER safety_stats_placement_insert AFTER INSERT ON Placement
+FOR EACH ROW
+BEGIN
+CALL ApplySafetyPlacementChange(NEW.job_id, NEW.student_id, 1);
+END$$
+
+CREATE TRIGGER safety_stats_placement_update AFTER UPDATE ON Placement
+FOR EACH ROW
+BEGIN
+IF NOT (NEW.job_id <=> OLD.job_id AND NEW.student_id <=> OLD.student_id) THEN
+CALL ApplySafetyPlacementChange(OLD.job_id, OLD.student_id, -1);
+CALL ApplySafetyPlacementChange(NEW.job_id, NEW.student_id, 1);
+END IF;
+END$$
+
+CREATE TRIGGER safety_stats_placement_delete AFTER DELETE ON Placement
+FOR EACH ROW
+BEGIN
+CALL ApplySafetyPlacementChange(OLD.job_id, OLD.student_id, -1);
+END$$
+
+DELIMITER ;
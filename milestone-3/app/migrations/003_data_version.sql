@@ -0,0 +1,14 @@
+-- =====================================
+-- Global data version for ETags / conditional GET (app/dataversion.py)
+-- One row, bumped in the same transaction as every write: by the admin
+-- routes and by data_transform.py after each load.
+-- =====================================
+
+CREATE TABLE DataVersion (
+    id TINYINT NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at DATETIME NOT NULL,
+    CHECK (id = 1)
+) ENGINE=InnoDB;
+
+INSERT INTO DataVersion (id, version, updated_at) VALUES (1, 1, UTC_TIMESTAMP());
@@ -0,0 +1,39 @@
+-- =====================================
+-- Let bulk loads skip the per-row Salary insert triggers
+-- app/bulk.py sets @bulk_salary_load = 1 around its INSERT ... SELECT and
+-- then applies the same summary / auto-flag / safety stat changes with one
+-- set-based statement per table. Every other session (the variable is
+-- per connection and NULL by default) keeps the per-row triggers.
+-- =====================================
+
+DROP TRIGGER IF EXISTS salary_stats_insert;
+DROP TRIGGER IF EXISTS auto_flag_low_pay;
+DROP TRIGGER IF EXISTS safety_stats_salary_insert;
+
+DELIMITER $$
+
+CREATE TRIGGER salary_stats_insert AFTER INSERT ON Salary
+FOR EACH ROW
+BEGIN
+IF @bulk_salary_load IS NULL THEN
+CALL ApplySalaryStatsDelta(NEW.job_id, NEW.hourly_rate, 1);
+END IF;
+END$$
+
+CREATE TRIGGER auto_flag_low_pay AFTER INSERT ON Salary
+FOR EACH ROW
+BEGIN
+IF @bulk_salary_load IS NULL THEN
+CALL ApplyEmployerPayChange(NEW.job_id, NULL, NEW.hourly_rate);
+END IF;
+END$$
+
+CREATE TRIGGER safety_stats_salary_insert AFTER INSERT ON Salary
+FOR EACH ROW
+BEGIN
+IF @bulk_salary_load IS NULL THEN
+CALL ApplySafetySalaryChange(NEW.job_id, NEW.hourly_rate, 1);
+END IF;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,23 @@
+-- =====================================
+-- Slow-query log (app/slowlog.py)
+-- One row per route statement that ran longer than SLOW_QUERY_MS, with its
+-- redacted parameters and the plan captured right after. Rows older than
+-- SLOW_QUERY_RETENTION_DAYS are deleted as new ones arrive.
+-- =====================================
+
+CREATE TABLE SlowQuery (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    logged_at DATETIME(3) NOT NULL,
+    route VARCHAR(100) NULL,
+    request_args VARCHAR(1000) NULL,
+    fingerprint CHAR(40) NOT NULL,
+    statement TEXT NOT NULL,
+    params TEXT NULL,
+    duration_ms DECIMAL(12, 3) NOT NULL,
+    rows_examined BIGINT NULL,
+    rows_sent BIGINT NULL,
+    plan_format VARCHAR(20) NULL,
+    plan MEDIUMTEXT NULL,
+    INDEX idx_slowquery_fingerprint (fingerprint, logged_at),
+    INDEX idx_slowquery_logged_at (logged_at)
+) ENGINE=InnoDB;
@@ -0,0 +1,38 @@
+-- =====================================
+-- Incremental reloads (data_transform.py --incremental)
+-- IngestFile is the manifest: one row per source file, with the SHA-256 of
+-- the contents last loaded. A file whose hash still matches is skipped.
+-- IngestRow has one row per source row that was loaded: the 64-bit hash of
+-- the raw row's values, its occurrence number (for identical rows in the
+-- same file), and the Salary / Student rows made from it. A changed file
+-- only inserts rows whose key is new, and deletes the rows made from keys
+-- that are no longer in it. Rows that were filtered out are recorded with
+-- NULL ids, so they are skipped next time too.
+-- =====================================
+
+CREATE TABLE IngestFile (
+    source_id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    path VARCHAR(500) NOT NULL UNIQUE,
+    content_hash CHAR(64) NULL,
+    size_bytes BIGINT NULL,
+    row_count INT NULL,
+    loaded_at DATETIME NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE IngestRow (
+    source_id INT NOT NULL,
+    row_hash BIGINT UNSIGNED NOT NULL,
+    occurrence INT NOT NULL,
+    salary_id INT NULL,
+    student_id INT NULL,
+    PRIMARY KEY (source_id, row_hash, occurrence),
+    FOREIGN KEY (source_id)
+        REFERENCES IngestFile(source_id)
+        ON DELETE CASCADE,
+    FOREIGN KEY (salary_id)
+        REFERENCES Salary(salary_id)
+        ON DELETE SET NULL,
+    FOREIGN KEY (student_id)
+        REFERENCES Student(student_id)
+        ON DELETE SET NULL
+) ENGINE=InnoDB;
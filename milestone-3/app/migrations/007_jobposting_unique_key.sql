@@ -0,0 +1,27 @@
+-- =====================================
+-- One JobPosting per (employer, title, location, term)
+-- data_transform.py merges each batch from a staging table with
+-- INSERT IGNORE, and resolves job ids by joining on this key, so it has to
+-- be unique. Earlier loads could create duplicates: their salaries and
+-- placements move to the lowest job_id of each group (the update triggers
+-- keep the summary tables in step), then the duplicates are deleted.
+-- =====================================
+
+CREATE TEMPORARY TABLE JobPostingDuplicate AS
+SELECT j.job_id, k.keep_id
+FROM JobPosting j
+JOIN (
+    SELECT employer_id, title, location, term, MIN(job_id) AS keep_id
+    FROM JobPosting
+    GROUP BY employer_id, title, location, term
+    HAVING COUNT(*) > 1
+) k ON k.employer_id = j.employer_id AND k.title = j.title
+   AND k.location <=> j.location AND k.term <=> j.term
+WHERE j.job_id <> k.keep_id;
+
+UPDATE Salary s JOIN JobPostingDuplicate d ON d.job_id = s.job_id SET s.job_id = d.keep_id;
+UPDATE Placement p JOIN JobPostingDuplicate d ON d.job_id = p.job_id SET p.job_id = d.keep_id;
+DELETE j FROM JobPosting j JOIN JobPostingDuplicate d ON d.job_id = j.job_id;
+DROP TEMPORARY TABLE JobPostingDuplicate;
+
+ALTER TABLE JobPosting ADD UNIQUE KEY uq_job_posting (employer_id, title, location, term);
@@ -0,0 +1,24 @@
+-- =====================================
+-- Employer alias map (app/employer_dedup.py)
+-- One row per canonical employer name ("google" for "Google", "Google Inc."
+-- and "The Google Co."), pointing at the employer it belongs to.
+-- data_transform.py looks every incoming name up here before it creates an
+-- employer, and adds an 'exact' row for each new one. employer_dedup.py
+-- --apply links similar names ('fuzzy', with their 3-gram Jaccard score),
+-- and /admin/employer-alias-add pins a name by hand ('manual'); manual rows
+-- are never overwritten. Run `python3 employer_dedup.py --apply` once after
+-- this migration to cover the employers that are already loaded.
+-- =====================================
+
+CREATE TABLE EmployerAlias (
+    alias VARCHAR(255) NOT NULL PRIMARY KEY,
+    employer_id INT NOT NULL,
+    source ENUM('exact', 'fuzzy', 'manual') NOT NULL DEFAULT 'exact',
+    score DECIMAL(4,3) NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_employer_alias_employer (employer_id),
+    FOREIGN KEY (employer_id)
+        REFERENCES Employer(employer_id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE
+) ENGINE=InnoDB;
@@ -0,0 +1,133 @@
+"""Keyset (seek) pagination for the browse routes.
+
+Instead of LIMIT/OFFSET, each page remembers the sort key of its first and
+last row in an opaque token. The next page asks for rows strictly after that
+key, so MySQL seeks straight to it through the index and reads only one page,
+however deep the user has paged.
+"""
+import base64
+import json
+from decimal import Decimal
+
+from flask import request, url_for
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page:
+  """One page of rows plus the tokens to reach its neighbours."""
+
+  def __init__(self, rows, page_size, next_token=None, prev_token=None):
+    self.rows = rows
+    self.page_size = page_size
+    self.next_token = next_token
+    self.prev_token = prev_token
+
+
+def page_size_arg(args, default=DEFAULT_PAGE_SIZE, max_size=MAX_PAGE_SIZE):
+  try:
+    size = int(args.get("page_size", default))
+  except (TypeError, ValueError):
+    size = default
+  return max(1, min(size, max_size))
+
+
+def encode_token(values, direction):
+  data = {"k": [str(v) if isinstance(v, Decimal) else v for v in values], "d": direction}
+  raw = json.dumps(data, separators=(",", ":")).encode()
+  return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token):
+  """Return (key values, "next" | "prev"), or None for a missing/garbled token."""
+  if not token:
+    return None
+  try:
+    data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    values, direction = data["k"], data["d"]
+  except (ValueError, KeyError, TypeError):
+    return None
+  if direction not in ("next", "prev") or not isinstance(values, list):
+    return None
+  return values, direction
+
+
+def seek_clause(columns, values, op):
+  """Expand (a, b) op (x, y) into an OR-chain MySQL can range-scan on."""
+  parts, params = [], []
+  for i, col in enumerate(columns):
+    terms = [f"{c} = %s" for c in columns[:i]] + [f"{col} {op} %s"]
+    parts.append("(" + " AND ".join(terms) + ")")
+    params += list(values[:i]) + [values[i]]
+  return "(" + " OR ".join(parts) + ")", params
+
+
+def page_query(select, where, params, keys, token, page_size, descending=False):
+  """Build the SQL for one keyset page.
+
+  select      SELECT ... FROM ... JOIN ... (no WHERE / ORDER BY / LIMIT)
+  where       list of predicates AND-ed together, with their params
+  keys        ORDER BY columns; the last one must be unique (a primary key)
+
+  Returns (sql, params, cursor) where cursor is the decoded token or None.
+  The query asks for page_size + 1 rows; the extra one only signals that
+  another page exists.
+  """
+  cursor = decode_token(token)
+  if cursor is not None and len(cursor[0]) != len(keys):
+    cursor = None
+  backward = cursor is not None and cursor[1] == "prev"
+  # Walking backwards scans in the opposite order, then flips the page.
+  scan_desc = descending != backward
+
+  where, params = list(where), list(params)
+  if cursor is not None:
+    clause, seek_params = seek_clause(keys, cursor[0], "<" if scan_desc else ">")
+    where.append(clause)
+    params += seek_params
+
+  direction = "DESC" if scan_desc else "ASC"
+  sql = select
+  if where:
+    sql += " WHERE " + " AND ".join(where)
+  sql += " ORDER BY " + ", ".join(f"{k} {direction}" for k in keys) + " LIMIT %s"
+  return sql, params + [page_size + 1], cursor
+
+
+def fetch_page(cur, select, where, params, keys, key_of, token, page_size, descending=False):
+  """Run one keyset page of `select` and return a Page of raw rows.
+
+  key_of maps a fetched row to its values for `keys`; see page_query() for
+  the other arguments.
+  """
+  sql, params, cursor = page_query(select, where, params, keys, token, page_size, descending)
+  cur.execute(sql, params)
+  return page_from_rows(cur.fetchall(), cursor, page_size, key_of)
+
+
+def page_from_rows(rows, cursor, page_size, key_of):
+  """Turn the rows of a page_query() statement into a Page."""
+  backward = cursor is not None and cursor[1] == "prev"
+  has_more = len(rows) > page_size
+  rows = list(rows[:page_size])
+  if backward:
+    rows.reverse()
+
+  next_token = prev_token = None
+  if rows:
+    first, last = key_of(rows[0]), key_of(rows[-1])
+    if backward:
+      next_token = encode_token(last, "next")
+      prev_token = encode_token(first, "prev") if has_more else None
+    else:
+      next_token = encode_token(last, "next") if has_more else None
+      prev_token = encode_token(first, "prev") if cursor is not None else None
+  return Page(rows, page_size, next_token, prev_token)
+
+
+def page_url(token):
+  """URL of the current route with the same arguments but a new cursor."""
+  args = request.args.to_dict()
+  args["cursor"] = token
+  return url_for(request.endpoint, **args)
@@ -0,0 +1,160 @@
+"""EXPLAIN every route query and fail on full scans and filesorts.
+
+Each case below requests a route through the Flask test client, records the
+statements it runs, and EXPLAINs them (FORMAT=JSON) against the configured
+database. A statement fails the check when its plan reads a base table with
+access_type ALL, or sorts with a filesort, unless the case lists that as
+expected (ordering by a computed average, for instance, always sorts).
+
+Run it against a database loaded with realistic data (data_transform.py or a
+bench seed) with migrations applied; on a near-empty database MySQL
+rightly prefers table scans and everything fails.
+
+  python3 plan_check.py           # exit status 1 on any regression
+  python3 plan_check.py --verbose # also print each plan summary
+"""
+import argparse
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# (method, path, form data, allowed) — paths may use the {title}, {location},
+# {term}, {faculty}, {word} and {employer_id} sample values. allowed holds
+# "filesort" and/or "ALL:<table alias>" exceptions.
+CASES = [
+  ("GET", "/employers", None, set()),
+  ("GET", "/salaries?stream=0", None, set()),
+  ("GET", "/low-wage", None, set()),
+  ("GET", "/search", None, set()),
+  ("GET", "/search?q={word}", None, {"filesort"}),
+  ("GET", "/search?q={word}&sort=relevance", None, {"filesort"}),
+  ("GET", "/advanced-search?q={word}&stream=0", None, {"filesort"}),
+  # Summary tables are read whole and ordered by a computed average
+  ("GET", "/avg-by-title", None, {"filesort", "ALL:TitleSalaryStats"}),
+  ("GET", "/avg-by-term", None, {"ALL:TermSalaryStats"}),
+  ("GET", "/top-companies", None, set()),
+  ("POST", "/top-companies", {"role": "{title}"}, {"filesort"}),
+  ("GET", "/avg-salary", None, {"filesort"}),
+  ("GET", "/avg-salary?faculty={faculty}", None, {"filesort"}),
+  ("GET", "/safe-employers", None, {"filesort", "ALL:efs"}),
+  ("GET", "/safe-employers?faculty={faculty}", None, {"filesort"}),
+  ("GET", "/blacklist", None, {"filesort"}),
+  # Window functions sort each partition by rate
+  ("GET", "/salary-bands?title={title}&stream=0", None, {"filesort"}),
+  ("GET", "/salary-bands?title={title}&city={location}&term={term}&stream=0", None, {"filesort"}),
+  ("GET", "/salary-bands?term={term}&stream=0", None, {"filesort"}),
+  # JSON API: same queries, but salary-bands is paged rather than read whole
+  ("GET", "/api/v1/salaries", None, set()),
+  ("GET", "/api/v1/search?q={word}", None, {"filesort"}),
+  ("GET", "/api/v1/top-companies?role={title}", None, {"filesort"}),
+  ("GET", "/api/v1/salary-bands?title={title}", None, {"filesort"}),
+]
+
+
+def sample_values(cur):
+  """Pick real parameter values so the plans reflect actual selectivity."""
+  cur.execute("""
+    SELECT j.title, j.location, j.term, j.employer_id
+    FROM JobPosting j JOIN Salary s ON s.job_id = j.job_id
+    WHERE j.location IS NOT NULL AND j.term IS NOT NULL
+    LIMIT 1
+  """)
+  title, location, term, employer_id = cur.fetchone()
+  cur.execute("SELECT faculty FROM Student LIMIT 1")
+  row = cur.fetchone()
+  words = [w for w in title.split() if len(w) >= 4] or [title]
+  return {
+    "title": title, "location": location, "term": term, "employer_id": employer_id,
+    "faculty": row[0] if row else "Engineering", "word": words[0],
+  }
+
+
+def plan_issues(plan):
+  """Return the set of 'filesort' / 'ALL:<table>' findings in an EXPLAIN JSON plan."""
+  issues = set()
+
+  def walk(node):
+    if isinstance(node, dict):
+      if node.get("using_filesort"):
+        issues.add("filesort")
+      table = node.get("table")
+      if isinstance(table, dict) and table.get("access_type") == "ALL" \
+         and "materialized_from_subquery" not in table:
+        issues.add("ALL:" + table.get("table_name", "?"))
+      for value in node.values():
+        walk(value)
+    elif isinstance(node, list):
+      for value in node:
+        walk(value)
+
+  walk(plan)
+  return issues
+
+
+def explain(cur, sql, params):
+  cur.execute("EXPLAIN FORMAT=JSON " + sql, params or ())
+  return json.loads(cur.fetchone()[0])
+
+
+def run(client, cur, cases, samples, verbose=False):
+  from db import watch_statements
+
+  failures = 0
+  for method, path, data, allowed in cases:
+    path = path.format(**samples)
+    data = {k: v.format(**samples) for k, v in data.items()} if data else None
+    with watch_statements() as statements:
+      resp = client.open(path, method=method, data=data)
+      resp.get_data()  # drain streamed bodies so every query runs
+    if resp.status_code != 200:
+      print(f"FAIL {method} {path}: HTTP {resp.status_code}")
+      failures += 1
+      continue
+    reads = [(sql, params) for sql, params in statements
+             if sql.lstrip().upper().startswith(("SELECT", "WITH"))]
+    bad = []
+    for sql, params in reads:
+      issues = plan_issues(explain(cur, sql, params))
+      unexpected = issues - allowed
+      if unexpected:
+        bad.append((sql, sorted(unexpected)))
+      elif verbose:
+        print(f"       {' '.join(sql.split())[:90]}  {sorted(issues) or 'clean'}")
+    status = "FAIL" if bad else "ok  "
+    print(f"{status} {method} {path} ({len(reads)} queries)")
+    for sql, unexpected in bad:
+      print(f"       {', '.join(unexpected)}: {' '.join(sql.split())[:160]}")
+    failures += bool(bad)
+  return failures
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--verbose", action="store_true")
+  args = parser.parse_args()
+
+  load_dotenv()
+  # Every request must reach the database
+  os.environ["RESPONSE_CACHE"] = "0"
+  os.environ["SEARCH_INDEX"] = "0"
+  from app import app
+  from db import get_db
+
+  db = get_db()
+  cur = db.cursor()
+  try:
+    for table in ("Employer", "JobPosting", "Salary", "Blacklist", "Student", "Placement"):
+      cur.execute(f"ANALYZE TABLE {table}")
+      cur.fetchall()
+    failures = run(app.test_client(), cur, CASES, sample_values(cur), args.verbose)
+  finally:
+    cur.close()
+    db.close()
+  print(f"{failures} route(s) with plan regressions" if failures else "All route plans OK")
+  return 1 if failures else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
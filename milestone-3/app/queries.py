@@ -0,0 +1,394 @@
+"""SQL for the report routes, shared by the HTML pages, /api/v1 and asgi.py.
+
+Each report is a function of an open (tuple) cursor and the request's
+parameters that returns its rows as dicts, or a keyset Page of them, so the
+HTML and JSON routes only differ in how they serialise the result. Reports
+that the HTML side streams also expose their query spec (the keyword
+arguments of pagination.fetch_page) and row converter separately.
+
+Underneath, every report is a Report: one statement plus the function that
+turns its rows into the result. report_name.build(*args) returns it without
+running anything, which is how the async app (aiodb.run) executes the same
+SQL on its own driver.
+
+FIELDS lists each report's row keys, in order, for field selection.
+"""
+import json
+from functools import wraps
+
+from fulltext import FulltextQuery
+import metrics
+from pagination import Page, page_from_rows, page_query
+from search_index import get_search_index, search_index_enabled
+
+FIELDS = {
+  "salaries": ["name", "title", "hourly_rate"],
+  "search": ["title", "employer", "location", "term", "hourly_rate"],
+  "advanced_search": ["title", "employer", "location", "hourly_rate", "score"],
+  "avg_by_title": ["title", "avg_hourly", "n_reports"],
+  "avg_by_term": ["term", "avg_hourly", "n_reports"],
+  "top_companies": ["company", "avg_hourly", "n_reports"],
+  "roles": ["title"],
+  "avg_salary": ["faculty", "program", "avg_hourly_rate", "n_placements"],
+  "safe_employers": ["employer", "faculty", "avg_hourly_rate", "n_placements"],
+  "salary_bands": ["employer", "title", "location", "term", "hourly_rate", "pct_rank", "decile"],
+  "blacklist": ["employer_name", "reason", "date_added"],
+}
+
+
+class Report:
+  """One statement and the conversion of its rows into the report's result.
+
+  sql=None means the result is known without a query (convert([])).
+  """
+
+  def __init__(self, sql, params=(), convert=None):
+    self.sql = sql
+    self.params = list(params)
+    self.convert = convert or list
+
+  def run(self, cur):
+    if self.sql is None:
+      return self.convert([])
+    cur.execute(self.sql, self.params)
+    with metrics.phase("fetch"):
+      return self.convert(cur.fetchall())
+
+
+def report(build):
+  """Turn build(*args) -> Report into the report function fn(cur, *args).
+
+  The builder stays reachable as fn.build.
+  """
+  @wraps(build)
+  def run(cur, *args):
+    return build(*args).run(cur)
+  run.build = build
+  return run
+
+
+def _dicts(name):
+  fields = FIELDS[name]
+  return lambda rows: [dict(zip(fields, r)) for r in rows]
+
+
+# --- keyset-paged reports ----------------------------------------------------
+
+def employers_query(token):
+  """Employers with blacklist_flag, keyset-paged on employer_id."""
+  query = dict(select="""
+    SELECT employer_id, name, blacklist_flag
+    FROM Employer
+  """, where=[], params=[], keys=["employer_id"], key_of=lambda r: [r[0]], token=token)
+  convert = lambda r: {"employer_id": r[0], "name": r[1], "blacklist_flag": int(r[2])}
+  return query, convert
+
+
+def low_wage_query(threshold, token):
+  """Salaries below threshold, lowest first, keyset-paged on (hourly_rate, salary_id)."""
+  query = dict(select="""
+    SELECT e.name, s.hourly_rate, s.salary_id
+    FROM Employer e
+    JOIN JobPosting j ON e.employer_id = j.employer_id
+    JOIN Salary s ON j.job_id = s.job_id
+  """, where=["s.hourly_rate < %s"], params=[threshold], keys=["s.hourly_rate", "s.salary_id"],
+    key_of=lambda r: [r[1], r[2]], token=token)
+  convert = lambda r: {"name": r[0], "hourly_rate": float(r[1])}
+  return query, convert
+
+
+def salaries_query(token):
+  """Jobs with salary info, by $ desc, keyset-paged on (hourly_rate, salary_id)."""
+  query = dict(select="""
+    SELECT e.name, j.title, s.hourly_rate, s.salary_id
+    FROM Employer e
+    JOIN JobPosting j ON e.employer_id = j.employer_id
+    JOIN Salary s ON j.job_id = s.job_id
+  """, where=[], params=[], keys=["s.hourly_rate", "s.salary_id"], key_of=lambda r: [r[2], r[3]],
+    token=token, descending=True)
+  convert = lambda r: {"name": r[0], "title": r[1], "hourly_rate": float(r[2])}
+  return query, convert
+
+
+def advanced_search_query(ft, token):
+  """FULLTEXT matches ranked by weighted relevance, paged on (score, salary_id)."""
+  select, params = ft.ranked_select()
+  query = dict(select=select, where=[], params=params, keys=["score", "salary_id"],
+               key_of=lambda r: [r[6], r[5]], token=token, descending=True)
+  convert = lambda r: {"title": r[0], "employer": r[1], "location": r[2], "hourly_rate": r[4],
+                       "score": r[6] / 1000}
+  return query, convert
+
+
+def paged(query, convert, page_size):
+  """Report for one keyset page of a query spec, rows converted by convert."""
+  sql, params, cursor = page_query(query["select"], query["where"], query["params"], query["keys"],
+                                   query["token"], page_size, query.get("descending", False))
+
+  def to_page(rows):
+    page = page_from_rows(rows, cursor, page_size, query["key_of"])
+    page.rows = [convert(r) for r in page.rows]
+    return page
+  return Report(sql, params, to_page)
+
+
+def fetch(cur, query, convert, page_size):
+  return paged(query, convert, page_size).run(cur)
+
+
+_SEARCH_SELECT = """
+    SELECT j.title, e.name AS employer, j.location, j.term, s.hourly_rate, s.salary_id, j.job_id
+    FROM JobPosting j
+    {join}
+    JOIN Employer  e ON j.employer_id = e.employer_id
+    JOIN Salary    s ON j.job_id       = s.job_id
+  """
+
+# The index's matches reach MySQL as one JSON array of [job_id, score] pairs,
+# joined like a table, so any number of matched jobs is a single parameter
+_INDEX_SELECT = """
+    SELECT j.title, e.name AS employer, j.location, j.term, s.hourly_rate, s.salary_id, hit.score
+    FROM JSON_TABLE(%s, '$[*]' COLUMNS (job_id INT PATH '$[0]', score DOUBLE PATH '$[1]')) hit
+    JOIN JobPosting j ON j.job_id       = hit.job_id
+    JOIN Employer   e ON j.employer_id = e.employer_id
+    JOIN Salary     s ON j.job_id       = s.job_id
+  """
+
+
+def _search_row(r):
+  return {"title": r[0], "employer": r[1], "location": r[2], "term": r[3], "hourly_rate": float(r[4])}
+
+
+@report
+def search(keyword, sort, mode, token, page_size):
+  """Keyword search, by pay (default) or sort="relevance".
+
+  Matching goes through the in-memory index when SEARCH_INDEX=1, else the
+  FULLTEXT indexes.
+  """
+  if keyword and search_index_enabled():
+    return _search_from_index(keyword, sort, token, page_size)
+  ft = FulltextQuery(keyword, mode)
+  if ft and sort == "relevance":
+    select, params = ft.ranked_select()
+    keys, key_of = ["score", "salary_id"], lambda r: [r[6], r[5]]
+  else:
+    join, params = ft.candidate_join() if ft else ("", [])
+    select = _SEARCH_SELECT.format(join=join)
+    keys, key_of = ["s.hourly_rate", "s.salary_id"], lambda r: [r[4], r[5]]
+  query = dict(select=select, where=[], params=params, keys=keys, key_of=key_of, token=token, descending=True)
+  return paged(query, _search_row, page_size)
+
+
+def _search_from_index(keyword, sort, token, page_size):
+  """MySQL joins every matched job, with its score, to its salary rows.
+
+  Both orders page over salary rows; relevance on (score, salary_id).
+  """
+  hits = get_search_index().search(keyword)
+  if not hits:
+    return Report(None, convert=lambda rows: Page([], page_size))
+  if sort == "relevance":
+    keys, key_of = ["hit.score", "s.salary_id"], lambda r: [r[6], r[5]]
+  else:
+    keys, key_of = ["s.hourly_rate", "s.salary_id"], lambda r: [r[4], r[5]]
+  query = dict(select=_INDEX_SELECT, where=[], params=[json.dumps(hits)], keys=keys, key_of=key_of,
+               token=token, descending=True)
+  return paged(query, _search_row, page_size)
+
+
+def salary_bands_query(title, city, term):
+  """Percentile rank and decile of each salary within its (title, location, term).
+
+  Keyset-paged on (hourly_rate, salary_id); the HTML page reads it whole.
+  """
+  filters, params = [], []
+
+  if title:
+    filters.append("j.title = %s")
+    params.append(title)
+
+  if city:
+    filters.append("j.location = %s")
+    params.append(city)
+
+  if term:
+    filters.append("j.term = %s")
+    params.append(term)
+
+  where_clause = " AND ".join(filters) if filters else "1=1"
+
+  select = f"""
+    WITH filtered AS (
+      SELECT
+        j.title,
+        j.location,
+        j.term,
+        e.name AS employer,
+        s.hourly_rate,
+        s.salary_id
+      FROM JobPosting j
+      JOIN Employer e ON j.employer_id = e.employer_id
+      JOIN Salary   s ON j.job_id      = s.job_id
+      WHERE {where_clause}
+        AND s.hourly_rate IS NOT NULL
+    ),
+    ranked AS (
+      SELECT
+        employer,
+        title,
+        location,
+        term,
+        hourly_rate,
+        salary_id,
+        PERCENT_RANK() OVER (
+          PARTITION BY title, location, term
+          ORDER BY hourly_rate
+        ) AS pct_rank,
+        NTILE(10) OVER (
+          PARTITION BY title, location, term
+          ORDER BY hourly_rate
+        ) AS decile
+      FROM filtered
+    )
+    SELECT
+      employer,
+      title,
+      location,
+      term,
+      hourly_rate,
+      ROUND(pct_rank, 2) AS pct_rank,
+      decile,
+      salary_id
+    FROM ranked
+  """
+  query = dict(select=select, where=[], params=params, keys=["hourly_rate", "salary_id"],
+               key_of=lambda r: [r[4], r[7]], token=None)
+  convert = lambda r: dict(zip(FIELDS["salary_bands"], r))
+  return query, convert
+
+
+# --- aggregate reports (small, returned whole) ------------------------------
+
+@report
+def avg_by_title(kw):
+  """Average salary by job title, from the trigger-maintained TitleSalaryStats."""
+  like = f"%{kw}%" if kw else "%"
+  return Report("""
+    SELECT title,
+           ROUND(rate_sum / n_reports, 2) AS avg_hourly,
+           n_reports
+    FROM TitleSalaryStats
+    WHERE title LIKE %s
+      AND n_reports > 0
+    ORDER BY avg_hourly DESC, n_reports DESC, title
+  """, (like,), lambda rows: [{"title": r[0], "avg_hourly": float(r[1]), "n_reports": int(r[2])} for r in rows])
+
+
+@report
+def avg_by_term():
+  """Average salary by term, from the trigger-maintained TermSalaryStats."""
+  return Report("""
+    SELECT NULLIF(term, '') AS term,
+           ROUND(rate_sum / n_reports, 2) AS avg_hourly,
+           n_reports
+    FROM TermSalaryStats
+    WHERE n_reports > 0
+    ORDER BY term
+  """, (), lambda rows: [{"term": r[0], "avg_hourly": float(r[1]), "n_reports": int(r[2])} for r in rows])
+
+
+@report
+def top_companies(role):
+  """Top 20 employers for a job title by average rate: a primary-key range on title."""
+  return Report("""
+    SELECT e.name AS company,
+           ROUND(t.rate_sum / t.n_reports, 2) AS avg_hourly,
+           t.n_reports
+    FROM TitleEmployerSalaryStats t
+    JOIN Employer e ON e.employer_id = t.employer_id
+    WHERE t.title = %s
+      AND t.n_reports > 0
+    ORDER BY avg_hourly DESC, n_reports DESC
+    LIMIT 20;
+  """, (role,), _dicts("top_companies"))
+
+
+@report
+def roles():
+  return Report("SELECT DISTINCT title FROM JobPosting ORDER BY title;", (), _dicts("roles"))
+
+
+@report
+def avg_salary(fac, prog, term):
+  """Average salary by faculty and program, optionally filtered on all three."""
+  fac_like = f"%{fac}%" if fac else "%"
+  prog_like = f"%{prog}%" if prog else "%"
+  term_like = f"%{term}%" if term else "%"
+
+  return Report("""
+    SELECT s.faculty,
+           s.program,
+           ROUND(AVG(sa.hourly_rate), 2) AS avg_hourly_rate,
+           COUNT(*) AS n_placements
+    FROM Placement p
+    JOIN Student s ON p.student_id = s.student_id
+    JOIN Salary sa ON p.job_id = sa.job_id
+    JOIN JobPosting j ON p.job_id = j.job_id
+    WHERE s.faculty LIKE %s
+      AND s.program LIKE %s
+      AND j.term LIKE %s
+    GROUP BY s.faculty, s.program
+    ORDER BY avg_hourly_rate DESC, n_placements DESC
+  """, (fac_like, prog_like, term_like), lambda rows: [
+    {
+      "faculty": r[0],
+      "program": r[1],
+      "avg_hourly_rate": float(r[2]),
+      "n_placements": int(r[3])
+    }
+    for r in rows
+  ])
+
+
+@report
+def safe_employers(faculty):
+  """Non-blacklisted employers with 2+ placements and no rate below 0.7x the faculty average.
+
+  EmployerFacultyStats / FacultySalaryStats are trigger-maintained
+  (migrations/002_safety_stats.sql), so the rate condition is just a check
+  on the employer's minimum rate.
+  """
+  faculty_filter = "AND efs.faculty = %s" if faculty else ""
+  params = [faculty] if faculty else []
+
+  return Report(f"""
+    SELECT
+      e.name AS employer,
+      efs.faculty,
+      ROUND(efs.rate_sum / efs.n_placements, 2) AS avg_hourly_rate,
+      efs.n_placements
+    FROM EmployerFacultyStats efs
+    JOIN FacultySalaryStats fs
+      ON fs.faculty = efs.faculty
+    JOIN Employer e
+      ON e.employer_id = efs.employer_id
+    WHERE efs.n_placements >= 2
+      AND efs.min_rate >= 0.7 * fs.rate_sum / fs.n_placements
+      AND e.blacklist_flag = FALSE
+      {faculty_filter}
+    ORDER BY avg_hourly_rate DESC, n_placements DESC;
+  """, params, _dicts("safe_employers"))
+
+
+@report
+def blacklist():
+  return Report("""
+    SELECT e.name AS employer_name,
+           b.reason,
+           b.date_added
+    FROM Employer e
+    JOIN Blacklist b ON e.employer_id = b.employer_id
+    WHERE e.blacklist_flag = TRUE
+    ORDER BY b.date_added DESC, e.name
+  """, (), _dicts("blacklist"))
@@ -0,0 +1,336 @@
+"""In-process inverted index for the /search keyword box.
+
+Each worker keeps the title, employer name and location of every job with at
+least one salary in memory and answers keyword queries from it, ranked by
+BM25, without a round trip to MySQL. Partial words match through prefix and
+trigram postings ("eng" -> engineer, "soft" -> microsoft).
+
+The index loads from a gzipped JSON snapshot (built from the database if
+there is none) when the app starts, and then follows Salary by salary_id: a
+background thread pulls the jobs behind any newer salaries every
+SEARCH_INDEX_REFRESH seconds, and /admin/add-salary applies its own change
+straight away. Following salary_id only sees new salaries, so an edited
+title, a renamed employer or a deleted posting stays as it was until the
+next full rebuild, every SEARCH_INDEX_REBUILD seconds (default an hour),
+which re-reads every job and rewrites the snapshot.
+
+  python3 search_index.py --build               # write a fresh snapshot
+  python3 search_index.py --query "data toronto"
+"""
+import argparse
+import bisect
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_index.json.gz")
+
+# Same field emphasis as the FULLTEXT ranking in fulltext.py
+FIELD_WEIGHTS = (3.0, 2.0, 1.0)  # title, employer, location
+K1, B = 1.2, 0.75
+# Score multiplier for words matched only by prefix / by substring
+PREFIX_FACTOR, SUBSTRING_FACTOR = 0.7, 0.4
+MIN_PREFIX = 2
+
+_TOKEN = re.compile(r"\w+")
+
+# Jobs behind every salary newer than salary_id %s (0 for all of them).
+# Changes to jobs already indexed are not seen; see SearchIndex.rebuild().
+DOCS_SQL = """
+  SELECT j.job_id, j.title, e.name, j.location, MAX(s.salary_id)
+  FROM Salary s
+  JOIN JobPosting j ON j.job_id = s.job_id
+  JOIN Employer   e ON e.employer_id = j.employer_id
+  WHERE s.salary_id > %s
+  GROUP BY j.job_id, j.title, e.name, j.location
+"""
+
+
+def tokenize(text):
+  return _TOKEN.findall((text or "").lower())
+
+
+def _trigrams(term):
+  return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class SearchIndex:
+  """BM25 over (title, employer, location), with field-weighted term counts."""
+
+  def __init__(self):
+    self.docs = {}                      # job_id -> (title, employer, location)
+    self.salary_hwm = 0                 # highest salary_id seen
+    self._lengths = {}                  # job_id -> weighted length
+    self._total_length = 0.0
+    self._postings = defaultdict(dict)  # term -> {job_id: weighted tf}
+    self._vocab = []                    # sorted terms, for prefix lookups
+    self._trigrams = defaultdict(set)   # trigram -> terms containing it
+    self._norms = None                  # job_id -> BM25 length normaliser
+    self._lock = threading.RLock()
+    self.refreshed_at = None
+
+  def __len__(self):
+    return len(self.docs)
+
+  def add(self, job_id, title, employer, location):
+    """Index a job, replacing any earlier version of it."""
+    with self._lock:
+      if job_id in self.docs:
+        if self.docs[job_id] == (title, employer, location):
+          return
+        self.remove(job_id)
+      tf = defaultdict(float)
+      for weight, field in zip(FIELD_WEIGHTS, (title, employer, location)):
+        for term in tokenize(field):
+          tf[term] += weight
+      for term, freq in tf.items():
+        if term not in self._postings:
+          bisect.insort(self._vocab, term)
+          for tri in _trigrams(term):
+            self._trigrams[tri].add(term)
+        self._postings[term][job_id] = freq
+      self.docs[job_id] = (title, employer, location)
+      self._lengths[job_id] = sum(tf.values())
+      self._total_length += self._lengths[job_id]
+      self._norms = None
+
+  def remove(self, job_id):
+    with self._lock:
+      fields = self.docs.pop(job_id, None)
+      if fields is None:
+        return
+      self._total_length -= self._lengths.pop(job_id)
+      self._norms = None
+      for term in {t for field in fields for t in tokenize(field)}:
+        postings = self._postings[term]
+        postings.pop(job_id, None)
+        if not postings:
+          del self._postings[term]
+          del self._vocab[bisect.bisect_left(self._vocab, term)]
+          for tri in _trigrams(term):
+            self._trigrams[tri].discard(term)
+
+  def _expand(self, word):
+    """[(term, factor)] for the indexed terms a query word should match."""
+    matches = {}
+    if word in self._postings:
+      matches[word] = 1.0
+    if len(word) >= MIN_PREFIX:
+      i = bisect.bisect_left(self._vocab, word)
+      while i < len(self._vocab) and self._vocab[i].startswith(word):
+        matches.setdefault(self._vocab[i], PREFIX_FACTOR)
+        i += 1
+    if not matches and len(word) >= 3:
+      grams = [self._trigrams.get(tri, set()) for tri in _trigrams(word)]
+      for term in set.intersection(*sorted(grams, key=len)):
+        if word in term:
+          matches[term] = SUBSTRING_FACTOR
+    return matches.items()
+
+  def _doc_norms(self):
+    if self._norms is None:
+      avg_len = self._total_length / len(self.docs)
+      self._norms = {job_id: K1 * (1 - B + B * length / avg_len) for job_id, length in self._lengths.items()}
+    return self._norms
+
+  def search(self, query, limit=None):
+    """Return [(job_id, score)] for jobs matching any query word, best first."""
+    with self._lock:
+      n = len(self.docs)
+      if not n:
+        return []
+      norms = self._doc_norms()
+      scores = defaultdict(float)
+      for word in dict.fromkeys(tokenize(query)):
+        best = {}
+        for term, factor in self._expand(word):
+          postings = self._postings[term]
+          idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+          w = factor * idf * (K1 + 1)
+          for job_id, tf in postings.items():
+            s = w * tf / (tf + norms[job_id])
+            if s > best.get(job_id, 0.0):
+              best[job_id] = s
+        for job_id, s in best.items():
+          scores[job_id] += s
+    hits = sorted(((job_id, round(s, 6)) for job_id, s in scores.items()), key=lambda h: (-h[1], -h[0]))
+    return hits[:limit] if limit else hits
+
+  def stats(self):
+    return {
+      "docs": len(self.docs),
+      "terms": len(self._postings),
+      "trigrams": len(self._trigrams),
+      "salary_hwm": self.salary_hwm,
+      "refreshed_at": self.refreshed_at,
+    }
+
+  # --- persistence and deltas ---------------------------------------------
+
+  def apply(self, rows):
+    """Index (job_id, title, employer, location, salary_id) rows from DOCS_SQL."""
+    with self._lock:
+      for job_id, title, employer, location, salary_id in rows:
+        self.add(job_id, title, employer, location)
+        self.salary_hwm = max(self.salary_hwm, salary_id)
+      self.refreshed_at = time.time()
+
+  def refresh(self, db):
+    """Pull in jobs behind salaries added since the last refresh."""
+    cur = db.cursor()
+    try:
+      cur.execute(DOCS_SQL, (self.salary_hwm,))
+      self.apply(cur.fetchall())
+    finally:
+      cur.close()
+
+  def rebuild(self, db):
+    """Re-read every job, picking up the edits and deletions refresh() cannot see."""
+    fresh = SearchIndex()
+    fresh.refresh(db)
+    with self._lock:
+      # Anything applied meanwhile is newer than fresh.salary_hwm, so the next refresh() catches it again
+      self.__dict__.update({name: value for name, value in vars(fresh).items() if name != "_lock"})
+
+  def save(self, path):
+    with self._lock:
+      data = {
+        "version": SNAPSHOT_VERSION,
+        "salary_hwm": self.salary_hwm,
+        "docs": [[job_id, *fields] for job_id, fields in self.docs.items()],
+      }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+      json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+  @classmethod
+  def load(cls, path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+      data = json.load(f)
+    if data.get("version") != SNAPSHOT_VERSION:
+      raise ValueError(f"{path}: unsupported snapshot version {data.get('version')}")
+    index = cls()
+    for job_id, title, employer, location in data["docs"]:
+      index.add(job_id, title, employer, location)
+    index.salary_hwm = data["salary_hwm"]
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def search_index_enabled():
+  return os.getenv("SEARCH_INDEX", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _refresh_loop(index, interval, rebuild_interval, path):
+  from db import get_db
+
+  rebuilt = time.monotonic()
+  while True:
+    time.sleep(interval)
+    try:
+      db = get_db()
+      try:
+        if rebuild_interval > 0 and time.monotonic() - rebuilt >= rebuild_interval:
+          index.rebuild(db)
+          index.save(path)
+          rebuilt = time.monotonic()
+        else:
+          index.refresh(db)
+      finally:
+        db.close()
+    except Exception:  # keep serving the last good index
+      logging.getLogger(__name__).exception("search index refresh failed")
+
+
+def init_app(app):
+  """Load the index when the app starts instead of on the first /search."""
+  if search_index_enabled():
+    get_search_index()
+
+
+def get_search_index():
+  """Return this process's index, loading it on first use (and after fork)."""
+  global _index
+  if _index is None or _index.pid != os.getpid():
+    with _index_lock:
+      if _index is None or _index.pid != os.getpid():
+        path = os.getenv("SEARCH_INDEX_SNAPSHOT", DEFAULT_SNAPSHOT)
+        _index = _open_index(path)
+        _index.pid = os.getpid()
+        interval = float(os.getenv("SEARCH_INDEX_REFRESH", "30"))
+        rebuild_interval = float(os.getenv("SEARCH_INDEX_REBUILD", "3600"))
+        if interval > 0:
+          threading.Thread(target=_refresh_loop, args=(_index, interval, rebuild_interval, path),
+                           name="search-index-refresh", daemon=True).start()
+  return _index
+
+
+def _open_index(path):
+  from db import get_db
+
+  try:
+    index = SearchIndex.load(path)
+  except (OSError, ValueError):
+    index = None
+  db = get_db()
+  try:
+    if index is None:
+      index = SearchIndex()
+      index.refresh(db)
+      index.save(path)
+    else:
+      index.refresh(db)  # catch up from the snapshot's high-water mark
+  finally:
+    db.close()
+  return index
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--snapshot", default=os.getenv("SEARCH_INDEX_SNAPSHOT", DEFAULT_SNAPSHOT))
+  mode = parser.add_mutually_exclusive_group(required=True)
+  mode.add_argument("--build", action="store_true", help="rebuild the snapshot from the database")
+  mode.add_argument("--query", help="search the snapshot and print the top hits")
+  args = parser.parse_args()
+
+  if args.build:
+    from dotenv import load_dotenv
+    load_dotenv()
+    from db import get_db
+
+    index = SearchIndex()
+    db = get_db()
+    try:
+      index.refresh(db)
+    finally:
+      db.close()
+    index.save(args.snapshot)
+    stats = index.stats()
+    print(f"Indexed {stats['docs']} jobs, {stats['terms']} terms -> {args.snapshot}")
+    return 0
+
+  index = SearchIndex.load(args.snapshot)
+  start = time.perf_counter()
+  hits = index.search(args.query)
+  took = (time.perf_counter() - start) * 1000
+  print(f"{len(hits)} jobs in {took:.3f} ms")
+  for job_id, score in hits[:10]:
+    title, employer, location = index.docs[job_id]
+    print(f"  {score:8.3f}  #{job_id}  {title} | {employer} | {location}")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,295 @@
+"""Slow-query log with plan capture.
+
+Every statement run on a pooled cursor is timed (db._ObservedCursor). One
+that takes longer than SLOW_QUERY_MS (default 500) is logged with:
+
+  * the route and its query arguments, which for /salary-bands and
+    /safe-employers are the filter combination that produced the plan
+  * the SQL, its fingerprint, and its parameters, redacted unless
+    SLOW_QUERY_PARAMS=full (numbers and dates are kept, strings are
+    replaced by their length)
+  * the duration, and for reads the rows examined and returned by the plan
+
+Capturing the plan means re-running the statement, so it happens on a
+background thread with its own pooled connection, never on the request
+path. A SELECT gets EXPLAIN ANALYZE (MySQL 8.0.18+, bounded by
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS), and rows examined come from
+performance_schema. A write only gets EXPLAIN FORMAT=TREE, since ANALYZE
+would apply it. A given statement and parameter set is explained at most
+once per SLOW_QUERY_EXPLAIN_INTERVAL seconds, and at most
+SLOW_QUERY_EXPLAINS_PER_MIN plans are captured per worker per minute. Past
+either limit the entry is still logged, without a plan.
+
+Entries go to the SlowQuery table (migrations/005_slow_query_log.sql).
+Rows older than SLOW_QUERY_RETENTION_DAYS are deleted as new ones arrive.
+Until that migration is applied, entries go to a rotating JSON-lines file
+at SLOW_QUERY_LOG instead. /admin/slow-queries summarises this worker's
+recent entries. SLOW_QUERIES=0 turns the log off.
+
+For unbuffered (streamed) cursors only execute() is timed, i.e. the time to
+the first row; the sort or aggregation that makes such a query slow happens
+before that.
+"""
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import mysql.connector as mysql
+from flask import has_request_context, request
+
+from cache import CACHE_DIR
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_PARAMS = os.getenv("SLOW_QUERY_PARAMS", "redact").strip().lower()
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+SLOW_QUERY_EXPLAINS_PER_MIN = int(os.getenv("SLOW_QUERY_EXPLAINS_PER_MIN", "6"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "30000"))
+SLOW_QUERY_RETENTION_DAYS = int(os.getenv("SLOW_QUERY_RETENTION_DAYS", "14"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join(CACHE_DIR, "slow-queries.log"))
+
+_INSERT_SQL = """
+  INSERT INTO SlowQuery (logged_at, route, request_args, fingerprint, statement, params,
+                         duration_ms, rows_examined, rows_sent, plan_format, plan)
+  VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+_PRUNE_SQL = "DELETE FROM SlowQuery WHERE logged_at < UTC_TIMESTAMP() - INTERVAL %s DAY LIMIT 10000"
+_ROWS_EXAMINED_SQL = """
+  SELECT ROWS_EXAMINED FROM performance_schema.events_statements_history
+  WHERE THREAD_ID = PS_CURRENT_THREAD_ID() AND SQL_TEXT LIKE 'EXPLAIN ANALYZE%'
+  ORDER BY EVENT_ID DESC LIMIT 1
+"""
+_ACTUAL_ROWS = re.compile(r"actual time=[\d.]+\.\.[\d.]+ rows=([\d.]+) loops=(\d+)")
+_NO_SUCH_TABLE = 1146
+
+# Set on the capture thread, whose own EXPLAINs must not be logged
+_local = threading.local()
+
+
+def slow_queries_enabled():
+  return os.getenv("SLOW_QUERIES", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def fingerprint(sql):
+  return hashlib.sha1(" ".join(sql.split()).encode()).hexdigest()
+
+
+def _plain(value):
+  if isinstance(value, Decimal):
+    return float(value)
+  if isinstance(value, (datetime, date)):
+    return value.isoformat()
+  if isinstance(value, (bytes, bytearray)):
+    return f"<bytes:{len(value)}>"
+  return value
+
+
+def redact(params):
+  """JSON-safe copy of params; strings become '<str:N>' unless SLOW_QUERY_PARAMS=full."""
+  if params is None:
+    return None
+  if SLOW_QUERY_PARAMS == "full":
+    clean = _plain
+  else:
+    clean = lambda v: f"<str:{len(v)}>" if isinstance(v, str) else _plain(v)
+  if isinstance(params, dict):
+    return {k: clean(v) for k, v in params.items()}
+  return [clean(v) for v in params]
+
+
+def explain(cur, sql, params):
+  """Return (format, plan text, rows examined, rows sent) for one statement."""
+  is_read = sql.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH")
+  if is_read:
+    try:
+      cur.execute(f"SET SESSION max_execution_time = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+      cur.execute("EXPLAIN ANALYZE " + sql, params or ())
+      plan = "\n".join(row[0] for row in cur.fetchall())
+      match = _ACTUAL_ROWS.search(plan)
+      rows_sent = round(float(match.group(1)) * int(match.group(2))) if match else None
+      try:
+        cur.execute(_ROWS_EXAMINED_SQL)
+        row = cur.fetchone()
+        rows_examined = row[0] if row else None
+      except mysql.errors.Error:
+        rows_examined = None  # performance_schema disabled or not readable
+      return "analyze", plan, rows_examined, rows_sent
+    except mysql.errors.ProgrammingError:
+      pass  # no EXPLAIN ANALYZE before MySQL 8.0.18: fall back to the estimate
+    finally:
+      cur.execute("SET SESSION max_execution_time = DEFAULT")
+  cur.execute("EXPLAIN FORMAT=TREE " + sql, params or ())
+  return "tree", "\n".join(row[0] for row in cur.fetchall()), None, None
+
+
+class SlowQueryLog:
+  """This worker's slow statements: recent entries and the capture thread."""
+
+  def __init__(self, threshold_ms, log_path):
+    self.threshold = threshold_ms / 1000
+    self.log_path = log_path
+    self.pid = os.getpid()
+    self.recent = deque(maxlen=200)
+    self.logged = 0
+    self.dropped = 0
+    self.explained = 0
+    self.sink = "table"
+    self._queue = queue.Queue(maxsize=100)
+    self._lock = threading.Lock()
+    self._last_explained = {}  # (fingerprint, params) -> monotonic time
+    self._explain_times = deque()
+    self._pruned_at = 0.0
+    self._thread = None
+    self._file = None
+
+  def observe(self, sql, params, seconds):
+    """Called after every statement; logs it if it was slow."""
+    if seconds < self.threshold or getattr(_local, "capturing", False):
+      return
+    entry = {
+      "logged_at": datetime.now(timezone.utc).replace(tzinfo=None),
+      "route": request.endpoint if has_request_context() else None,
+      "request_args": request.query_string.decode("utf-8", "replace")[:1000] if has_request_context() else None,
+      "fingerprint": fingerprint(sql),
+      "statement": sql,
+      "params": redact(params),
+      "duration_ms": round(1000 * seconds, 3),
+      "rows_examined": None,
+      "rows_sent": None,
+      "plan_format": None,
+      "plan": None,
+    }
+    with self._lock:
+      self.logged += 1
+      self.recent.append(entry)
+      explain_params = params if self._should_explain(entry["fingerprint"], params) else None
+    try:
+      self._queue.put_nowait((entry, sql, explain_params))
+    except queue.Full:
+      with self._lock:
+        self.dropped += 1
+      return
+    self._ensure_thread()
+
+  def _should_explain(self, fp, params):
+    now = time.monotonic()
+    key = (fp, repr(params))
+    if now - self._last_explained.get(key, -SLOW_QUERY_EXPLAIN_INTERVAL) < SLOW_QUERY_EXPLAIN_INTERVAL:
+      return False
+    while self._explain_times and now - self._explain_times[0] > 60:
+      self._explain_times.popleft()
+    if len(self._explain_times) >= SLOW_QUERY_EXPLAINS_PER_MIN:
+      return False
+    self._explain_times.append(now)
+    self._last_explained[key] = now
+    return True
+
+  def _ensure_thread(self):
+    if self._thread is None:
+      with self._lock:
+        if self._thread is None:
+          self._thread = threading.Thread(target=self._run, name="slow-query-log", daemon=True)
+          self._thread.start()
+
+  def _run(self):
+    _local.capturing = True
+    while True:
+      entry, sql, params = self._queue.get()
+      try:
+        self._capture(entry, sql, params)
+      except Exception:  # keep the thread alive; the entry is already in recent
+        logging.getLogger(__name__).exception("slow query capture failed")
+
+  def _capture(self, entry, sql, params):
+    from db import get_pool
+
+    conn = get_pool().acquire()
+    cur = conn.cursor()
+    try:
+      if params is not None:
+        try:
+          entry["plan_format"], entry["plan"], entry["rows_examined"], entry["rows_sent"] = explain(cur, sql, params)
+          with self._lock:
+            self.explained += 1
+        except mysql.errors.Error as err:
+          entry["plan_format"], entry["plan"] = "error", str(err)
+      if self.sink == "table":
+        self._store(conn, cur, entry)
+      if self.sink == "file":
+        self._write_file(entry)
+    finally:
+      cur.close(); conn.close()
+
+  def _store(self, conn, cur, entry):
+    try:
+      cur.execute(_INSERT_SQL, (
+        entry["logged_at"], entry["route"], entry["request_args"], entry["fingerprint"], entry["statement"],
+        json.dumps(entry["params"]), entry["duration_ms"], entry["rows_examined"], entry["rows_sent"],
+        entry["plan_format"], entry["plan"],
+      ))
+      if time.monotonic() - self._pruned_at > 3600:
+        cur.execute(_PRUNE_SQL, (SLOW_QUERY_RETENTION_DAYS,))
+        self._pruned_at = time.monotonic()
+      conn.commit()
+    except mysql.errors.ProgrammingError as err:
+      if err.errno != _NO_SUCH_TABLE:
+        raise
+      self.sink = "file"  # migration 005 not applied yet
+
+  def _write_file(self, entry):
+    if self._file is None:
+      os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+      self._file = logging.getLogger(f"{__name__}.{self.pid}")
+      self._file.propagate = False
+      self._file.setLevel(logging.INFO)
+      self._file.addHandler(logging.handlers.RotatingFileHandler(
+        self.log_path, maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"))
+    self._file.info(json.dumps({**entry, "logged_at": entry["logged_at"].isoformat()}))
+
+  def stats(self):
+    """Recent slow statements grouped by fingerprint, slowest first."""
+    with self._lock:
+      entries = list(self.recent)
+      summary = {"threshold_ms": 1000 * self.threshold, "logged": self.logged, "dropped": self.dropped,
+                 "explained": self.explained, "sink": self.sink if self.sink == "table" else self.log_path}
+    groups = {}
+    for e in entries:
+      g = groups.setdefault(e["fingerprint"], {
+        "fingerprint": e["fingerprint"], "statement": " ".join(e["statement"].split())[:300],
+        "count": 0, "max_ms": 0.0, "total_ms": 0.0, "routes": {}, "last_plan": None,
+      })
+      g["count"] += 1
+      g["max_ms"] = max(g["max_ms"], e["duration_ms"])
+      g["total_ms"] += e["duration_ms"]
+      route = f"{e['route']}?{e['request_args']}" if e["request_args"] else e["route"]
+      g["routes"][route] = g["routes"].get(route, 0) + 1
+      if e["plan"] is not None:
+        g["last_plan"] = {"format": e["plan_format"], "plan": e["plan"],
+                          "rows_examined": e["rows_examined"], "rows_sent": e["rows_sent"]}
+    for g in groups.values():
+      g["avg_ms"] = round(g.pop("total_ms") / g["count"], 3)
+    return {**summary, "by_statement": sorted(groups.values(), key=lambda g: g["max_ms"], reverse=True)}
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_slow_log():
+  """Return this process's SlowQueryLog (None if disabled), creating it on first use (and after fork)."""
+  global _log
+  if not slow_queries_enabled():
+    return None
+  if _log is None or _log.pid != os.getpid():
+    with _log_lock:
+      if _log is None or _log.pid != os.getpid():
+        _log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_LOG)
+  return _log
@@ -0,0 +1,67 @@
+"""Run .sql scripts (create-tables.sql, migrations) through mysql.connector.
+
+The connector executes one statement at a time and knows nothing about the
+mysql client's DELIMITER command, which our trigger and procedure
+definitions rely on, so scripts are split here first.
+"""
+import re
+
+_DELIMITER = re.compile(r"DELIMITER\s+(\S+)[ \t]*(?:\r?\n|$)", re.IGNORECASE)
+
+
+def split_statements(text):
+  """Split a script into statements, honouring DELIMITER, quotes and comments."""
+  statements, buf = [], []
+  delimiter = ";"
+  i, n = 0, len(text)
+  at_line_start = True
+  while i < n:
+    if at_line_start:
+      j = i
+      while j < n and text[j] in " \t":
+        j += 1
+      m = _DELIMITER.match(text, j)
+      if m:
+        delimiter = m.group(1)
+        i = m.end()
+        continue
+    ch = text[i]
+    at_line_start = ch == "\n"
+
+    if ch in "'\"`":
+      j = i + 1
+      while j < n and text[j] != ch:
+        j += 2 if text[j] == "\\" else 1
+      buf.append(text[i:j + 1])
+      i = j + 1
+      continue
+    if text.startswith("--", i) and (i + 2 == n or text[i + 2] in " \t\r\n") or ch == "#":
+      j = text.find("\n", i)
+      i = n if j < 0 else j
+      continue
+    if text.startswith("/*", i):
+      j = text.find("*/", i + 2)
+      i = n if j < 0 else j + 2
+      continue
+    if text.startswith(delimiter, i):
+      stmt = "".join(buf).strip()
+      if stmt:
+        statements.append(stmt)
+      buf = []
+      i += len(delimiter)
+      continue
+    buf.append(ch)
+    i += 1
+
+  stmt = "".join(buf).strip()
+  if stmt:
+    statements.append(stmt)
+  return statements
+
+
+def run_script(cur, text):
+  """Execute every statement of a script, consuming any result sets."""
+  for stmt in split_statements(text):
+    cur.execute(stmt)
+    if cur.with_rows:
+      cur.fetchall()
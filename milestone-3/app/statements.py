@@ -0,0 +1,188 @@
+"""Server-side prepared statements for the hot route queries.
+
+Sent as text, every query is parsed and planned by MySQL on every request.
+A StatementCursor (PooledConnection.statement_cursor()) instead prepares a
+statement the PREPARE_AFTER-th time this process runs its exact SQL text,
+keeps the prepared cursor on the pooled connection, and from then on only
+sends the parameters. One-off texts (e.g. IN lists of varying length)
+never reach that count and keep using the text protocol.
+
+Prepared cursors live with the physical connection, so a recycled or
+reconnected connection starts empty and re-prepares on first use. If the
+server has dropped a statement anyway (ER_UNKNOWN_STMT_HANDLER,
+ER_NEED_REPREPARE) it is prepared again and the execute retried once.
+
+Every statement's text-protocol and prepared timings are kept in REGISTRY;
+/admin/statement-stats reports them with the estimated parse time saved.
+"""
+import os
+import threading
+import time
+
+import mysql.connector as mysql
+
+PREPARE_AFTER = int(os.getenv("PREPARE_AFTER", "2"))
+PREPARED_PER_CONNECTION = int(os.getenv("PREPARED_PER_CONNECTION", "64"))
+_REPREPARE_ERRNOS = (1243, 1615)  # unknown statement handler, need reprepare
+
+
+def prepared_statements_enabled():
+  return os.getenv("PREPARED_STATEMENTS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+class StatementStats:
+  __slots__ = ("sql", "text_runs", "text_s", "prepares", "reprepares", "first_runs_s", "reuses", "reuse_s")
+
+  def __init__(self, sql):
+    self.sql = sql
+    self.text_runs = 0
+    self.text_s = 0.0
+    self.prepares = 0
+    self.reprepares = 0
+    self.first_runs_s = 0.0  # prepare + first execute
+    self.reuses = 0
+    self.reuse_s = 0.0
+
+  def as_dict(self):
+    text_ms = 1000 * self.text_s / self.text_runs if self.text_runs else None
+    reuse_ms = 1000 * self.reuse_s / self.reuses if self.reuses else None
+    saved = self.reuses * max(0.0, text_ms - reuse_ms) if text_ms is not None and reuse_ms is not None else None
+    return {
+      "statement": " ".join(self.sql.split())[:160],
+      "text_runs": self.text_runs,
+      "text_ms_avg": round(text_ms, 3) if text_ms is not None else None,
+      "prepares": self.prepares,
+      "reprepares": self.reprepares,
+      "first_run_ms_avg": round(1000 * self.first_runs_s / self.prepares, 3) if self.prepares else None,
+      "reuses": self.reuses,
+      "reuse_ms_avg": round(reuse_ms, 3) if reuse_ms is not None else None,
+      # (text-protocol time - prepared re-execute time) per reuse
+      "est_parse_ms_saved": round(saved, 1) if saved is not None else None,
+    }
+
+
+class StatementRegistry:
+  """Process-wide statement counts and timings, keyed by SQL text."""
+
+  def __init__(self):
+    self._stats = {}
+    self._lock = threading.Lock()
+
+  def get(self, sql):
+    stats = self._stats.get(sql)
+    if stats is None:
+      with self._lock:
+        stats = self._stats.setdefault(sql, StatementStats(sql))
+    return stats
+
+  def record(self, stats, field, seconds, count_field):
+    with self._lock:
+      setattr(stats, field, getattr(stats, field) + seconds)
+      setattr(stats, count_field, getattr(stats, count_field) + 1)
+
+  def stats(self):
+    with self._lock:
+      rows = [s.as_dict() for s in self._stats.values()]
+    rows.sort(key=lambda r: r["est_parse_ms_saved"] or 0, reverse=True)
+    return {
+      "statements": len(rows),
+      "prepared": sum(1 for r in rows if r["prepares"]),
+      "est_parse_ms_saved": round(sum(r["est_parse_ms_saved"] or 0 for r in rows), 1),
+      "by_statement": rows,
+    }
+
+
+REGISTRY = StatementRegistry()
+
+
+class StatementCursor:
+  """Cursor-like object over one pooled connection's prepared statements.
+
+  Results are read in full on execute(), so several prepared cursors can
+  share the connection; fetch*() then serve the buffered rows.
+  """
+
+  def __init__(self, conn, prepared):
+    self._conn = conn
+    self._prepared = prepared  # the connection's OrderedDict: sql -> (sql, cursor)
+    self._text = None
+    self._rows = []
+    self.rowcount = -1
+    self.lastrowid = None
+
+  def _text_cursor(self):
+    if self._text is None:
+      self._text = self._conn.cursor(buffered=True)
+    return self._text
+
+  def _prepare(self, sql):
+    cur = self._conn.cursor(prepared=True)
+    self._prepared[sql] = (sql, cur)
+    while len(self._prepared) > PREPARED_PER_CONNECTION:
+      _, (_, old) = self._prepared.popitem(last=False)
+      old.close()
+    return sql, cur
+
+  def execute(self, sql, params=None):
+    stats = REGISTRY.get(sql)
+    entry = self._prepared.get(sql)
+    if entry is None and stats.text_runs < PREPARE_AFTER:
+      cur = self._text_cursor()
+      start = time.perf_counter()
+      cur.execute(sql, params)
+      self._finish(cur)
+      REGISTRY.record(stats, "text_s", time.perf_counter() - start, "text_runs")
+      return
+
+    first = entry is None
+    # Always pass the text object the cursor was prepared with: the
+    # connector only re-prepares when handed a different one.
+    sql, cur = entry if entry else self._prepare(sql)
+    self._prepared.move_to_end(sql)
+    start = time.perf_counter()
+    try:
+      cur.execute(sql, params or ())
+    except mysql.errors.DatabaseError as err:
+      if err.errno not in _REPREPARE_ERRNOS:
+        raise
+      self._prepared.pop(sql, None)
+      sql, cur = self._prepare(sql)
+      cur.execute(sql, params or ())
+      REGISTRY.record(stats, "first_runs_s", 0.0, "reprepares")
+      first = True
+    self._finish(cur)
+    if first:
+      REGISTRY.record(stats, "first_runs_s", time.perf_counter() - start, "prepares")
+    else:
+      REGISTRY.record(stats, "reuse_s", time.perf_counter() - start, "reuses")
+
+  def _finish(self, cur):
+    self._rows = list(cur.fetchall()) if cur.with_rows else []
+    self.rowcount = cur.rowcount
+    self.lastrowid = cur.lastrowid
+
+  def executemany(self, sql, seq_params):
+    cur = self._text_cursor()
+    cur.executemany(sql, seq_params)
+    self._rows, self.rowcount, self.lastrowid = [], cur.rowcount, cur.lastrowid
+
+  def fetchall(self):
+    rows, self._rows = self._rows, []
+    return rows
+
+  def fetchmany(self, size=1):
+    rows, self._rows = self._rows[:size], self._rows[size:]
+    return rows
+
+  def fetchone(self):
+    return self._rows.pop(0) if self._rows else None
+
+  def __iter__(self):
+    return iter(self.fetchall())
+
+  def close(self):
+    # The prepared cursors stay with the connection for the next request
+    if self._text is not None:
+      self._text.close()
+      self._text = None
+    self._rows = []
@@ -0,0 +1,148 @@
+"""Streamed rendering of large result pages.
+
+A RowStream reads rows from an unbuffered cursor in fetchmany() chunks while
+stream_template() renders them, so the browser receives the page
+header as soon as the first chunk arrives and worker memory stays bounded by
+the chunk size rather than by the number of matching rows.
+"""
+import os
+
+from flask import Response, current_app, stream_with_context
+
+import metrics
+from pagination import Page, encode_token, fetch_page, page_query
+
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+STREAM_MAX_PAGE_SIZE = int(os.getenv("STREAM_MAX_PAGE_SIZE", "5000"))
+STREAM_FLUSH_BYTES = int(os.getenv("STREAM_FLUSH_BYTES", "16384"))
+
+
+def streaming_enabled(args):
+  """Stream unless turned off globally (STREAM_RESULTS=0) or per request (?stream=0)."""
+  flag = args.get("stream", os.getenv("STREAM_RESULTS", "1"))
+  return flag.strip().lower() not in ("0", "false", "no", "off")
+
+
+def stream_template(template_name, **context):
+  """Like flask.stream_template, but coalesces output into ~16 KB writes.
+
+  Jinja yields one small string per template event; handing those to the
+  WSGI server one by one costs a write per cell and makes large pages far
+  slower to download than the buffered render.
+  """
+  app = current_app._get_current_object()
+  app.update_template_context(context)
+  events = app.jinja_env.get_template(template_name).generate(context)
+  return Response(stream_with_context(metrics.timed(_coalesce(events, STREAM_FLUSH_BYTES), "render")))
+
+
+def _coalesce(pieces, flush_bytes):
+  buf, size = [], 0
+  for piece in pieces:
+    buf.append(piece)
+    size += len(piece)
+    if size >= flush_bytes:
+      yield "".join(buf)
+      buf, size = [], 0
+  if buf:
+    yield "".join(buf)
+
+
+class RowStream:
+  """Single-use iterator over an executed, unbuffered cursor.
+
+  The first chunk is fetched eagerly so templates can still test
+  `{% if rows %}`. Iterating converts each row with `convert`; rows past
+  `limit` are read but not yielded (they only tell us another page exists).
+  The cursor and connection are released when iteration ends, or discarded
+  if the client goes away before the result was fully read.
+  """
+
+  def __init__(self, db, cur, convert=None, limit=None, chunk_size=STREAM_CHUNK_SIZE):
+    self._db = db
+    self._cur = cur
+    self._convert = convert or (lambda row: row)
+    self._chunk_size = chunk_size
+    self._drained = False
+    self.limit = limit
+    self.count = 0
+    self.has_more = False
+    self.last = None
+    self._chunk = cur.fetchmany(chunk_size)
+    self.first = self._chunk[0] if self._chunk else None
+    if not self._chunk:
+      self._drained = True
+      self.close()
+
+  def __bool__(self):
+    return self.first is not None
+
+  def __iter__(self):
+    chunk, self._chunk = self._chunk, None
+    try:
+      while chunk:
+        for raw in chunk:
+          if self.limit is not None and self.count >= self.limit:
+            self.has_more = True
+            continue
+          self.count += 1
+          self.last = raw
+          yield self._convert(raw)
+        chunk = self._cur.fetchmany(self._chunk_size)
+      self._drained = True
+    finally:
+      self.close()
+
+  def close(self):
+    db, self._db = self._db, None
+    if db is None:
+      return
+    if self._drained:
+      self._cur.close()
+      db.close()
+    else:
+      db.discard()
+
+
+class StreamedPage:
+  """A keyset Page whose rows are a RowStream.
+
+  next_token is only known once the stream has been consumed, which is fine
+  for templates that render the pager below the table.
+  """
+
+  def __init__(self, stream, page_size, key_of, cursor):
+    self.rows = stream
+    self.page_size = page_size
+    self._key_of = key_of
+    self._cursor = cursor
+
+  @property
+  def prev_token(self):
+    if self._cursor is None or self.rows.first is None:
+      return None
+    return encode_token(self._key_of(self.rows.first), "prev")
+
+  @property
+  def next_token(self):
+    if not self.rows.has_more:
+      return None
+    return encode_token(self._key_of(self.rows.last), "next")
+
+
+def stream_page(db, cur, select, where, params, keys, key_of, token, page_size,
+                convert, descending=False):
+  """Streaming counterpart of pagination.fetch_page().
+
+  Forward pages stream straight from the cursor. Backward pages have to be
+  reversed before rendering, so they are fetched buffered (they are at most
+  one page long) and the connection is released right away.
+  """
+  sql, query_params, cursor = page_query(select, where, params, keys, token, page_size, descending)
+  if cursor is not None and cursor[1] == "prev":
+    page = fetch_page(cur, select, where, params, keys, key_of, token, page_size, descending)
+    cur.close(); db.close()
+    return Page([convert(r) for r in page.rows], page_size, page.next_token, page.prev_token)
+
+  cur.execute(sql, query_params)
+  return StreamedPage(RowStream(db, cur, convert, limit=page_size), page_size, key_of, cursor)
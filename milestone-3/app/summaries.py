@@ -0,0 +1,221 @@
+"""Check or rebuild the trigger-maintained salary summary tables.
+
+The Salary triggers in create-tables.sql keep TermSalaryStats,
+TitleSalaryStats, TitleEmployerSalaryStats and EmployerPayStats up to date
+row by row, and the Salary and Placement triggers from
+migrations/002_safety_stats.sql do the same for EmployerFacultyStats and
+FacultySalaryStats. This script recomputes them from the base tables to
+verify they agree, or to repopulate them after a bulk change the triggers
+cannot see (cascaded deletes, edits to JobPosting or Student).
+
+A rebuild also brings the automatic low-pay Blacklist entries and
+Employer.blacklist_flag in line with the recomputed low_pay_flag, since the
+triggers only act when an employer's flag flips. An automatic entry an admin
+removed from an employer that is still under $20/hour comes back.
+
+  python3 summaries.py --check     # report drift; exit status 1 if any
+  python3 summaries.py --rebuild   # recompute every summary table
+"""
+import argparse
+import sys
+from decimal import Decimal
+
+from dotenv import load_dotenv
+
+import dataversion
+from cache import invalidate
+
+# Each summary: table, key columns, value columns (a sum, then the count),
+# and the full recompute (keys then values, in that order) it must equal.
+STAT_COLUMNS = ["rate_sum", "n_reports"]
+
+SUMMARIES = [
+  ("TermSalaryStats", ["term"], STAT_COLUMNS, """
+    SELECT COALESCE(j.term, '') AS term,
+           SUM(s.hourly_rate) AS rate_sum,
+           COUNT(*) AS n_reports
+    FROM Salary s
+    JOIN JobPosting j ON j.job_id = s.job_id
+    GROUP BY COALESCE(j.term, '')
+  """),
+  ("TitleSalaryStats", ["title"], STAT_COLUMNS, """
+    SELECT j.title,
+           SUM(s.hourly_rate) AS rate_sum,
+           COUNT(*) AS n_reports
+    FROM Salary s
+    JOIN JobPosting j ON j.job_id = s.job_id
+    GROUP BY j.title
+  """),
+  ("TitleEmployerSalaryStats", ["title", "employer_id"], STAT_COLUMNS, """
+    SELECT j.title,
+           j.employer_id,
+           SUM(s.hourly_rate) AS rate_sum,
+           COUNT(*) AS n_reports
+    FROM Salary s
+    JOIN JobPosting j ON j.job_id = s.job_id
+    GROUP BY j.title, j.employer_id
+  """),
+  ("EmployerPayStats", ["employer_id"], STAT_COLUMNS + ["min_rate", "low_pay_flag"], """
+    SELECT j.employer_id,
+           SUM(s.hourly_rate) AS rate_sum,
+           COUNT(*) AS n_reports,
+           MIN(s.hourly_rate) AS min_rate,
+           ROUND(AVG(s.hourly_rate), 2) < 20.00 AS low_pay_flag
+    FROM Salary s
+    JOIN JobPosting j ON j.job_id = s.job_id
+    GROUP BY j.employer_id
+  """),
+  # Safety stats count one row per placement per salary of the placed job
+  ("EmployerFacultyStats", ["faculty", "employer_id"], ["rate_sum", "n_placements", "min_rate"], """
+    SELECT st.faculty,
+           j.employer_id,
+           SUM(sa.hourly_rate) AS rate_sum,
+           COUNT(*) AS n_placements,
+           MIN(sa.hourly_rate) AS min_rate
+    FROM Placement p
+    JOIN Student st ON st.student_id = p.student_id
+    JOIN Salary sa ON sa.job_id = p.job_id
+    JOIN JobPosting j ON j.job_id = p.job_id
+    GROUP BY st.faculty, j.employer_id
+  """),
+  ("FacultySalaryStats", ["faculty"], ["rate_sum", "n_placements"], """
+    SELECT st.faculty,
+           SUM(sa.hourly_rate) AS rate_sum,
+           COUNT(*) AS n_placements
+    FROM Placement p
+    JOIN Student st ON st.student_id = p.student_id
+    JOIN Salary sa ON sa.job_id = p.job_id
+    GROUP BY st.faculty
+  """),
+]
+
+
+# After EmployerPayStats is recomputed: exactly one automatic entry per
+# low-pay employer (create-tables.sql: ApplyEmployerPayChange, bulk.py's
+# _APPLY_SQL), and every employer flagged iff it has a Blacklist entry.
+AUTO_FLAG = "bl.reason = 'Auto-flagged for low average pay' AND bl.added_by = 'admin@system.com'"
+
+RECONCILE_SQL = [
+  f"""
+  DELETE bl FROM Blacklist bl
+  LEFT JOIN EmployerPayStats eps ON eps.employer_id = bl.employer_id
+  WHERE {AUTO_FLAG} AND NOT COALESCE(eps.low_pay_flag, FALSE)
+  """,
+  # Merged employers can end up with one each
+  f"""
+  DELETE bl FROM Blacklist bl
+  JOIN Blacklist older ON older.employer_id = bl.employer_id AND older.blacklist_id < bl.blacklist_id
+                      AND older.reason = bl.reason AND older.added_by = bl.added_by
+  WHERE {AUTO_FLAG}
+  """,
+  f"""
+  INSERT INTO Blacklist (employer_id, reason, date_added, added_by)
+  SELECT eps.employer_id, 'Auto-flagged for low average pay', CURDATE(), 'admin@system.com'
+  FROM EmployerPayStats eps
+  WHERE eps.low_pay_flag
+    AND NOT EXISTS (SELECT 1 FROM Blacklist bl WHERE bl.employer_id = eps.employer_id AND {AUTO_FLAG})
+  """,
+  """
+  UPDATE Employer e
+  SET e.blacklist_flag = EXISTS (SELECT 1 FROM Blacklist b WHERE b.employer_id = e.employer_id)
+  """,
+]
+
+
+def _drift_sql(table, keys, values, recompute):
+  # Keys are matched in SQL, under the columns' collation (case-insensitive,
+  # trailing spaces ignored) just as the primary key and GROUP BY match them
+  on = " AND ".join(f"st.{k} <=> ex.{k}" for k in keys)
+  same = " AND ".join(f"st.{v} <=> ex.{v}" for v in values)
+  st_values, ex_values = (", ".join(f"{side}.{v} AS {side}_{v}" for v in values) for side in ("st", "ex"))
+  return f"""
+    WITH st AS (SELECT {", ".join(keys + values)} FROM {table} WHERE {values[1]} <> 0),
+         ex AS ({recompute})
+    SELECT {", ".join(f"st.{k}" for k in keys)}, {st_values}, {ex_values}
+    FROM st LEFT JOIN ex ON {on}
+    WHERE NOT ({same})
+    UNION ALL
+    SELECT {", ".join(f"ex.{k}" for k in keys)}, {", ".join("NULL" for _ in values)}, {ex_values}
+    FROM ex LEFT JOIN st ON {on}
+    WHERE st.{keys[0]} IS NULL
+  """
+
+
+def _stats(row):
+  # The count (values[1]) is only NULL for a key missing on that side
+  return None if row[1] is None else tuple(None if v is None else Decimal(v) for v in row)
+
+
+def check(cur, summaries=SUMMARIES):
+  """Return {table: [(key, stored, expected), ...]} for every mismatch."""
+  drift = {}
+  for table, keys, values, recompute in summaries:
+    cur.execute(_drift_sql(table, keys, values, recompute))
+    n, m = len(keys), len(keys) + len(values)
+    bad = [(tuple(r[:n]), _stats(r[n:m]), _stats(r[m:])) for r in cur.fetchall()]
+    if bad:
+      drift[table] = sorted(bad, key=lambda row: str(row[0]))
+  return drift
+
+
+def recompute(cur, summaries=SUMMARIES):
+  """Refill each summary table, reconcile the automatic blacklist and bump the data version.
+
+  Runs in the caller's transaction; rebuild() for a standalone one.
+  """
+  for table, keys, values, sql in summaries:
+    cur.execute(f"DELETE FROM {table}")
+    cur.execute(f"INSERT INTO {table} ({', '.join(keys + values)}) {sql}")
+  for sql in RECONCILE_SQL:
+    cur.execute(sql)
+  dataversion.bump(cur)
+
+
+def rebuild(db, summaries=SUMMARIES):
+  """Replace each summary table's contents with a full recompute."""
+  cur = db.cursor()
+  try:
+    db.start_transaction()
+    recompute(cur, summaries)
+    db.commit()
+  except Exception:
+    db.rollback()
+    raise
+  finally:
+    cur.close()
+  invalidate("Salary", "Blacklist")
+  dataversion.notify()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  mode = parser.add_mutually_exclusive_group(required=True)
+  mode.add_argument("--check", action="store_true", help="compare summaries against a full recompute")
+  mode.add_argument("--rebuild", action="store_true", help="recompute all summary tables")
+  args = parser.parse_args()
+
+  load_dotenv()
+  from db import get_db
+
+  db = get_db()
+  try:
+    if args.rebuild:
+      rebuild(db)
+      print("Rebuilt: " + ", ".join(summary[0] for summary in SUMMARIES))
+      return 0
+
+    cur = db.cursor()
+    drift = check(cur)
+    cur.close()
+    for table, *_ in SUMMARIES:
+      rows = drift.get(table, [])
+      print(f"{table}: {'OK' if not rows else f'{len(rows)} mismatched keys'}")
+      for key, stored, expected in rows[:10]:
+        print(f"  {key}: stored={stored} expected={expected}")
+    return 1 if drift else 0
+  finally:
+    db.close()
+
+
+if __name__ == "__main__":
+  sys.exit(main())
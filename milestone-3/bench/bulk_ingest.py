@@ -0,0 +1,102 @@
+"""Throughput of /admin/salaries/bulk against one-at-a-time /admin/add-salary.
+
+Run the Flask app (python3 app/app.py) against a database you do not mind
+adding salaries to, then:
+
+  python3 bench/bulk_ingest.py                      # 50k rows, CSV
+  python3 bench/bulk_ingest.py --rows 200000 --format ndjson --batch-size 10000
+  python3 bench/bulk_ingest.py --compare 500        # also time 500 single POSTs
+
+Job ids are sampled from the database the app uses (DB_HOST / DB_USER /
+DB_PASS / DB_NAME, as for the app).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+
+import mysql.connector as mysql
+from dotenv import load_dotenv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def job_ids():
+  conn = mysql.connect(
+    host=os.getenv("DB_HOST", "127.0.0.1"),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASS", ""),
+    database=os.getenv("DB_NAME", "coop_salaries"),
+    auth_plugin="mysql_native_password",
+  )
+  cur = conn.cursor()
+  cur.execute("SELECT job_id FROM JobPosting")
+  ids = [r[0] for r in cur.fetchall()]
+  conn.close()
+  return ids
+
+
+def make_body(ids, rows, fmt, seed):
+  rng = random.Random(seed)
+  records = [(rng.choice(ids), round(rng.uniform(15, 60), 2), rng.choice([35, 37, 40])) for _ in range(rows)]
+  if fmt == "csv":
+    lines = ["job_id,hourly_rate,hours_per_week"] + [f"{j},{r},{h}" for j, r, h in records]
+  else:
+    lines = [json.dumps({"job_id": j, "hourly_rate": r, "hours_per_week": h}) for j, r, h in records]
+  return ("\n".join(lines) + "\n").encode(), records
+
+
+def post(target, path, body, content_type):
+  conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=3600)
+  start = time.perf_counter()
+  conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+  resp = conn.getresponse()
+  data = resp.read()
+  elapsed = time.perf_counter() - start
+  conn.close()
+  return resp.status, data, elapsed
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--url", default="http://127.0.0.1:5000")
+  parser.add_argument("--rows", type=int, default=50_000)
+  parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+  parser.add_argument("--batch-size", type=int, help="rows per transaction (default: the app's BULK_BATCH_SIZE)")
+  parser.add_argument("--compare", type=int, default=0, metavar="N",
+                      help="also POST N rows one at a time to /admin/add-salary")
+  parser.add_argument("--seed", type=int, default=348)
+  args = parser.parse_args()
+
+  load_dotenv(os.path.join(HERE, "..", "app", ".env"))
+  load_dotenv()
+  target = urlsplit(args.url)
+  ids = job_ids()
+  body, records = make_body(ids, args.rows, args.format, args.seed)
+
+  query = {"batch_size": args.batch_size} if args.batch_size else {}
+  path = "/admin/salaries/bulk" + ("?" + urlencode(query) if query else "")
+  content_type = "text/csv" if args.format == "csv" else "application/x-ndjson"
+  status, data, elapsed = post(target, path, body, content_type)
+  if status != 200:
+    raise SystemExit(f"HTTP {status}: {data[:500]!r}")
+  report = json.loads(data)
+  print(f"bulk     {report['inserted']} inserted, {report['rejected']} rejected in {report['batches']} batches: "
+        f"{elapsed:.2f}s ({report['inserted'] / elapsed:,.0f} rows/s)")
+
+  if args.compare:
+    start = time.perf_counter()
+    for job_id, rate, hours in records[:args.compare]:
+      form = urlencode({"job_id": job_id, "hourly_rate": rate, "hours_per_week": hours, "notes": ""})
+      post(target, "/admin/add-salary", form.encode(), "application/x-www-form-urlencoded")
+    single = time.perf_counter() - start
+    rate = args.compare / single
+    print(f"single   {args.compare} rows in {single:.2f}s ({rate:,.0f} rows/s); "
+          f"{args.rows} rows would take ~{args.rows / rate:,.0f}s")
+
+
+if __name__ == "__main__":
+  main()
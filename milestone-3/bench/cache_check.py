@@ -0,0 +1,107 @@
+"""Check that a cached page is never served under a newer data version's ETag.
+
+  cd app && flask run              # one worker; cache and conditional GET on (the defaults)
+  python3 bench/cache_check.py
+  python3 bench/cache_check.py --url http://127.0.0.1:5000 --wait 6
+
+The response cache is per worker, so run the app with one (flask run, or
+gunicorn -w 1). Every route in ROUTES is requested twice, so the cache
+stores the page and then serves it. The check then bumps DataVersion the
+way data_transform.py does after a load (without notify(), so the app only
+notices after DATA_VERSION_TTL), waits --wait seconds and requests each
+page twice more. Checked, per route:
+
+  * a hit carries the ETag and body of the miss that stored it
+  * the first response after the ETag changes is a miss
+  * the one after that is a hit with the new ETag
+
+It bumps the real DataVersion row, which costs clients one revalidation and
+nothing else. Connection settings are the app's DB_* variables. Run it with
+no other writes going on. Exits non-zero on any mismatch.
+"""
+import argparse
+import os
+import sys
+import time
+import urllib.request
+
+import mysql.connector as mysql
+from dotenv import load_dotenv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+import dataversion  # noqa: E402
+
+# The @cached report pages
+ROUTES = [
+  "/avg-by-title",
+  "/top-companies",
+  "/avg-salary",
+  "/avg-by-term",
+  "/safe-employers",
+  "/salary-bands?title=engineer",
+]
+
+
+def get(url):
+  with urllib.request.urlopen(url) as resp:
+    return resp.headers.get("ETag"), resp.headers.get("X-Cache"), resp.read()
+
+
+def bump_version():
+  conn = mysql.connect(
+    host=os.getenv("DB_HOST", "127.0.0.1"),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASS", ""),
+    database=os.getenv("DB_NAME", "coop_salaries"),
+  )
+  try:
+    cur = conn.cursor()
+    dataversion.bump(cur)
+    conn.commit()
+  finally:
+    conn.close()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--url", default="http://127.0.0.1:5000")
+  parser.add_argument("--wait", type=float, default=dataversion.DATA_VERSION_TTL + 1,
+                      help="seconds for the app to notice the new version")
+  args = parser.parse_args()
+  load_dotenv(os.path.join(HERE, "..", "app", ".env"))
+
+  failures = []
+
+  def check(ok, message):
+    if not ok:
+      failures.append(message)
+
+  stored = {}
+  for path in ROUTES:
+    etag, _, body = get(args.url + path)
+    stored[path] = (etag, body)
+    etag, status, body = get(args.url + path)
+    check(status == "HIT", f"{path}: second request was {status}, not a cache hit")
+    check((etag, body) == stored[path], f"{path}: hit differs from the response that stored it")
+
+  bump_version()
+  time.sleep(args.wait)
+
+  for path in ROUTES:
+    old_etag, old_body = stored[path]
+    etag, status, body = get(args.url + path)
+    check(etag != old_etag, f"{path}: ETag unchanged {args.wait:g}s after the version bump")
+    check(status == "MISS", f"{path}: {status} under the new ETag {etag}, rendered for {old_etag}")
+    again, status, _ = get(args.url + path)
+    check(status == "HIT" and again == etag, f"{path}: then {status} with ETag {again}, expected a hit with {etag}")
+
+  for message in failures:
+    print("FAIL", message)
+  print(f"{len(ROUTES)} routes, {len(failures)} failures")
+  sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,112 @@
+"""Time employer_dedup.resolve() on synthetic employer names and score the groups it finds.
+
+  python3 bench/employer_dedup.py                        # 500,000 names
+  python3 bench/employer_dedup.py --names 2000000 --threshold 0.75
+
+Base names are made-up words, some followed by an industry word ("Velora
+Systems"). Each name is one base name spelt one of several ways: another
+case, a legal suffix ("Inc.", "Ltd", "Corporation", ...), a leading "The",
+punctuation, a dropped space or a one-letter typo. All spellings of one
+base name are one employer. No database is needed.
+
+Prints the time of each step, the candidate pairs scored against all n^2/2
+pairs, and the pairwise precision and recall of the groups. Exits non-zero
+if precision falls below --min-precision.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+import employer_dedup  # noqa: E402
+
+ONSETS = list("bcdfghjklmnprstvwz") + ["bl", "br", "ch", "cl", "cr", "dr", "fl", "gr", "kr", "pl", "pr", "qu", "sh",
+                                        "sk", "sl", "sp", "st", "str", "th", "tr", "vr", "zh"]
+SYLLABLES = [c + v + k for c in ONSETS for v in ["a", "e", "i", "o", "u", "y", "ai", "ea", "oo", "ou"]
+             for k in ["", "n", "r", "s", "x", "l", "m", "ck", "nd", "rt", "st"]]
+INDUSTRY = ["Systems", "Labs", "Health", "Financial", "Robotics", "Software", "Energy", "Media", "Analytics",
+            "Logistics", "Capital", "Games", "Foods", "Networks", "Bank", "Motors", "Insurance", "Technologies"]
+SUFFIXES = [" Inc.", ", Inc", " Inc", " Ltd.", " Ltd", " Limited", " Corp.", " Corporation", " LLC", " Co."]
+
+
+def base_names(rng, n):
+  """n distinct made-up employer names."""
+  names = set()
+  while len(names) < n:
+    count = n - len(names)
+    lengths = rng.integers(2, 4, count)
+    picks = rng.integers(0, len(SYLLABLES), (count, 3))
+    industry = rng.integers(-len(INDUSTRY), len(INDUSTRY), count)  # negative: no industry word
+    for length, pick, word in zip(lengths, picks, industry):
+      name = "".join(SYLLABLES[p] for p in pick[:length]).capitalize()
+      names.add(name + (" " + INDUSTRY[word] if word >= 0 else ""))
+  return np.array(sorted(names)[:n], dtype=object)
+
+
+def spell(rng, name):
+  """One spelling of name."""
+  kind = rng.integers(0, 8)
+  if kind == 1:
+    return name.upper() if rng.random() < 0.5 else name.lower()
+  if kind == 2:
+    return name + SUFFIXES[rng.integers(0, len(SUFFIXES))]
+  if kind == 3:
+    return "The " + name
+  if kind == 4:
+    return name.replace(" ", "", 1) if " " in name else name + "."
+  if kind == 5 and len(name) >= 10:
+    at = int(rng.integers(3, len(name) - 1))
+    return name[:at] + "aeiourstn"[rng.integers(0, 9)] + name[at + 1:]
+  return name
+
+
+def pairs(sizes):
+  return int((sizes * (sizes - 1) // 2).sum())
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--names", type=int, default=500_000)
+  parser.add_argument("--spellings", type=float, default=2.5, help="average names per employer")
+  parser.add_argument("--threshold", type=float, default=employer_dedup.DEFAULT_THRESHOLD)
+  parser.add_argument("--max-block", type=int, default=employer_dedup.DEFAULT_MAX_BLOCK)
+  parser.add_argument("--seed", type=int, default=348)
+  parser.add_argument("--min-precision", type=float, default=0.95)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(args.seed)
+  start = time.perf_counter()
+  bases = base_names(rng, max(1, int(args.names / args.spellings)))
+  # Skewed: a few employers are spelt many ways, most once or twice
+  weights = 1.0 / np.arange(1, len(bases) + 1) ** 0.6
+  truth = rng.choice(len(bases), args.names, p=weights / weights.sum())
+  names = pd.Series([spell(rng, bases[t]) for t in truth], dtype=object)
+  print(f"{args.names:,} names of {len(np.unique(truth)):,} employers generated in {time.perf_counter() - start:.1f}s")
+
+  start = time.perf_counter()
+  aliases, stats = employer_dedup.resolve(np.arange(1, args.names + 1), names, args.threshold, args.max_block)
+  elapsed = time.perf_counter() - start
+  for step in ("normalize", "index", "score", "group"):
+    print(f"  {step:<10} {stats[step + '_seconds']:7.2f}s")
+  print(f"resolve    {elapsed:7.2f}s   {args.names / elapsed:,.0f} names/s")
+  print(f"{stats['keys']:,} keys, {stats['grams']:,} grams, {stats['candidates']:,} candidate pairs "
+        f"({stats['candidates'] / max(1, stats['keys'] * (stats['keys'] - 1) // 2):.2e} of all pairs, "
+        f"{stats['blocks_skipped']} blocks skipped), {stats['scored']:,} scored, {stats['linked']:,} linked")
+
+  found = pd.Series(aliases["employer_id"].to_numpy(), index=aliases["alias"]).reindex(
+    employer_dedup.canonical_names(names)).to_numpy()
+  both = pairs(pd.Series(1, index=pd.MultiIndex.from_arrays([found, truth])).groupby(level=[0, 1]).size().to_numpy())
+  precision = both / max(1, pairs(np.unique(found, return_counts=True)[1]))
+  recall = both / max(1, pairs(np.unique(truth, return_counts=True)[1]))
+  print(f"{len(np.unique(found)):,} employers found; pairwise precision {precision:.4f}, recall {recall:.4f}")
+  return 0 if precision >= args.min_precision else 1
+
+
+if __name__ == "__main__":
+  sys.exit(main())
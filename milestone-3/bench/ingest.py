@@ -0,0 +1,158 @@
+"""Time data_transform's full load against a scratch database.
+
+  python3 bench/ingest.py                      # waterloo.csv + internship.csv + 100,000 generated rows
+  python3 bench/ingest.py --rows 1000000
+  python3 bench/ingest.py --baseline           # students / placements one row at a time, as before
+
+The scratch database (--database, default coop_salaries_ingest) is dropped
+and rebuilt from create-tables.sql and app/migrations before the load, so
+never point it at real data. The generated rows are salary reports from
+synthetic.generate() shaped like a CSV export (Company, Role, Location,
+Term, Salary as "$32.50/hr", Blacklist Reason). They go through
+process_data() like a file, so every one reaches the Student / Placement
+stage. For each input this prints the total time and the time spent in
+that stage, with rows per second.
+--baseline swaps that stage for the old per-row loop (INSERT Student,
+then INSERT Placement with its id, for every row) to compare against.
+
+Connection settings come from the same DB_HOST / DB_USER / DB_PASS
+variables as the app.
+"""
+import argparse
+import datetime
+import os
+import re
+import sys
+import time
+
+import mysql.connector as mysql
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+import data_transform  # noqa: E402
+import synthetic  # noqa: E402
+from migrate import migrate  # noqa: E402
+from sqlscript import run_script  # noqa: E402
+
+
+def rowwise_students(df, rng=None, conn=None):
+  """The per-row Student / Placement loop add_students() replaced.
+
+  Runs on conn, the writer's connection, so it joins the chunk's
+  transaction (a second connection would wait on the chunk's uncommitted
+  JobPosting rows) and leaves the commit to the writer.
+  """
+  fake = data_transform.fake
+  cur = conn.cursor()
+  ids = {}
+  for index, row in df.iterrows():
+    if pd.isna(row["job_id"]):
+      continue
+    fac = fake.random_element(data_transform.faculties)
+    cur.execute("INSERT INTO Student (name, faculty, program, year) VALUES (%s, %s, %s, %s)",
+                (fake.name(), fac, fake.random_element(data_transform.programs[fac]), fake.random_int(1, 5)))
+    student_id = cur.lastrowid
+    term = row["term"]
+    year_match = re.search(r"(\d{4})", term)
+    yr = int(year_match.group(1)) if year_match else 2025
+    season = term.split()[0].lower() if " " in term else ""
+    if season == "winter":
+      start_date, end_date = datetime.date(yr, 1, 1), datetime.date(yr, 4, 30)
+    elif season in ["spring", "summer"]:
+      start_date, end_date = datetime.date(yr, 5, 1), datetime.date(yr, 8, 31)
+    elif season == "fall":
+      start_date, end_date = datetime.date(yr, 9, 1), datetime.date(yr, 12, 31)
+    else:
+      start_date = fake.date_between(start_date="-1y", end_date="+1y")
+      end_date = fake.date_between_dates(date_start=start_date, date_end=start_date + datetime.timedelta(days=120))
+    cur.execute("INSERT INTO Placement (student_id, job_id, start_date, end_date) VALUES (%s, %s, %s, %s)",
+                (student_id, int(row["job_id"]), start_date, end_date))
+    ids[index] = student_id
+  cur.close()
+  return pd.Series(ids, dtype="Int64")
+
+
+def generated_rows(n, seed):
+  """n salary reports as a general CSV export would have them (see prepare())."""
+  tables = synthetic.generate(n, seed)
+  rows = (tables["Salary"].merge(tables["JobPosting"], on="job_id")
+          .merge(tables["Employer"][["employer_id", "name"]], on="employer_id")
+          .merge(tables["Blacklist"][["employer_id", "reason"]], on="employer_id", how="left"))
+  return pd.DataFrame({"Company": rows["name"], "Role": rows["title"], "Location": rows["location"],
+                       "Term": rows["term"], "Salary": rows["hourly_rate"].map("${:.2f}/hr".format),
+                       "Blacklist Reason": rows["reason"]})
+
+
+def reset(database):
+  conn = mysql.connect(
+    host=os.getenv("DB_HOST", "127.0.0.1"),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASS", ""),
+    auth_plugin="mysql_native_password",
+  )
+  cur = conn.cursor()
+  cur.execute(f"DROP DATABASE IF EXISTS `{database}`")
+  cur.execute(f"CREATE DATABASE `{database}`")
+  cur.execute(f"USE `{database}`")
+  with open(os.path.join(ROOT, "create-tables.sql")) as f:
+    run_script(cur, f.read())
+  migrate(conn, log=lambda msg: None)
+  cur.close()
+  conn.close()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--database", default="coop_salaries_ingest")
+  parser.add_argument("--rows", type=int, default=100_000, help="generated salary reports after the CSVs")
+  parser.add_argument("--seed", type=int, default=348)
+  parser.add_argument("--baseline", action="store_true", help="use the old per-row student / placement loop")
+  args = parser.parse_args()
+
+  load_dotenv(os.path.join(ROOT, "app", ".env"))
+  generated = generated_rows(args.rows, args.seed)
+  reset(args.database)
+  data_transform.engine = create_engine(
+    f"mysql+mysqlconnector://{os.getenv('DB_USER', 'root')}:{os.getenv('DB_PASS', '')}"
+    f"@{os.getenv('DB_HOST', '127.0.0.1')}/{args.database}",
+    connect_args={"allow_local_infile": True},
+  )
+
+  # Time the student / placement stage separately from the rest of process_data
+  stage = data_transform.add_students if not args.baseline else rowwise_students
+  timings = {}
+
+  def timed_stage(df, rng=None, conn=None):
+    start = time.perf_counter()
+    ids = stage(df, rng, conn)
+    rows, spent = timings.get("students", (0, 0.0))
+    timings["students"] = (rows + len(df), spent + time.perf_counter() - start)
+    return ids
+
+  data_transform.add_students = timed_stage
+  os.chdir(ROOT)
+  total = 0.0
+  for label, step in [("waterloo.csv", lambda: data_transform.process_data("waterloo.csv")),
+                      ("internship.csv", lambda: data_transform.process_data("internship.csv")),
+                      (f"generated {args.rows:,}", lambda: data_transform.process_data(generated))]:
+    timings.clear()
+    start = time.perf_counter()
+    step()
+    elapsed = time.perf_counter() - start
+    total += elapsed
+    line = f"{label:<20} {elapsed:8.2f}s"
+    if "students" in timings:
+      rows, spent = timings["students"]
+      line += f"   students/placements: {rows:,} rows in {spent:.2f}s ({rows / spent if spent else 0:,.0f} rows/s)"
+    print(line)
+  print(f"{'total':<20} {total:8.2f}s   ({'baseline' if args.baseline else 'batched'})")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,404 @@
+"""Reproducible load test: seed a scratch database, replay a route mix, compare runs.
+
+1. Seed a scratch database at a given scale (it is dropped and rebuilt, so
+   never point --database at real data):
+
+     python3 bench/loadtest.py seed --scale 1m            # 10k | 1m | 10m salaries
+
+   The schema comes from create-tables.sql plus app/migrations. The rows
+   come from synthetic.py: employers, titles, cities and faculties follow
+   skewed popularity curves, like the real data (a few big employers and
+   common titles, and a long tail), and rates are log-normal per title and
+   employer. They are written as .tsv files and loaded with LOAD DATA with
+   the per-row triggers bypassed, then the summary tables are rebuilt once.
+   The server needs local_infile=ON.
+
+2. Run the app against it and replay the mix:
+
+     cd app && DB_NAME=coop_salaries_bench RESPONSE_CACHE=0 gunicorn -w 4 -b 127.0.0.1:5000 app:app
+     python3 bench/loadtest.py run --duration 60 --concurrency 32
+
+   Each client loops over requests drawn from MIX without think time.
+   Parameters are sampled from the seeded data, weighted the way users
+   would pick them: popular titles, cities and terms more often, and
+   /salary-bands with a realistic spread of filter combinations. The admin
+   writes are included at a low rate. Throughput and p50 / p90 / p99 / max
+   latency are reported per route. The run is saved as JSON under
+   bench/results/, together with the commit, the scale and the settings.
+
+3. Compare two runs, e.g. before and after a change:
+
+     python3 bench/loadtest.py compare bench/results/A.json bench/results/B.json
+
+   This exits with status 1 if any route's p99 or throughput got worse by
+   more than --threshold percent.
+
+Connection settings come from the same DB_HOST / DB_USER / DB_PASS
+variables as the app.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import mysql.connector as mysql
+from dotenv import load_dotenv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import synthetic  # noqa: E402
+from migrate import migrate  # noqa: E402
+from sqlscript import run_script  # noqa: E402
+
+RESULTS_DIR = os.path.join(HERE, "results")
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# (weight, name): the request mix, by route
+MIX = [
+  (22, "search"),
+  (14, "salary-bands"),
+  (10, "top-companies"),
+  (10, "safe-employers"),
+  (10, "avg-salary"),
+  (6, "advanced-search"),
+  (6, "avg-by-title"),
+  (5, "low-wage"),
+  (5, "salaries"),
+  (3, "avg-by-term"),
+  (3, "blacklist"),
+  (4, "add-salary"),
+  (2, "blacklist-toggle"),
+]
+
+
+def connect(database=None, **kwargs):
+  return mysql.connect(
+    host=os.getenv("DB_HOST", "127.0.0.1"),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASS", ""),
+    database=database,
+    auth_plugin="mysql_native_password",
+    **kwargs,
+  )
+
+
+# --- seed ---------------------------------------------------------------------
+
+def seed(database, salaries, seed_value, log=print):
+  conn = connect(allow_local_infile=True)
+  cur = conn.cursor()
+  cur.execute(f"DROP DATABASE IF EXISTS `{database}`")
+  cur.execute(f"CREATE DATABASE `{database}`")
+  cur.execute(f"USE `{database}`")
+  with open(os.path.join(HERE, "..", "create-tables.sql")) as f:
+    run_script(cur, f.read())
+  migrate(conn, log=lambda msg: None)
+
+  start = time.perf_counter()
+  tables = synthetic.generate(salaries, seed_value)
+  log(", ".join(f"{table} {len(df):,}" for table, df in tables.items()))
+  with tempfile.TemporaryDirectory() as directory:
+    synthetic.write(tables, directory)
+    synthetic.load(conn, directory, log=log)
+  cur.execute("ANALYZE TABLE Employer, JobPosting, Salary, Student, Placement")
+  cur.fetchall()
+  conn.commit()
+  cur.close()
+  conn.close()
+  return time.perf_counter() - start
+
+
+# --- run ------------------------------------------------------------------------
+
+class Params:
+  """Request parameters sampled from the database the app serves."""
+
+  def __init__(self, cur):
+    cur.execute("SELECT title, n_reports FROM TitleSalaryStats")
+    self.titles, self.title_weights = _split(cur.fetchall())
+    cur.execute("SELECT location, COUNT(*) FROM JobPosting WHERE location IS NOT NULL GROUP BY location")
+    self.cities, self.city_weights = _split(cur.fetchall())
+    cur.execute("SELECT term, n_reports FROM TermSalaryStats")
+    self.terms, self.term_weights = _split(cur.fetchall())
+    cur.execute("SELECT faculty, COUNT(*) FROM Student GROUP BY faculty")
+    self.faculties, self.faculty_weights = _split(cur.fetchall())
+    cur.execute("SELECT job_id FROM JobPosting ORDER BY RAND() LIMIT 5000")
+    self.job_ids = [r[0] for r in cur.fetchall()]
+    cur.execute("SELECT employer_id FROM Employer WHERE NOT blacklist_flag ORDER BY RAND() LIMIT 500")
+    self.employer_ids = [r[0] for r in cur.fetchall()]
+    words = {}
+    for title, weight in zip(self.titles, self.title_weights):
+      for word in title.lower().split():
+        if len(word) > 3:
+          words[word] = words.get(word, 0) + weight
+    self.words, self.word_weights = _split(words.items())
+
+  def title(self, rng):
+    return rng.choices(self.titles, self.title_weights)[0]
+
+  def word(self, rng):
+    return rng.choices(self.words, self.word_weights)[0]
+
+  def request(self, rng, name):
+    """Return a list of (method, path, form) for one request of route `name`."""
+    if name == "search":
+      sort = "relevance" if rng.random() < 0.3 else "rate"
+      q = self.word(rng) if rng.random() < 0.7 else f"{self.word(rng)} {self.word(rng)}"
+      return [("GET", "/search?" + urlencode({"q": q, "sort": sort}), None)]
+    if name == "salary-bands":
+      # Mostly one title, sometimes narrowed to a city / term, rarely unfiltered
+      r, args = rng.random(), {}
+      if r < 0.85:
+        args["title"] = self.word(rng) if rng.random() < 0.5 else self.title(rng)
+      if r < 0.3 or r >= 0.95:
+        args["city"] = rng.choices(self.cities, self.city_weights)[0].split(",")[0]
+      if 0.2 <= r < 0.45 or r >= 0.9:
+        args["term"] = rng.choices(self.terms, self.term_weights)[0]
+      args["stream"] = "0"
+      return [("GET", "/salary-bands?" + urlencode(args), None)]
+    if name == "top-companies":
+      return [("POST", "/top-companies", {"role": self.title(rng)})]
+    if name == "safe-employers":
+      fac = rng.choices(self.faculties, self.faculty_weights)[0] if rng.random() < 0.8 else ""
+      return [("GET", "/safe-employers?" + urlencode({"faculty": fac}), None)]
+    if name == "avg-salary":
+      args = {"faculty": rng.choices(self.faculties, self.faculty_weights)[0]} if rng.random() < 0.7 else {}
+      if rng.random() < 0.3:
+        args["term"] = rng.choices(self.terms, self.term_weights)[0]
+      return [("GET", "/avg-salary?" + urlencode(args), None)]
+    if name == "advanced-search":
+      return [("GET", "/advanced-search?" + urlencode({"q": self.word(rng), "stream": "0"}), None)]
+    if name == "avg-by-title":
+      kw = self.word(rng) if rng.random() < 0.5 else ""
+      return [("GET", "/avg-by-title?" + urlencode({"title_kw": kw}), None)]
+    if name == "low-wage":
+      return [("GET", f"/low-wage?threshold={rng.choice((16, 18, 20, 22))}", None)]
+    if name == "salaries":
+      return [("GET", "/salaries?stream=0", None)]
+    if name == "avg-by-term":
+      return [("GET", "/avg-by-term", None)]
+    if name == "blacklist":
+      return [("GET", "/blacklist", None)]
+    if name == "add-salary":
+      return [("POST", "/admin/add-salary", {
+        "job_id": rng.choice(self.job_ids), "hourly_rate": f"{rng.uniform(16, 60):.2f}",
+        "hours_per_week": 40, "notes": "load test"})]
+    if name == "blacklist-toggle":
+      # Add then remove, so the blacklist does not grow over the run
+      employer = rng.choice(self.employer_ids)
+      return [("POST", "/admin/blacklist-add", {"employer_id": employer, "reason": "load test"}),
+              ("POST", "/admin/blacklist-remove", {"employer_id": employer})]
+    raise ValueError(f"unknown route {name!r}")
+
+
+def _split(pairs):
+  pairs = [(k, float(w)) for k, w in pairs if k]
+  return [k for k, _ in pairs], [w for _, w in pairs]
+
+
+def percentile(samples, q):
+  return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def summarize(latencies, errors, elapsed):
+  latencies = sorted(latencies)
+  if not latencies:
+    return {"requests": 0, "errors": errors}
+  return {
+    "requests": len(latencies),
+    "errors": errors,
+    "rps": round(len(latencies) / elapsed, 2),
+    "mean_ms": round(1000 * statistics.fmean(latencies), 2),
+    "p50_ms": round(1000 * statistics.median(latencies), 2),
+    "p90_ms": round(1000 * percentile(latencies, 0.90), 2),
+    "p99_ms": round(1000 * percentile(latencies, 0.99), 2),
+    "max_ms": round(1000 * latencies[-1], 2),
+  }
+
+
+def client(target, params, mix, stop, warmup_until, results, seed_value):
+  rng = random.Random(seed_value)
+  names, weights = [n for _, n in mix], [w for w, _ in mix]
+  conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=300)
+  while not stop.is_set():
+    name = rng.choices(names, weights)[0]
+    for method, path, form in params.request(rng, name):
+      label = name if name != "blacklist-toggle" else path.rsplit("/", 1)[-1]
+      body = urlencode(form) if form else None
+      headers = {"Content-Type": "application/x-www-form-urlencoded"} if form else {}
+      start = time.perf_counter()
+      try:
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        ok = resp.status == 200
+      except (OSError, http.client.HTTPException):
+        ok = False
+        conn.close()
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=300)
+      elapsed = time.perf_counter() - start
+      if time.monotonic() >= warmup_until:
+        results.append((label, elapsed, ok))
+  conn.close()
+
+
+def run(url, params, mix, concurrency, duration, warmup, seed_value):
+  target = urlsplit(url)
+  stop = threading.Event()
+  warmup_until = time.monotonic() + warmup
+  results = []
+  threads = [threading.Thread(target=client, args=(target, params, mix, stop, warmup_until, results, seed_value + i),
+                              daemon=True)
+             for i in range(concurrency)]
+  for t in threads:
+    t.start()
+  time.sleep(warmup + duration)
+  stop.set()
+  for t in threads:
+    t.join()
+
+  routes = {}
+  for label in sorted({label for label, *_ in results}):
+    ok = [e for name, e, good in results if name == label and good]
+    routes[label] = summarize(ok, sum(name == label and not good for name, _, good in results), duration)
+  overall = summarize([e for _, e, ok in results if ok], sum(not ok for *_, ok in results), duration)
+  return {"overall": overall, "routes": routes}
+
+
+def git_revision():
+  def git(*args):
+    try:
+      return subprocess.run(["git", *args], cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+      return None
+  return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def table_counts(cur):
+  counts = {}
+  for table in ("Employer", "JobPosting", "Salary", "Student", "Placement"):
+    cur.execute(f"SELECT COUNT(*) FROM {table}")
+    counts[table] = cur.fetchone()[0]
+  return counts
+
+
+# --- compare ------------------------------------------------------------------
+
+def compare(old, new, threshold):
+  """Print per-route changes; return the routes that regressed."""
+  regressions = []
+  print(f"{'route':<20} {'p50 ms':>18} {'p99 ms':>20} {'req/s':>18}")
+  for route in sorted(set(old["routes"]) | set(new["routes"])):
+    a, b = old["routes"].get(route, {}), new["routes"].get(route, {})
+    if not a.get("requests") or not b.get("requests"):
+      print(f"{route:<20} only in {'new' if b.get('requests') else 'old'} run")
+      continue
+    p99 = 100 * (b["p99_ms"] - a["p99_ms"]) / a["p99_ms"] if a["p99_ms"] else 0.0
+    rps = 100 * (b["rps"] - a["rps"]) / a["rps"] if a["rps"] else 0.0
+    worse = p99 > threshold or rps < -threshold
+    if worse:
+      regressions.append(route)
+    print(f"{route:<20} {a['p50_ms']:>8} -> {b['p50_ms']:<8} {a['p99_ms']:>8} -> {b['p99_ms']:<8} ({p99:+5.0f}%) "
+          f"{a['rps']:>7} -> {b['rps']:<7} ({rps:+4.0f}%){'  REGRESSION' if worse else ''}")
+  return regressions
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  sub = parser.add_subparsers(dest="command", required=True)
+
+  p = sub.add_parser("seed", help="create and fill a scratch database")
+  p.add_argument("--scale", choices=SCALES, default="10k", help="number of salaries")
+  p.add_argument("--salaries", type=int, help="exact number of salaries (overrides --scale)")
+  p.add_argument("--database", default="coop_salaries_bench")
+  p.add_argument("--seed", type=int, default=348)
+
+  p = sub.add_parser("run", help="replay the route mix against a running app")
+  p.add_argument("--url", default="http://127.0.0.1:5000")
+  p.add_argument("--database", default=None, help="database the app serves (default DB_NAME)")
+  p.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+  p.add_argument("--duration", type=float, default=60, help="measured seconds")
+  p.add_argument("--warmup", type=float, default=10)
+  p.add_argument("--seed", type=int, default=348)
+  p.add_argument("--no-writes", action="store_true", help="leave the admin writes out of the mix")
+  p.add_argument("--label", default="", help="free-form note stored with the results")
+  p.add_argument("--out", default=None, help="results file (default bench/results/<time>-<commit>.json)")
+
+  p = sub.add_parser("compare", help="compare two results files")
+  p.add_argument("old")
+  p.add_argument("new")
+  p.add_argument("--threshold", type=float, default=10, help="percent change that counts as a regression")
+
+  args = parser.parse_args()
+  load_dotenv(os.path.join(HERE, "..", "app", ".env"))
+  load_dotenv()
+
+  if args.command == "seed":
+    salaries = args.salaries or SCALES[args.scale]
+    elapsed = seed(args.database, salaries, args.seed)
+    print(f"seeded {args.database} with {salaries:,} salaries in {elapsed:.1f}s")
+    return 0
+
+  if args.command == "compare":
+    with open(args.old) as f:
+      old = json.load(f)
+    with open(args.new) as f:
+      new = json.load(f)
+    print(f"old: {old['git']['commit'] or '?'} {old.get('label', '')}\nnew: {new['git']['commit'] or '?'} "
+          f"{new.get('label', '')}")
+    if old.get("data") != new.get("data"):
+      print("warning: the runs used different data sets")
+    regressions = compare(old, new, args.threshold)
+    return 1 if regressions else 0
+
+  conn = connect(args.database or os.getenv("DB_NAME", "coop_salaries"))
+  cur = conn.cursor()
+  params = Params(cur)
+  data = table_counts(cur)
+  cur.close()
+  conn.close()
+  mix = [(w, name) for w, name in MIX if not (args.no_writes and name in ("add-salary", "blacklist-toggle"))]
+
+  result = run(args.url, params, mix, args.concurrency, args.duration, args.warmup, args.seed)
+  o = result["overall"]
+  print(f"overall {o.get('rps', 0):>9} req/s  p50 {o.get('p50_ms', '-'):>8} ms  p99 {o.get('p99_ms', '-'):>8} ms  "
+        f"errors {o['errors']}")
+  for route, r in result["routes"].items():
+    print(f"  {route:<18} {r.get('rps', 0):>8} req/s  p50 {r.get('p50_ms', '-'):>8}  p90 {r.get('p90_ms', '-'):>8}  "
+          f"p99 {r.get('p99_ms', '-'):>8}  max {r.get('max_ms', '-'):>8} ms  errors {r['errors']}")
+
+  git = git_revision()
+  record = {
+    "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    "label": args.label,
+    "git": git,
+    "url": args.url,
+    "data": data,
+    "settings": {"concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup,
+                 "seed": args.seed, "mix": {name: w for w, name in mix}},
+    **result,
+  }
+  out = args.out
+  if out is None:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    out = os.path.join(RESULTS_DIR, f"{stamp}-{(git['commit'] or 'nogit')[:8]}.json")
+  with open(out, "w") as f:
+    json.dump(record, f, indent=2)
+  print(f"results: {out}")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,105 @@
+"""Check that /metrics adds up, against a running app.
+
+  cd app && RESPONSE_CACHE=0 CONDITIONAL_GET=0 flask run      # or gunicorn
+  python3 bench/metrics_check.py                               # 20 rounds of ROUTES
+  python3 bench/metrics_check.py --rounds 200 --url http://127.0.0.1:5000
+
+Scrapes /metrics, requests every route in ROUTES --rounds times, scrapes
+again and checks, per route, on the difference between the two scrapes:
+
+  * requests counted == requests sent, and response bytes == bytes received
+  * the five phase sums add up to the request duration sum
+  * every histogram's +Inf bucket equals its _count
+
+Run it with no other traffic on the app. Exits non-zero on any mismatch.
+"""
+import argparse
+import re
+import sys
+import urllib.request
+
+ROUTES = {
+  "search": "/search?q=software",
+  "salaries": "/salaries",
+  "low_wage": "/low-wage?threshold=20",
+  "avg_by_title": "/avg-by-title",
+  "salary_bands": "/salary-bands?title=engineer",
+  "api.salaries": "/api/v1/salaries?page_size=200",
+}
+PHASES = ("acquire", "execute", "fetch", "render", "other")
+_SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def scrape(url):
+  """{(name, frozenset(labels)): value} for every sample on /metrics."""
+  with urllib.request.urlopen(url + "/metrics") as resp:
+    text = resp.read().decode()
+  samples = {}
+  for line in text.splitlines():
+    match = _SAMPLE.match(line)
+    if match:
+      name, labels, value = match.groups()
+      samples[(name, frozenset(_LABEL.findall(labels or "")))] = float(value)
+  return samples
+
+
+def get(url):
+  with urllib.request.urlopen(url) as resp:
+    return len(resp.read())
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--url", default="http://127.0.0.1:5000")
+  parser.add_argument("--rounds", type=int, default=20)
+  args = parser.parse_args()
+
+  before = scrape(args.url)
+  sent = dict.fromkeys(ROUTES, 0)
+  received = dict.fromkeys(ROUTES, 0)
+  for _ in range(args.rounds):
+    for route, path in ROUTES.items():
+      received[route] += get(args.url + path)
+      sent[route] += 1
+  after = scrape(args.url)
+
+  def delta(name, **labels):
+    key = (name, frozenset(labels.items()))
+    return after.get(key, 0.0) - before.get(key, 0.0)
+
+  failures = []
+
+  def check(ok, message):
+    if not ok:
+      failures.append(message)
+
+  for route in ROUTES:
+    counted = delta("app_requests_total", route=route, status="200")
+    check(counted == sent[route], f"{route}: {counted:.0f} requests counted, {sent[route]} sent")
+    body = delta("app_response_bytes_sum", route=route)
+    check(body == received[route], f"{route}: {body:.0f} response bytes counted, {received[route]} received")
+
+    total = delta("app_request_duration_seconds_sum", route=route)
+    phases = {p: delta("app_request_phase_seconds_sum", route=route, phase=p) for p in PHASES}
+    # Each request's phases sum to its total exactly; allow float rounding
+    check(abs(sum(phases.values()) - total) <= 1e-6 * max(1.0, total) + 1e-9 * sent[route],
+          f"{route}: phases sum to {sum(phases.values()):.6f}s, duration sum is {total:.6f}s")
+    check(delta("app_response_rows_count", route=route) == sent[route], f"{route}: rows histogram count")
+
+    print(f"{route:<14} {sent[route]:>5} req  {1000 * total / max(1, sent[route]):8.2f} ms avg  "
+          + "  ".join(f"{p} {100 * v / total:4.1f}%" if total else f"{p} -" for p, v in phases.items()))
+
+  for (name, labels), value in after.items():
+    if name.endswith("_count"):
+      base = name[:-len("_count")]
+      inf = after.get((base + "_bucket", labels | {("le", "+Inf")}))
+      check(inf == value, f"{base}{dict(labels)}: +Inf bucket {inf} != count {value}")
+
+  for message in failures:
+    print("FAIL", message, file=sys.stderr)
+  sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,104 @@
+"""Check the column parsers in data_transform against the row-wise ones, and time both.
+
+  python3 bench/parse_check.py                  # waterloo.csv + internship.csv
+  python3 bench/parse_check.py --scale 200      # inputs repeated 200 times for timing
+
+parse_salaries(), parse_stipends() and clean_terms() must return exactly
+what parse_salary(), parse_stipend() and clean_term() return row by row
+(None and NaN count as equal). Every raw value in the two CSVs is checked,
+together with EDGE_CASES. Then the inputs are repeated --scale times and
+shuffled to time both versions. Exits non-zero on any difference.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+import data_transform as dt  # noqa: E402
+
+# Inputs the CSVs don't cover: each branch of parse_salary, and odd terms
+EDGE_CASES = {
+  "salary": ["~$31.5/hr", "20/hr ~25/hr", "45 usd/hr", "$9,000 USD/month", "5000/mo", "6000/month",
+             "1096/week", "900 /wk usd", "80k annual", "85k yr", "100k usd/yr", "70k base", "per week",
+             "3000 per month", "20-25 /hr", "mid 30s", "USD 40", "", "none", "0.285", "1.005/hr", 22, 22.5],
+  "stipend": [("unpaid", "3 Months"), ("Performance Based", "1 Month"), ("₹ 12,000-20,000 lump sum", "6 Months"),
+              ("₹ 5000 lump sum", "n/a"), ("₹ 7,500 /month", "2 Weeks"), ("no number", "3 Months")],
+  "term": ["Fall 2022, 2023", "  Winter 2024 (remote) ", "spring 2019/2021", "Summer", "2023 (maybe 2030)",
+           "(2024) Fall", "fall2024", "W2025", "", "Fall 1999"],
+}
+
+
+def same(a, b):
+  """Equal, treating None and NaN alike."""
+  if a is None or (isinstance(a, float) and math.isnan(a)):
+    return b is None or (isinstance(b, float) and math.isnan(b))
+  return a == b
+
+
+def inputs():
+  waterloo = pd.read_csv(os.path.join(ROOT, "waterloo.csv"), skiprows=1)
+  internship = pd.read_csv(os.path.join(ROOT, "internship.csv"))
+  salary = pd.concat([waterloo["Salary Information (CAD unless otherwise specified)"].astype(object),
+                      pd.Series(EDGE_CASES["salary"], dtype=object)], ignore_index=True)
+  edge = pd.DataFrame(EDGE_CASES["stipend"], columns=["stipend", "duration"])
+  stipend = pd.concat([internship[["stipend", "duration"]].astype(object), edge], ignore_index=True)
+  stipend.loc[len(stipend)] = [None, "3 Months"]
+  stipend.loc[len(stipend)] = ["₹ 5,000 /month", None]
+  terms = pd.concat([waterloo["Year"].map(lambda y: f"Fall {y}" if pd.notna(y) else None).astype(object),
+                     pd.Series(["Winter 2026"] + EDGE_CASES["term"], dtype=object)], ignore_index=True)
+  return salary, stipend, terms
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--scale", type=int, default=100, help="repeat the inputs this many times for timing")
+  args = parser.parse_args()
+
+  salary, stipend, terms = inputs()
+  rowwise = {
+    "salary": lambda s: s.apply(dt.parse_salary),
+    "stipend": lambda df: df.apply(lambda row: dt.parse_stipend(row["stipend"], row["duration"]), axis=1),
+    "term": lambda s: s.apply(dt.clean_term),
+  }
+  columnar = {
+    "salary": dt.parse_salaries,
+    "stipend": lambda df: dt.parse_stipends(df["stipend"], df["duration"]),
+    "term": dt.clean_terms,
+  }
+  data = {"salary": salary, "stipend": stipend, "term": terms}
+
+  failures = 0
+  for name, values in data.items():
+    expected, got = rowwise[name](values).tolist(), columnar[name](values).tolist()
+    bad = [(i, e, g) for i, (e, g) in enumerate(zip(expected, got)) if not same(e, g)]
+    failures += len(bad) + (len(expected) != len(got))
+    for i, e, g in bad[:10]:
+      raw = values.iloc[i].tolist() if isinstance(values, pd.DataFrame) else values.iloc[i]
+      print(f"FAIL {name} {raw!r}: row-wise {e!r}, column {g!r}", file=sys.stderr)
+    print(f"{name:<8} {len(expected):>6} values checked, {len(bad)} differ")
+
+  rng = np.random.default_rng(0)
+  for name, values in data.items():
+    big = pd.concat([values] * args.scale, ignore_index=True)
+    big = big.iloc[rng.permutation(len(big))].reset_index(drop=True)
+    start = time.perf_counter()
+    rowwise[name](big)
+    slow = time.perf_counter() - start
+    start = time.perf_counter()
+    columnar[name](big)
+    fast = time.perf_counter() - start
+    print(f"{name:<8} {len(big):>9,} rows   row-wise {slow:7.3f}s   column {fast:7.3f}s   {slow / fast:6.1f}x")
+
+  sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+  main()
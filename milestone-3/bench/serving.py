@@ -0,0 +1,142 @@
+"""Sustained throughput and tail latency: sync (WSGI) vs async (ASGI) serving.
+
+Start both deployments against the same database, with the response cache
+off so every request reaches MySQL (gunicorn is not in requirements.txt;
+pip install gunicorn):
+
+  cd app
+  RESPONSE_CACHE=0 gunicorn -w 4 -b 127.0.0.1:5000 app:app
+  RESPONSE_CACHE=0 uvicorn asgi:application --workers 4 --port 5001
+
+then drive them with the same mixed read workload:
+
+  python3 bench/serving.py                                  # both, 64 clients, 30 s each
+  python3 bench/serving.py --concurrency 256 --duration 60
+  python3 bench/serving.py --async-url "" --json            # sync only
+
+Each client loops over requests drawn from WORKLOAD (weighted) without
+think time, for --duration seconds after a short warm-up. Reported: requests
+per second, p50 / p99 latency and errors, overall and per route.
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+# (weight, method, path, form): the mix of a typical browsing session,
+# including the slow aggregate pages
+WORKLOAD = [
+  (20, "GET", "/search?q=software", None),
+  (10, "GET", "/search?q=data&sort=relevance", None),
+  (10, "GET", "/salaries?stream=0", None),
+  (10, "GET", "/avg-by-term", None),
+  (10, "GET", "/avg-by-title", None),
+  (10, "GET", "/advanced-search?q=engineer&stream=0", None),
+  (8, "GET", "/safe-employers", None),
+  (8, "GET", "/avg-salary", None),
+  (6, "POST", "/top-companies", {"role": "Software Engineer Intern"}),
+  (5, "GET", "/salary-bands?stream=0", None),
+  (3, "GET", "/blacklist", None),
+]
+
+
+def percentile(samples, q):
+  return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def summarize(latencies, errors, elapsed):
+  latencies = sorted(latencies)
+  if not latencies:
+    return {"requests": 0, "errors": errors}
+  return {
+    "requests": len(latencies),
+    "errors": errors,
+    "rps": round(len(latencies) / elapsed, 1),
+    "p50_ms": round(1000 * statistics.median(latencies), 1),
+    "p99_ms": round(1000 * percentile(latencies, 0.99), 1),
+  }
+
+
+def client(target, stop, warmup_until, results, seed):
+  rng = random.Random(seed)
+  weights = [w for w, *_ in WORKLOAD]
+  conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=120)
+  while not stop.is_set():
+    _, method, path, form = rng.choices(WORKLOAD, weights)[0]
+    body = urlencode(form) if form else None
+    headers = {"Content-Type": "application/x-www-form-urlencoded"} if form else {}
+    start = time.perf_counter()
+    try:
+      conn.request(method, path, body=body, headers=headers)
+      resp = conn.getresponse()
+      resp.read()
+      ok = resp.status == 200
+    except (OSError, http.client.HTTPException):
+      ok = False
+      conn.close()
+      conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=120)
+    elapsed = time.perf_counter() - start
+    if time.monotonic() >= warmup_until:
+      results.append((path, elapsed, ok))
+  conn.close()
+
+
+def run(url, concurrency, duration, warmup, seed):
+  target = urlsplit(url)
+  stop = threading.Event()
+  warmup_until = time.monotonic() + warmup
+  results = []
+  threads = [threading.Thread(target=client, args=(target, stop, warmup_until, results, seed + i), daemon=True)
+             for i in range(concurrency)]
+  for t in threads:
+    t.start()
+  time.sleep(warmup + duration)
+  stop.set()
+  for t in threads:
+    t.join()
+
+  overall = summarize([e for _, e, ok in results if ok], sum(not ok for *_, ok in results), duration)
+  routes = {}
+  for _, _, path, _ in WORKLOAD:
+    ok = [e for p, e, good in results if p == path and good]
+    routes[path] = summarize(ok, sum(p == path and not good for p, _, good in results), duration)
+  return {"overall": overall, "routes": routes}
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--sync-url", default="http://127.0.0.1:5000")
+  parser.add_argument("--async-url", default="http://127.0.0.1:5001")
+  parser.add_argument("--concurrency", type=int, default=64, help="concurrent clients")
+  parser.add_argument("--duration", type=float, default=30, help="measured seconds per deployment")
+  parser.add_argument("--warmup", type=float, default=5)
+  parser.add_argument("--seed", type=int, default=348)
+  parser.add_argument("--json", action="store_true", help="print results as JSON")
+  args = parser.parse_args()
+
+  results = {}
+  for mode, url in (("sync", args.sync_url), ("async", args.async_url)):
+    if not url:
+      continue
+    results[mode] = run(url, args.concurrency, args.duration, args.warmup, args.seed)
+    if not args.json:
+      o = results[mode]["overall"]
+      print(f"{mode:<6} {o.get('rps', 0):>8} req/s  p50 {o.get('p50_ms', '-'):>8} ms  "
+            f"p99 {o.get('p99_ms', '-'):>8} ms  errors {o['errors']}")
+      for path, r in results[mode]["routes"].items():
+        print(f"         {path:<40} p50 {r.get('p50_ms', '-'):>8} ms  p99 {r.get('p99_ms', '-'):>8} ms")
+
+  if args.json:
+    print(json.dumps({"concurrency": args.concurrency, "duration": args.duration, "results": results}, indent=2))
+  elif len(results) == 2 and results["sync"]["overall"].get("rps"):
+    s, a = results["sync"]["overall"], results["async"]["overall"]
+    print(f"async/sync throughput: {a.get('rps', 0) / s['rps']:.2f}x, "
+          f"p99: {s['p99_ms']} ms -> {a.get('p99_ms', '-')} ms")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,167 @@
+"""Salary bulk-load time with the legacy vs. current auto-flag triggers.
+
+The legacy auto_flag_low_pay triggers recompute AVG(hourly_rate) over all of
+an employer's salaries for every row written, and insert a Blacklist row
+each time the average is still under $20. The current ones update
+EmployerPayStats in constant time and only act on a threshold crossing.
+
+Each run recreates a scratch database from create-tables.sql (it is dropped
+and rebuilt, so never point --database at real data), optionally swaps the
+legacy triggers back in, then times inserting --rows salaries:
+
+  python3 bench/trigger_load.py                       # 100k rows, both modes
+  python3 bench/trigger_load.py --mode current --rows 1000000
+
+Connection settings come from the same DB_HOST / DB_USER / DB_PASS
+variables as the app.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import mysql.connector as mysql
+from dotenv import load_dotenv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from sqlscript import run_script  # noqa: E402
+
+# The insert trigger as it was before EmployerPayStats (the benchmark only inserts).
+LEGACY_TRIGGERS = """
+DROP TRIGGER IF EXISTS auto_flag_low_pay;
+DROP TRIGGER IF EXISTS auto_flag_low_pay_update;
+DROP TRIGGER IF EXISTS auto_flag_low_pay_delete;
+
+DELIMITER $$
+
+CREATE TRIGGER auto_flag_low_pay AFTER INSERT ON Salary
+FOR EACH ROW
+BEGIN
+DECLARE emp_id INT;
+DECLARE avg_rate DECIMAL(6,2);
+
+SELECT employer_id INTO emp_id
+FROM JobPosting
+WHERE job_id = NEW.job_id;
+
+SELECT AVG(hourly_rate) INTO avg_rate
+FROM Salary s
+JOIN JobPosting j ON s.job_id = j.job_id
+WHERE j.employer_id = emp_id;
+
+IF avg_rate < 20.00 THEN
+UPDATE Employer
+SET blacklist_flag = TRUE
+WHERE employer_id = emp_id;
+
+INSERT INTO Blacklist (employer_id, reason, date_added, added_by)
+VALUES (emp_id, 'Auto-flagged for low average pay', CURDATE(), 'admin@system.com');
+END IF;
+
+END$$
+
+DELIMITER ;
+"""
+
+
+def connect(database=None):
+  return mysql.connect(
+    host=os.getenv("DB_HOST", "127.0.0.1"),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASS", ""),
+    database=database,
+    auth_plugin="mysql_native_password",
+  )
+
+
+def prepare(database, mode, employers, jobs_per_employer, seed):
+  conn = connect()
+  cur = conn.cursor()
+  cur.execute(f"DROP DATABASE IF EXISTS `{database}`")
+  cur.execute(f"CREATE DATABASE `{database}`")
+  cur.execute(f"USE `{database}`")
+  with open(os.path.join(HERE, "..", "create-tables.sql")) as f:
+    run_script(cur, f.read())
+  if mode == "legacy":
+    run_script(cur, LEGACY_TRIGGERS)
+
+  rng = random.Random(seed)
+  cur.executemany("INSERT INTO Employer (name) VALUES (%s)",
+                  [(f"Bench Employer {i}",) for i in range(employers)])
+  cur.execute("SELECT employer_id FROM Employer WHERE name LIKE 'Bench Employer %'")
+  employer_ids = [r[0] for r in cur.fetchall()]
+  cur.executemany(
+    "INSERT INTO JobPosting (employer_id, title, location, term) VALUES (%s, %s, %s, %s)",
+    [(e, rng.choice(["Software Engineer Intern", "Data Analyst Intern", "Product Manager Intern"]),
+      "Waterloo, ON", rng.choice(["Fall 2025", "Winter 2026"]))
+     for e in employer_ids for _ in range(jobs_per_employer)])
+  conn.commit()
+  cur.execute("SELECT job_id, employer_id FROM JobPosting WHERE employer_id IN "
+              "(SELECT employer_id FROM Employer WHERE name LIKE 'Bench Employer %')")
+  jobs = cur.fetchall()
+  cur.close()
+  return conn, jobs
+
+
+def load(conn, jobs, rows, batch, seed):
+  rng = random.Random(seed)
+  # Centre each employer's pay somewhere in $14-$30 so many of them hover
+  # around the $20 line, which is what makes the legacy triggers expensive.
+  centre = {e: rng.uniform(14, 30) for _, e in jobs}
+  cur = conn.cursor()
+  start = time.perf_counter()
+  for offset in range(0, rows, batch):
+    chunk = []
+    for _ in range(min(batch, rows - offset)):
+      job_id, employer_id = rng.choice(jobs)
+      chunk.append((job_id, round(max(0.0, rng.gauss(centre[employer_id], 3)), 2), 40))
+    cur.executemany("INSERT INTO Salary (job_id, hourly_rate, hours_per_week) VALUES (%s, %s, %s)", chunk)
+    conn.commit()
+  elapsed = time.perf_counter() - start
+  cur.execute("SELECT COUNT(*) FROM Blacklist")
+  blacklist_rows = cur.fetchone()[0]
+  cur.close()
+  return elapsed, blacklist_rows
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--mode", choices=["legacy", "current", "both"], default="both")
+  parser.add_argument("--rows", type=int, default=100_000)
+  parser.add_argument("--employers", type=int, default=200)
+  parser.add_argument("--jobs-per-employer", type=int, default=5)
+  parser.add_argument("--batch", type=int, default=1000, help="rows per INSERT / COMMIT")
+  parser.add_argument("--seed", type=int, default=348)
+  parser.add_argument("--database", default="coop_salaries_bench")
+  parser.add_argument("--json", action="store_true", help="print results as JSON")
+  args = parser.parse_args()
+
+  load_dotenv(os.path.join(HERE, "..", "app", ".env"))
+  load_dotenv()
+  modes = ["legacy", "current"] if args.mode == "both" else [args.mode]
+  results = {}
+  for mode in modes:
+    conn, jobs = prepare(args.database, mode, args.employers, args.jobs_per_employer, args.seed)
+    elapsed, blacklist_rows = load(conn, jobs, args.rows, args.batch, args.seed)
+    conn.close()
+    results[mode] = {
+      "seconds": round(elapsed, 2),
+      "rows_per_sec": round(args.rows / elapsed),
+      "blacklist_rows": blacklist_rows,
+    }
+    if not args.json:
+      print(f"{mode:<8} {args.rows} salaries in {elapsed:8.2f}s "
+            f"({args.rows / elapsed:,.0f} rows/s), {blacklist_rows} Blacklist rows")
+
+  if args.json:
+    print(json.dumps({"rows": args.rows, "employers": args.employers, "results": results}, indent=2))
+  elif len(results) == 2:
+    print(f"speedup: {results['legacy']['seconds'] / results['current']['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,85 @@
+"""Time-to-first-byte for streamed vs buffered result pages.
+
+Run the Flask app with the response cache and conditional GET off, so every
+request renders the page:
+
+  cd app && RESPONSE_CACHE=0 CONDITIONAL_GET=0 python3 app.py
+
+then:
+
+  python3 bench/ttfb.py                          # /salary-bands, no filters
+  python3 bench/ttfb.py --path "/salaries?page_size=5000" -n 50
+
+For each mode it reports time to first byte (headers + first body byte),
+total download time and response size, as median / p95 over n requests.
+Each request also carries a unique _bust argument, which the response cache
+keys on, so a server left at the defaults still misses every time.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+def fetch(host, port, path):
+  conn = http.client.HTTPConnection(host, port, timeout=300)
+  start = time.perf_counter()
+  conn.request("GET", path)
+  resp = conn.getresponse()
+  resp.read(1)
+  first_byte = time.perf_counter() - start
+  size = 1 + len(resp.read())
+  total = time.perf_counter() - start
+  conn.close()
+  return first_byte, total, size
+
+
+def summarize(samples):
+  samples = sorted(samples)
+  return {
+    "median_ms": round(1000 * statistics.median(samples), 2),
+    "p95_ms": round(1000 * samples[int(0.95 * (len(samples) - 1))], 2),
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--url", default="http://127.0.0.1:5000")
+  parser.add_argument("--path", default="/salary-bands")
+  parser.add_argument("-n", type=int, default=20, help="requests per mode")
+  parser.add_argument("--json", action="store_true", help="print results as JSON")
+  args = parser.parse_args()
+
+  target = urlsplit(args.url)
+  sep = "&" if "?" in args.path else "?"
+  results = {}
+  bust = itertools.count()
+  for mode, flag in (("buffered", "0"), ("streamed", "1")):
+    path = f"{args.path}{sep}stream={flag}"
+    timed = lambda: fetch(target.hostname, target.port or 80, f"{path}&_bust={next(bust)}")
+    timed()  # warm the pool and MySQL's buffer pool
+    runs = [timed() for _ in range(args.n)]
+    results[mode] = {
+      "ttfb": summarize([r[0] for r in runs]),
+      "total": summarize([r[1] for r in runs]),
+      "bytes": runs[-1][2],
+    }
+
+  if args.json:
+    print(json.dumps({"path": args.path, "n": args.n, "results": results}, indent=2))
+    return
+
+  print(f"{args.path}  (n={args.n})")
+  print(f"{'mode':<10}{'ttfb med':>12}{'ttfb p95':>12}{'total med':>12}{'bytes':>12}")
+  for mode, r in results.items():
+    print(f"{mode:<10}{r['ttfb']['median_ms']:>10.1f}ms{r['ttfb']['p95_ms']:>10.1f}ms"
+          f"{r['total']['median_ms']:>10.1f}ms{r['bytes']:>12}")
+  speedup = results["buffered"]["ttfb"]["median_ms"] / max(results["streamed"]["ttfb"]["median_ms"], 1e-6)
+  print(f"time to first byte: {speedup:.1f}x faster when streamed")
+
+
+if __name__ == "__main__":
+  main()
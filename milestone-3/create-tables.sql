@@ -3,6 +3,19 @@
 -- =====================================
 
 -- Drop tables in correct order (child tables first)
+-- Recreating the schema discards applied migrations too (rerun app/migrate.py)
+DROP TABLE IF EXISTS SchemaMigrations;
+DROP TABLE IF EXISTS SlowQuery;
+DROP TABLE IF EXISTS IngestRow;
+DROP TABLE IF EXISTS IngestFile;
+DROP TABLE IF EXISTS EmployerAlias;
+DROP TABLE IF EXISTS DataVersion;
+DROP TABLE IF EXISTS EmployerFacultyStats;
+DROP TABLE IF EXISTS FacultySalaryStats;
+DROP TABLE IF EXISTS EmployerPayStats;
+DROP TABLE IF EXISTS TitleEmployerSalaryStats;
+DROP TABLE IF EXISTS TitleSalaryStats;
+DROP TABLE IF EXISTS TermSalaryStats;
 DROP TABLE IF EXISTS Placement;
 DROP TABLE IF EXISTS Student;
 DROP TABLE IF EXISTS Blacklist;
@@ -12,6 +25,8 @@ DROP TABLE IF EXISTS Employer;
 
 -- Drop existing procedures and triggers
 DROP PROCEDURE IF EXISTS AddToBlacklist;
+DROP PROCEDURE IF EXISTS ApplySalaryStatsDelta;
+DROP PROCEDURE IF EXISTS ApplyEmployerPayChange;
 DROP TRIGGER IF EXISTS UpdateBlacklistFlag;
 DROP TRIGGER IF EXISTS auto_flag_low_pay;
 DROP TRIGGER IF EXISTS auto_flag_low_pay_2;
@@ -51,6 +66,8 @@ CREATE TABLE Salary (
     hourly_rate DECIMAL(8,2) NOT NULL CHECK (hourly_rate >= 0),
     hours_per_week INT CHECK (hours_per_week BETWEEN 0 AND 80),
     notes TEXT,
+    -- Keyset pagination seeks on (hourly_rate, salary_id); InnoDB appends the PK
+    INDEX idx_salary_rate (hourly_rate),
     FOREIGN KEY (job_id)
         REFERENCES JobPosting(job_id)
         ON DELETE CASCADE
@@ -105,6 +122,51 @@ CREATE TABLE Placement (
         ON UPDATE CASCADE
 ) ENGINE=InnoDB;
 
+-- =====================================
+-- Salary summary tables
+-- Running SUM/COUNT of hourly_rate kept current by the Salary triggers below,
+-- so /avg-by-term, /avg-by-title and /top-companies read a handful of rows
+-- instead of aggregating the whole Salary table. NULL terms are stored as ''.
+-- Check or rebuild them with: python3 app/summaries.py --check | --rebuild
+-- =====================================
+CREATE TABLE TermSalaryStats (
+    term VARCHAR(50) NOT NULL PRIMARY KEY,
+    rate_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    n_reports INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+CREATE TABLE TitleSalaryStats (
+    title VARCHAR(255) NOT NULL PRIMARY KEY,
+    rate_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    n_reports INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+CREATE TABLE TitleEmployerSalaryStats (
+    title VARCHAR(255) NOT NULL,
+    employer_id INT NOT NULL,
+    rate_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    n_reports INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (title, employer_id),
+    FOREIGN KEY (employer_id)
+        REFERENCES Employer(employer_id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Per-employer running pay stats for the auto_flag_low_pay triggers;
+-- low_pay_flag remembers which side of the $20/hour line the average is on
+CREATE TABLE EmployerPayStats (
+    employer_id INT NOT NULL PRIMARY KEY,
+    rate_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    n_reports INT NOT NULL DEFAULT 0,
+    min_rate DECIMAL(8,2),
+    low_pay_flag BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (employer_id)
+        REFERENCES Employer(employer_id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
 -- =====================================
 -- Add FULLTEXT Indexes AFTER table creation
 -- =====================================
@@ -150,36 +212,92 @@ END$$
 DELIMITER ;
 
 -- =====================================
--- Trigger: Compute average pay across all jobs of an employer after Salary INSERT; conditionally blacklist employer
+-- Procedure: Apply one Salary change to the employer's running pay stats and
+-- auto-flag/unflag the employer when its average crosses $20/hour.
+-- Constant time per row: only removing the employer's current minimum
+-- forces a look at its other salaries.
 -- =====================================
 DELIMITER $$
 
-CREATE TRIGGER auto_flag_low_pay AFTER INSERT ON Salary
-FOR EACH ROW
+CREATE PROCEDURE ApplyEmployerPayChange(
+    IN p_job_id INT,
+    IN p_removed_rate DECIMAL(8,2),
+    IN p_added_rate DECIMAL(8,2)
+)
 BEGIN
 DECLARE emp_id INT;
-DECLARE avg_rate DECIMAL(6,2);
+DECLARE cur_sum DECIMAL(14,2);
+DECLARE cur_n INT;
+DECLARE cur_min DECIMAL(8,2);
+DECLARE was_low BOOLEAN;
+DECLARE is_low BOOLEAN;
 
 -- Get employer_id from JobPosting table
 SELECT employer_id INTO emp_id
 FROM JobPosting
-WHERE job_id = NEW.job_id;
+WHERE job_id = p_job_id;
+
+-- Update the running sum/count; the upsert also locks the stats row
+INSERT INTO EmployerPayStats (employer_id, rate_sum, n_reports, min_rate)
+VALUES (emp_id,
+        COALESCE(p_added_rate, 0) - COALESCE(p_removed_rate, 0),
+        (p_added_rate IS NOT NULL) - (p_removed_rate IS NOT NULL),
+        p_added_rate)
+ON DUPLICATE KEY UPDATE
+rate_sum = rate_sum + COALESCE(p_added_rate, 0) - COALESCE(p_removed_rate, 0),
+n_reports = n_reports + (p_added_rate IS NOT NULL) - (p_removed_rate IS NOT NULL),
+min_rate = CASE
+    WHEN p_removed_rate IS NOT NULL AND p_removed_rate <= min_rate THEN NULL
+    WHEN p_added_rate IS NULL THEN min_rate
+    ELSE LEAST(COALESCE(min_rate, p_added_rate), p_added_rate)
+END;
+
+SELECT rate_sum, n_reports, min_rate, low_pay_flag
+INTO cur_sum, cur_n, cur_min, was_low
+FROM EmployerPayStats
+WHERE employer_id = emp_id;
 
--- Compute the employer’s new average rate across all their jobs
-SELECT AVG(hourly_rate) INTO avg_rate
+-- The old minimum was removed: recompute it from the employer's salaries
+IF cur_min IS NULL AND cur_n > 0 THEN
+SELECT MIN(s.hourly_rate) INTO cur_min
 FROM Salary s
 JOIN JobPosting j ON s.job_id = j.job_id
 WHERE j.employer_id = emp_id;
 
--- If new average rate < $20/hour, flag and add a blacklist entry
-IF avg_rate < 20.00 THEN
+UPDATE EmployerPayStats
+SET min_rate = cur_min
+WHERE employer_id = emp_id;
+END IF;
+
+SET is_low = cur_n > 0 AND ROUND(cur_sum / cur_n, 2) < 20.00;
+
+-- Average dropped below $20/hour: flag and add a single blacklist entry
+IF is_low AND NOT was_low THEN
+UPDATE EmployerPayStats
+SET low_pay_flag = TRUE
+WHERE employer_id = emp_id;
+
 UPDATE Employer
 SET blacklist_flag = TRUE
 WHERE employer_id = emp_id;
 
--- Insert default reason into Blacklist table
 INSERT INTO Blacklist (employer_id, reason, date_added, added_by)
 VALUES (emp_id, 'Auto-flagged for low average pay', CURDATE(), 'admin@system.com');
+
+-- Average recovered: drop the automatic entry, keep any manual ones
+ELSEIF was_low AND NOT is_low THEN
+UPDATE EmployerPayStats
+SET low_pay_flag = FALSE
+WHERE employer_id = emp_id;
+
+DELETE FROM Blacklist
+WHERE employer_id = emp_id
+  AND reason = 'Auto-flagged for low average pay'
+  AND added_by = 'admin@system.com';
+
+UPDATE Employer
+SET blacklist_flag = EXISTS (SELECT 1 FROM Blacklist b WHERE b.employer_id = emp_id)
+WHERE employer_id = emp_id;
 END IF;
 
 END$$
@@ -187,38 +305,97 @@ END$$
 DELIMITER ;
 
 -- =====================================
--- Trigger: Compute average pay across all jobs of an employer after Salary UPDATE; conditionally blacklist employer
+-- Triggers: Maintain employer pay stats after Salary INSERT / UPDATE / DELETE; conditionally blacklist employer
 -- =====================================
 DELIMITER $$
 
+CREATE TRIGGER auto_flag_low_pay AFTER INSERT ON Salary
+FOR EACH ROW
+BEGIN
+CALL ApplyEmployerPayChange(NEW.job_id, NULL, NEW.hourly_rate);
+END$$
+
 CREATE TRIGGER auto_flag_low_pay_update AFTER UPDATE ON Salary
 FOR EACH ROW
 BEGIN
-DECLARE emp_id INT;
-DECLARE avg_rate DECIMAL(6,2);
+IF NEW.job_id <=> OLD.job_id THEN
+CALL ApplyEmployerPayChange(NEW.job_id, OLD.hourly_rate, NEW.hourly_rate);
+ELSE
+CALL ApplyEmployerPayChange(OLD.job_id, OLD.hourly_rate, NULL);
+CALL ApplyEmployerPayChange(NEW.job_id, NULL, NEW.hourly_rate);
+END IF;
+END$$
 
--- Get employer_id from JobPosting table
-SELECT employer_id INTO emp_id
-FROM JobPosting
-WHERE job_id = NEW.job_id;
+CREATE TRIGGER auto_flag_low_pay_delete AFTER DELETE ON Salary
+FOR EACH ROW
+BEGIN
+CALL ApplyEmployerPayChange(OLD.job_id, OLD.hourly_rate, NULL);
+END$$
 
--- Compute the employer’s new average rate across all their jobs
-SELECT AVG(hourly_rate) INTO avg_rate
-FROM Salary s
-JOIN JobPosting j ON s.job_id = j.job_id
-WHERE j.employer_id = emp_id;
+DELIMITER ;
 
--- If new average rate < $20/hour, flag and add a blacklist entry
-IF avg_rate < 20.00 THEN
-UPDATE Employer
-SET blacklist_flag = TRUE
-WHERE employer_id = emp_id;
+-- =====================================
+-- Procedure + triggers: keep the salary summary tables in step with Salary
+-- (MySQL does not fire triggers for cascaded deletes, so deleting a
+-- JobPosting or Employer needs a summaries.py --rebuild afterwards)
+-- =====================================
+DELIMITER $$
 
--- Insert default reason into Blacklist table
-INSERT INTO Blacklist (employer_id, reason, date_added, added_by)
-VALUES (emp_id, 'Auto-flagged for low average pay', CURDATE(), 'admin@system.com');
+CREATE PROCEDURE ApplySalaryStatsDelta(
+    IN p_job_id INT,
+    IN p_rate_delta DECIMAL(14,2),
+    IN p_count_delta INT
+)
+BEGIN
+DECLARE j_term VARCHAR(50);
+DECLARE j_title VARCHAR(255);
+DECLARE j_employer INT;
+
+SELECT COALESCE(term, ''), title, employer_id
+INTO j_term, j_title, j_employer
+FROM JobPosting
+WHERE job_id = p_job_id;
+
+INSERT INTO TermSalaryStats (term, rate_sum, n_reports)
+VALUES (j_term, p_rate_delta, p_count_delta)
+ON DUPLICATE KEY UPDATE
+rate_sum = rate_sum + p_rate_delta,
+n_reports = n_reports + p_count_delta;
+
+INSERT INTO TitleSalaryStats (title, rate_sum, n_reports)
+VALUES (j_title, p_rate_delta, p_count_delta)
+ON DUPLICATE KEY UPDATE
+rate_sum = rate_sum + p_rate_delta,
+n_reports = n_reports + p_count_delta;
+
+INSERT INTO TitleEmployerSalaryStats (title, employer_id, rate_sum, n_reports)
+VALUES (j_title, j_employer, p_rate_delta, p_count_delta)
+ON DUPLICATE KEY UPDATE
+rate_sum = rate_sum + p_rate_delta,
+n_reports = n_reports + p_count_delta;
+END$$
+
+CREATE TRIGGER salary_stats_insert AFTER INSERT ON Salary
+FOR EACH ROW
+BEGIN
+CALL ApplySalaryStatsDelta(NEW.job_id, NEW.hourly_rate, 1);
+END$$
+
+CREATE TRIGGER salary_stats_update AFTER UPDATE ON Salary
+FOR EACH ROW
+BEGIN
+IF NEW.job_id <=> OLD.job_id THEN
+CALL ApplySalaryStatsDelta(NEW.job_id, NEW.hourly_rate - OLD.hourly_rate, 0);
+ELSE
+CALL ApplySalaryStatsDelta(OLD.job_id, -OLD.hourly_rate, -1);
+CALL ApplySalaryStatsDelta(NEW.job_id, NEW.hourly_rate, 1);
 END IF;
+END$$
 
+CREATE TRIGGER salary_stats_delete AFTER DELETE ON Salary
+FOR EACH ROW
+BEGIN
+CALL ApplySalaryStatsDelta(OLD.job_id, -OLD.hourly_rate, -1);
 END$$
 
 DELIMITER ;
@@ -0,0 +1,296 @@
+"""Vectorized synthetic data at production scale, loaded with LOAD DATA.
+
+data_transform.add_synthetic() used to build rows one at a time with Faker
+and push them through process_data(), which tops out at thousands of rows.
+Here every column is drawn at once with NumPy:
+
+  * employers, titles and cities are picked from pools with skewed
+    (Zipf-like) popularity: a few large employers and common titles, then a
+    long tail
+  * each salary is log-normal around its title's base rate, scaled by an
+    employer pay factor and a per-term trend
+  * each student gets a faculty and program, and one placement in a posting
+    whose dates match its term
+
+The columns are written as tab-separated files (one per table) and loaded
+with LOAD DATA LOCAL INFILE. Ids in the files start at 1, and load() shifts
+them past the ids already in the database, so a load adds to existing data
+instead of replacing it. The Salary triggers are bypassed during the load
+(migration 004), and the summary tables are rebuilt once afterwards. The
+same seed always produces the same files.
+
+  python3 synthetic.py --rows 10000000 --out /tmp/synthetic          # files only
+  python3 synthetic.py --rows 1000000 --load                         # generate and load
+  python3 synthetic.py --load --from /tmp/synthetic                  # load existing files
+
+LOAD DATA LOCAL needs local_infile=ON on the server. Connection settings
+come from the same DB_HOST / DB_USER / DB_PASS / DB_NAME variables as the app.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+FACULTIES = ["Engineering", "Mathematics", "Science", "Arts", "Business"]
+FACULTY_WEIGHTS = [0.35, 0.30, 0.15, 0.10, 0.10]
+PROGRAMS = [
+  "Computer Engineering", "Software Engineering", "Mechanical Engineering", "Electrical Engineering",
+  "Computer Science", "Pure Mathematics", "Statistics", "Actuarial Science",
+  "Biology", "Chemistry", "Physics", "Environmental Science",
+  "Psychology", "English", "History", "Fine Arts",
+  "Business Administration", "Accounting", "Finance", "Marketing",
+]  # four per faculty, in FACULTIES order
+
+# (title, base hourly rate in CAD), most common first
+TITLES = [
+  ("Software Engineer Intern", 32), ("Software Developer", 30), ("Data Analyst Intern", 25),
+  ("Co-op Intern", 22), ("Backend Developer", 30), ("Frontend Developer", 27),
+  ("Full Stack Developer", 29), ("QA Analyst", 22), ("Product Manager Intern", 30),
+  ("Data Scientist Intern", 34), ("Machine Learning Engineer Intern", 38), ("DevOps Engineer", 31),
+  ("Business Analyst", 23), ("Research Assistant", 20), ("Embedded Software Engineer", 30),
+  ("Hardware Engineer Intern", 27), ("Mechanical Design Engineer", 24), ("Electrical Engineering Intern", 25),
+  ("Financial Analyst", 24), ("Accounting Assistant", 19), ("Marketing Coordinator", 18),
+  ("UX Designer", 25), ("IT Support Analyst", 19), ("Site Reliability Engineer", 36),
+  ("Security Analyst", 28), ("Technical Writer", 21), ("Lab Technician", 18),
+  ("Actuarial Analyst", 27), ("Game Developer", 26), ("Cloud Engineer", 33),
+  ("Quantitative Developer", 55), ("Firmware Engineer", 31), ("Data Engineer", 33),
+  ("Mobile Developer", 29), ("Automation Engineer", 28), ("Clinical Research Assistant", 19),
+]
+CITIES = [
+  "Toronto, ON", "Waterloo, ON", "San Francisco, CA", "Vancouver, BC", "Ottawa, ON", "Seattle, WA",
+  "New York, NY", "Montreal, QC", "Kitchener, ON", "Calgary, AB", "Mississauga, ON", "Remote",
+  "Markham, ON", "Austin, TX", "Boston, MA", "Edmonton, AB", "Halifax, NS", "Chicago, IL",
+  "Noida", "Bangalore", "London, ON", "Guelph, ON", "Hamilton, ON", "Victoria, BC",
+]
+SEASONS = [("Winter", 1, 4), ("Spring", 5, 8), ("Fall", 9, 12)]  # (season, first month, last month)
+YEARS = list(range(2019, 2027))
+TERMS = [f"{season} {year}" for year in YEARS for season, _, _ in SEASONS]
+
+_NAME_FIRST = ["Maple", "North", "Blue", "Quantum", "Cedar", "Polar", "Summit", "Bright", "Iron", "Silver",
+               "Harbour", "Granite", "Aurora", "Lakeside", "Pioneer", "Vertex", "Prairie", "Atlas", "Beacon",
+               "Crescent", "Evergreen", "Falcon", "Horizon", "Keystone", "Lumen", "Meridian", "Nimbus", "Orbit"]
+_NAME_SECOND = ["Data", "Cloud", "Health", "Financial", "Robotics", "Energy", "Software", "Analytics",
+                "Logic", "Networks", "Bio", "Capital", "Motion", "Signal", "Security", "Learning"]
+# No legal suffixes ("Inc.", "Corp."): the alias key drops them, and distinct employers need distinct keys
+_NAME_SUFFIX = ["Labs", "Systems", "Technologies", "Group", "Solutions", "Partners"]
+BLACKLIST_REASONS = ["Unpaid overtime reported", "Offer rescinded after acceptance", "Unsafe working conditions",
+                     "Pay below posted rate", "Blacklisted"]
+
+# Load order and each file's columns; @-columns are shifted by load()
+TABLES = {
+  "Employer": ["@employer_id", "name", "alias"],
+  "JobPosting": ["@job_id", "@employer_id", "title", "location", "term"],
+  "Student": ["@student_id", "name", "faculty", "program", "year"],
+  "Placement": ["@student_id", "@job_id", "start_date", "end_date"],
+  "Salary": ["@job_id", "hourly_rate", "hours_per_week", "notes"],
+  "Blacklist": ["@employer_id", "reason", "date_added", "added_by"],
+}
+_ID_TABLE = {"employer_id": "Employer", "job_id": "JobPosting", "student_id": "Student"}
+
+
+def _zipf(n, s):
+  weights = 1.0 / np.arange(1, n + 1) ** s
+  return weights / weights.sum()
+
+
+def _employer_names(rng, n):
+  """n distinct company names: shuffled pool combinations, numbered once those run out."""
+  combos = np.array([f"{a} {b} {c}" for a in _NAME_FIRST for b in _NAME_SECOND for c in _NAME_SUFFIX], dtype=object)
+  combos = combos[rng.permutation(len(combos))]
+  names = combos[np.arange(n) % len(combos)]
+  rounds = np.arange(n) // len(combos)
+  numbered = rounds > 0
+  names[numbered] = names[numbered] + " " + (rounds[numbered] + 1).astype(str).astype(object)
+  return names
+
+
+def generate(rows, seed=348, jobs=None, employers=None, students=None):
+  """Return {table: DataFrame} for `rows` salaries; ids start at 1."""
+  sys.path.insert(0, os.path.join(HERE, "app"))
+  from employer_dedup import canonical_names
+
+  rng = np.random.default_rng(seed)
+  n_jobs = jobs or max(50, rows // 20)
+  n_employers = employers or max(20, n_jobs // 25)
+  n_students = students or max(100, rows // 4)
+
+  employer_ids = np.arange(1, n_employers + 1)
+  employer_pay = rng.lognormal(0.0, 0.25, n_employers)
+  employer = pd.DataFrame({"employer_id": employer_ids, "name": _employer_names(rng, n_employers)})
+  employer["alias"] = canonical_names(employer["name"])
+
+  # Popularity ranks are shuffled so the biggest employer is not always id 1
+  job_employer = rng.permutation(n_employers)[rng.choice(n_employers, n_jobs, p=_zipf(n_employers, 0.9))]
+  job_title = rng.choice(len(TITLES), n_jobs, p=_zipf(len(TITLES), 1.0))
+  job_city = rng.choice(len(CITIES), n_jobs, p=_zipf(len(CITIES), 0.8))
+  # Later terms have more postings
+  term_weights = np.linspace(1, 3, len(TERMS))
+  job_term = rng.choice(len(TERMS), n_jobs, p=term_weights / term_weights.sum())
+  titles = np.array([t for t, _ in TITLES], dtype=object)
+  job = pd.DataFrame({
+    "job_id": np.arange(1, n_jobs + 1), "employer_id": job_employer + 1, "title": titles[job_title],
+    "location": np.array(CITIES, dtype=object)[job_city], "term": np.array(TERMS, dtype=object)[job_term],
+  })
+
+  # Pay: title base x employer factor x 3% a year, log-normal spread per report
+  base = np.array([rate for _, rate in TITLES], dtype=float)
+  job_rate = base[job_title] * employer_pay[job_employer] * 1.03 ** (job_term // len(SEASONS))
+  salary_job = rng.choice(n_jobs, rows, p=_zipf(n_jobs, 0.6))
+  rates = np.clip(np.round(job_rate[salary_job] * rng.lognormal(0.0, 0.15, rows), 2), 15.0, 200.0)
+  salary = pd.DataFrame({
+    "job_id": salary_job + 1, "hourly_rate": rates,
+    "hours_per_week": rng.choice([35, 37, 40], rows, p=[0.1, 0.1, 0.8]), "notes": None,
+  })
+
+  faculty = rng.choice(len(FACULTIES), n_students, p=FACULTY_WEIGHTS)
+  student = pd.DataFrame({
+    "student_id": np.arange(1, n_students + 1),
+    "name": "Student " + pd.Series(np.arange(1, n_students + 1)).astype(str),
+    "faculty": np.array(FACULTIES, dtype=object)[faculty],
+    "program": np.array(PROGRAMS, dtype=object)[faculty * 4 + rng.integers(0, 4, n_students)],
+    "year": rng.integers(1, 6, n_students),
+  })
+
+  # One placement per student; dates follow the posting's term
+  placed = rng.choice(n_jobs, n_students, p=_zipf(n_jobs, 0.6))
+  season, year = job_term[placed] % len(SEASONS), np.array(YEARS)[job_term[placed] // len(SEASONS)]
+  first = np.array([m for _, m, _ in SEASONS])[season]
+  last = np.array([m for _, _, m in SEASONS])[season]
+  start = pd.to_datetime(pd.DataFrame({"year": year, "month": first, "day": 1}))
+  end = pd.to_datetime(pd.DataFrame({"year": year, "month": last, "day": 1})) + pd.offsets.MonthEnd(0)
+  placement = pd.DataFrame({"student_id": np.arange(1, n_students + 1), "job_id": placed + 1,
+                            "start_date": start.dt.date, "end_date": end.dt.date})
+
+  listed = rng.choice(n_employers, max(1, n_employers // 50), replace=False)
+  blacklist = pd.DataFrame({
+    "employer_id": listed + 1, "reason": np.array(BLACKLIST_REASONS, dtype=object)[rng.integers(0, len(BLACKLIST_REASONS), len(listed))],
+    "date_added": pd.Timestamp("2025-01-01").date(), "added_by": "system",
+  })
+
+  return {"Employer": employer, "JobPosting": job, "Student": student, "Placement": placement,
+          "Salary": salary, "Blacklist": blacklist}
+
+
+def write(tables, directory):
+  """Write each table as <directory>/<Table>.tsv (NULL as \\N); return the paths."""
+  os.makedirs(directory, exist_ok=True)
+  paths = {}
+  for table, df in tables.items():
+    paths[table] = os.path.join(directory, f"{table}.tsv")
+    df.to_csv(paths[table], sep="\t", header=False, index=False, na_rep="\\N", float_format="%.2f",
+              lineterminator="\n", chunksize=500_000)
+  return paths
+
+
+def load(conn, directory, log=print):
+  """LOAD DATA every <Table>.tsv in directory, shifted past the existing ids.
+
+  conn must have been opened with allow_local_infile=True. Returns the id
+  offsets used, so callers can find the rows that were added.
+  """
+  sys.path.insert(0, os.path.join(HERE, "app"))
+  from summaries import rebuild
+
+  cur = conn.cursor()
+  offsets = {}
+  for column, table in _ID_TABLE.items():
+    cur.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    offsets[column] = cur.fetchone()[0]
+
+  # Employer names are unique: stage them, and number any that already exist.
+  # Each gets its 'exact' alias row, as data_transform adds for new employers,
+  # so employer_dedup.py --merge does not fold them into each other.
+  cur.execute("CREATE TEMPORARY TABLE SyntheticEmployer "
+              "(id INT PRIMARY KEY, name VARCHAR(255) NOT NULL, alias VARCHAR(255) NOT NULL)")
+  cur.execute("LOAD DATA LOCAL INFILE %s INTO TABLE SyntheticEmployer FIELDS TERMINATED BY '\\t' (id, name, alias)",
+              (os.path.join(directory, "Employer.tsv"),))
+  cur.execute("""
+    UPDATE SyntheticEmployer s JOIN Employer e ON e.name = s.name
+    SET s.name = CONCAT(s.name, ' #', s.id + %s), s.alias = CONCAT(s.alias, ' ', s.id + %s)
+  """, (offsets["employer_id"], offsets["employer_id"]))
+  cur.execute("INSERT INTO Employer (employer_id, name) SELECT id + %s, name FROM SyntheticEmployer",
+              (offsets["employer_id"],))
+  employers = cur.rowcount
+  # An alias already taken by an existing employer keeps pointing there
+  cur.execute("INSERT IGNORE INTO EmployerAlias (alias, employer_id, source) "
+              "SELECT alias, id + %s, 'exact' FROM SyntheticEmployer", (offsets["employer_id"],))
+  cur.execute("DROP TEMPORARY TABLE SyntheticEmployer")
+  conn.commit()
+  log(f"Employer: {employers} rows")
+
+  cur.execute("SET @bulk_salary_load = 1")
+  try:
+    for table, columns in TABLES.items():
+      if table == "Employer":
+        continue
+      shifts = ", ".join(f"{c[1:]} = {c} + {int(offsets[c[1:]])}" for c in columns if c.startswith("@"))
+      start = time.perf_counter()
+      cur.execute(f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} FIELDS TERMINATED BY '\\t' "
+                  f"({', '.join(columns)}) SET {shifts}", (os.path.join(directory, f"{table}.tsv"),))
+      conn.commit()
+      log(f"{table}: {cur.rowcount} rows in {time.perf_counter() - start:.1f}s")
+  finally:
+    cur.execute("SET @bulk_salary_load = NULL")
+
+  conn.commit()
+  start = time.perf_counter()
+  rebuild(conn)
+  # The rebuild also blacklists the new low-pay employers and bumps the data version
+  log(f"summaries rebuilt in {time.perf_counter() - start:.1f}s")
+  cur.close()
+  return offsets
+
+
+def connect():
+  import mysql.connector as mysql
+  from dotenv import load_dotenv
+
+  load_dotenv(os.path.join(HERE, "app", ".env"))
+  return mysql.connect(
+    host=os.getenv("DB_HOST", "127.0.0.1"),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASS", ""),
+    database=os.getenv("DB_NAME", "coop_salaries"),
+    auth_plugin="mysql_native_password",
+    allow_local_infile=True,
+  )
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--rows", type=int, default=1_000_000, help="salaries to generate")
+  parser.add_argument("--seed", type=int, default=348)
+  parser.add_argument("--out", help="directory for the .tsv files (default: a temporary one)")
+  parser.add_argument("--load", action="store_true", help="load the files into the database")
+  parser.add_argument("--from", dest="source", help="load existing files from this directory instead of generating")
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as scratch:
+    directory = args.source or args.out or scratch
+    if not args.source:
+      start = time.perf_counter()
+      tables = generate(args.rows, args.seed)
+      generated = time.perf_counter() - start
+      write(tables, directory)
+      print(f"generated {args.rows:,} salaries in {generated:.1f}s, "
+            f"written in {time.perf_counter() - start - generated:.1f}s: "
+            + ", ".join(f"{t} {len(df):,}" for t, df in tables.items()))
+    if args.load:
+      conn = connect()
+      try:
+        load(conn, directory)
+      finally:
+        conn.close()
+    elif not args.out:
+      print("nothing kept: pass --out DIR and/or --load")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())